@@ -0,0 +1,46 @@
+"""Add composite indexes for tenant-scoped hot queries
+
+Revision ID: 7d2e9a41c5b3
+Revises: 50c6762cd7cb
+Create Date: 2026-10-18 09:12:31.482115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2e9a41c5b3'
+down_revision: Union[str, None] = '50c6762cd7cb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Listes par entreprise triées par date (keyset sur created_at, id)
+    op.create_index('ix_dotation_reports_enterprise_created', 'dotation_reports', ['enterprise_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_tax_declarations_enterprise_created', 'tax_declarations', ['enterprise_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_documents_enterprise_created', 'documents', ['enterprise_id', 'created_at'], unique=False)
+    op.create_index('ix_blanchiment_operations_enterprise_created', 'blanchiment_operations', ['enterprise_id', 'created_at'], unique=False)
+    op.create_index('ix_archives_enterprise_created', 'archives', ['enterprise_id', 'created_at'], unique=False)
+    # Lignes d'un rapport (calculate_dotation_totals, list_dotation_rows)
+    op.create_index('ix_dotation_rows_report_id', 'dotation_rows', ['report_id'], unique=False)
+    # Paliers fiscaux actifs par type, triés par montant
+    op.create_index('ix_tax_brackets_type_active_min', 'tax_brackets', ['bracket_type', 'is_active', 'min_amount'], unique=False)
+    # Historique d'audit par utilisateur et par enregistrement
+    op.create_index('ix_audit_logs_user_created', 'audit_logs', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_audit_logs_table_record', 'audit_logs', ['table_name', 'record_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_audit_logs_table_record', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_user_created', table_name='audit_logs')
+    op.drop_index('ix_tax_brackets_type_active_min', table_name='tax_brackets')
+    op.drop_index('ix_dotation_rows_report_id', table_name='dotation_rows')
+    op.drop_index('ix_archives_enterprise_created', table_name='archives')
+    op.drop_index('ix_blanchiment_operations_enterprise_created', table_name='blanchiment_operations')
+    op.drop_index('ix_documents_enterprise_created', table_name='documents')
+    op.drop_index('ix_tax_declarations_enterprise_created', table_name='tax_declarations')
+    op.drop_index('ix_dotation_reports_enterprise_created', table_name='dotation_reports')
@@ -0,0 +1,30 @@
+"""Add users.token_version for stateless access tokens
+
+Revision ID: a83f5d1c2b94
+Revises: c41f7b2d8e60
+Create Date: 2026-10-18 09:48:12.503114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a83f5d1c2b94'
+down_revision: Union[str, None] = 'c41f7b2d8e60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'users',
+        sa.Column('token_version', sa.Integer(), nullable=False, server_default='0')
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('token_version')
@@ -0,0 +1,34 @@
+"""Add audit_logs indexes for the audit query API
+
+Revision ID: b6e1a3f70c28
+Revises: f2c8d4e6a917
+Create Date: 2026-10-18 12:03:18.664015
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e1a3f70c28'
+down_revision: Union[str, None] = 'f2c8d4e6a917'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Liste sans filtre ou par période : parcours de l'index dans l'ordre de pagination
+    op.create_index('ix_audit_logs_created_id', 'audit_logs', ['created_at', 'id'], unique=False)
+    # Historique d'un enregistrement déjà trié par date
+    op.create_index('ix_audit_logs_table_record_created', 'audit_logs', ['table_name', 'record_id', 'created_at'], unique=False)
+    op.drop_index('ix_audit_logs_table_record', table_name='audit_logs')
+    op.create_index('ix_audit_logs_action_created', 'audit_logs', ['action', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_audit_logs_action_created', table_name='audit_logs')
+    op.create_index('ix_audit_logs_table_record', 'audit_logs', ['table_name', 'record_id'], unique=False)
+    op.drop_index('ix_audit_logs_table_record_created', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_created_id', table_name='audit_logs')
@@ -0,0 +1,54 @@
+"""Cascade delete dotation rows at the database level
+
+Revision ID: c41f7b2d8e60
+Revises: 7d2e9a41c5b3
+Create Date: 2026-10-18 09:31:04.215837
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41f7b2d8e60'
+down_revision: Union[str, None] = '7d2e9a41c5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Nom des clés étrangères sans nom explicite (SQLite, mode batch)
+naming_convention = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
+}
+
+
+def _replace_report_fk(ondelete: Union[str, None]) -> None:
+    bind = op.get_bind()
+
+    if bind.dialect.name == "sqlite":
+        with op.batch_alter_table('dotation_rows', naming_convention=naming_convention) as batch_op:
+            batch_op.drop_constraint('fk_dotation_rows_report_id_dotation_reports', type_='foreignkey')
+            batch_op.create_foreign_key(
+                'fk_dotation_rows_report_id_dotation_reports', 'dotation_reports',
+                ['report_id'], ['id'], ondelete=ondelete
+            )
+        return
+
+    # MySQL : la contrainte d'origine porte un nom généré (dotation_rows_ibfk_N)
+    for fk in sa.inspect(bind).get_foreign_keys('dotation_rows'):
+        if fk['referred_table'] == 'dotation_reports':
+            op.drop_constraint(fk['name'], 'dotation_rows', type_='foreignkey')
+
+    op.create_foreign_key(
+        'fk_dotation_rows_report_id_dotation_reports', 'dotation_rows', 'dotation_reports',
+        ['report_id'], ['id'], ondelete=ondelete
+    )
+
+
+def upgrade() -> None:
+    _replace_report_fk('CASCADE')
+
+
+def downgrade() -> None:
+    _replace_report_fk(None)
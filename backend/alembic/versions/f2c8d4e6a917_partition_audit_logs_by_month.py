@@ -0,0 +1,80 @@
+"""Partition audit_logs by month on created_at
+
+Revision ID: f2c8d4e6a917
+Revises: e5b7c9a1d342
+Create Date: 2026-10-18 11:12:46.507931
+
+"""
+from typing import Sequence, Union
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+from utils.audit_partitions import (
+    AUDIT_PARTITIONS_AHEAD, month_start, add_months, partition_definitions
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8d4e6a917'
+down_revision: Union[str, None] = 'e5b7c9a1d342'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Nom des contraintes sans nom explicite (SQLite, mode batch)
+naming_convention = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
+    "pk": "pk_%(table_name)s",
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # Colonne de partitionnement : obligatoire
+    op.execute("UPDATE audit_logs SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+
+    if bind.dialect.name == "sqlite":
+        # Table non partitionnée : même schéma que MySQL, sans partitions
+        with op.batch_alter_table('audit_logs', naming_convention=naming_convention) as batch_op:
+            batch_op.drop_constraint('fk_audit_logs_user_id_users', type_='foreignkey')
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+            batch_op.drop_constraint('pk_audit_logs', type_='primary')
+            batch_op.create_primary_key('pk_audit_logs', ['id', 'created_at'])
+        return
+
+    # Les tables partitionnées InnoDB n'acceptent pas de clé étrangère
+    for fk in sa.inspect(bind).get_foreign_keys('audit_logs'):
+        op.drop_constraint(fk['name'], 'audit_logs', type_='foreignkey')
+
+    op.alter_column('audit_logs', 'created_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+
+    # Toute clé unique doit contenir la colonne de partitionnement
+    op.execute("ALTER TABLE audit_logs DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)")
+
+    oldest = bind.execute(sa.text("SELECT MIN(created_at) FROM audit_logs")).scalar()
+    current_month = month_start(datetime.now(timezone.utc).date())
+    first_month = min(month_start(oldest.date()), current_month) if oldest else current_month
+    definitions = partition_definitions(first_month, add_months(current_month, AUDIT_PARTITIONS_AHEAD))
+
+    op.execute(
+        f"ALTER TABLE audit_logs PARTITION BY RANGE (TO_DAYS(created_at)) ({', '.join(definitions)})"
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    if bind.dialect.name == "sqlite":
+        with op.batch_alter_table('audit_logs', naming_convention=naming_convention) as batch_op:
+            batch_op.drop_constraint('pk_audit_logs', type_='primary')
+            batch_op.create_primary_key('pk_audit_logs', ['id'])
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(timezone=True), nullable=True)
+            batch_op.create_foreign_key('fk_audit_logs_user_id_users', 'users', ['user_id'], ['id'])
+        return
+
+    op.execute("ALTER TABLE audit_logs REMOVE PARTITIONING")
+    op.execute("ALTER TABLE audit_logs DROP PRIMARY KEY, ADD PRIMARY KEY (id)")
+    op.alter_column('audit_logs', 'created_at', existing_type=sa.DateTime(timezone=True), nullable=True)
+    op.create_foreign_key('fk_audit_logs_user_id_users', 'audit_logs', 'users', ['user_id'], ['id'])
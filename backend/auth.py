@@ -1,15 +1,32 @@
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select, case, and_
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
+import asyncio
+import hashlib
 import httpx
 import os
+import time
+import uuid
 from typing import Optional, Dict, Any, List
 import logging
 
-from database import get_db
+from database import get_async_db, set_request_user
+from utils.deadlines import DeadlineExceeded, deadline_exceeded
+from utils.discord_client import discord_client, DiscordRateLimitError, DISCORD_API_BASE
+from utils.circuit_breaker import CircuitOpenError
+from utils.cache import TTLCache
+from utils.enterprise_index import enterprise_index, EnterpriseSnapshot
+from utils.token_versions import token_versions
+from utils.revocation import revocations
+from utils.last_login import last_login_buffer
 from models import User, Enterprise, UserRole
 from schemas import TokenData, UserCreate, UserResponse
 
@@ -23,13 +40,26 @@ JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "fallback_secret")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_EXPIRATION_HOURS = int(os.getenv("JWT_EXPIRATION_HOURS", "24"))
 JWT_REFRESH_EXPIRATION_DAYS = int(os.getenv("JWT_REFRESH_EXPIRATION_DAYS", "7"))
+# Autorisation sans état : rôle et entreprise lus dans le token d'accès, sans requête SQL
+JWT_STATELESS_AUTH = os.getenv("JWT_STATELESS_AUTH", "False").lower() == "true"
 
 # URLs Discord API
-DISCORD_API_BASE = "https://discord.com/api/v10"
 DISCORD_OAUTH_URL = f"{DISCORD_API_BASE}/oauth2/token"
 DISCORD_USER_URL = f"{DISCORD_API_BASE}/users/@me"
 DISCORD_GUILDS_URL = f"{DISCORD_API_BASE}/users/@me/guilds"
 
+# Cache des tokens décodés : sha256(token) -> TokenData, jusqu'à l'expiration du token
+JWT_DECODE_CACHE_SIZE = int(os.getenv("JWT_DECODE_CACHE_SIZE", "10000"))
+token_cache = TTLCache(maxsize=JWT_DECODE_CACHE_SIZE, ttl=JWT_EXPIRATION_HOURS * 3600)
+
+# Cache des rôles des membres de guild : (guild_id, user_id) -> liste de rôles (None si non membre)
+DISCORD_MEMBER_CACHE_SIZE = int(os.getenv("DISCORD_MEMBER_CACHE_SIZE", "10000"))
+DISCORD_MEMBER_CACHE_TTL = float(os.getenv("DISCORD_MEMBER_CACHE_TTL", "300"))
+DISCORD_MEMBER_CACHE_NEGATIVE_TTL = float(os.getenv("DISCORD_MEMBER_CACHE_NEGATIVE_TTL", "60"))
+
+member_roles_cache = TTLCache(maxsize=DISCORD_MEMBER_CACHE_SIZE, ttl=DISCORD_MEMBER_CACHE_TTL)
+_NOT_CACHED = object()
+
 # Security
 security = HTTPBearer()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -39,9 +69,30 @@ logger = logging.getLogger(__name__)
 class DiscordOAuthError(Exception):
     pass
 
+class DiscordUnavailableError(DiscordOAuthError):
+    """Discord n'a pas répondu dans le délai imparti."""
+    pass
+
 class AuthenticationError(Exception):
     pass
 
+class AuthenticatedUser:
+    """
+    Utilisateur authentifié reconstruit à partir des claims du token d'accès.
+    
+    Expose les attributs utilisés pour l'autorisation (id, role, enterprise_id,
+    discord_username) ; les routes qui ont besoin de la ligne complète passent
+    par get_current_user_row.
+    """
+    
+    def __init__(self, user_id: str, role: UserRole, enterprise_id: Optional[str], discord_username: str, token_version: int):
+        self.id = user_id
+        self.role = role
+        self.enterprise_id = enterprise_id
+        self.discord_username = discord_username
+        self.token_version = token_version
+        self.is_active = True
+
 # ========== JWT FUNCTIONS ==========
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -52,7 +103,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
     
-    to_encode.update({"exp": expire, "type": "access"})
+    to_encode.update({"exp": expire, "type": "access", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
@@ -60,12 +111,22 @@ def create_refresh_token(data: dict):
     """Créer un token JWT de refresh."""
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(days=JWT_REFRESH_EXPIRATION_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
 def verify_token(token: str) -> TokenData:
-    """Vérifier et décoder un token JWT."""
+    """
+    Vérifier et décoder un token JWT.
+    
+    Les tokens valides sont mis en cache (clé : sha256 du token) jusqu'à leur
+    propre expiration : un même token n'est vérifié qu'une fois par processus.
+    """
+    cache_key = hashlib.sha256(token.encode()).digest()
+    cached = token_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
         user_id: str = payload.get("sub")
@@ -74,98 +135,194 @@ def verify_token(token: str) -> TokenData:
         if user_id is None:
             raise AuthenticationError("Token invalide")
         
-        return TokenData(user_id=user_id, token_type=token_type)
+        token_data = TokenData(
+            user_id=user_id,
+            token_type=token_type,
+            role=payload.get("role"),
+            enterprise_id=payload.get("enterprise_id"),
+            username=payload.get("username"),
+            version=payload.get("ver"),
+            jti=payload.get("jti"),
+            exp=payload.get("exp")
+        )
+        
+        ttl = payload.get("exp", 0) - time.time()
+        if ttl > 0:
+            token_cache.set(cache_key, token_data, ttl=ttl)
+        
+        return token_data
     except JWTError as e:
         logger.error(f"Erreur JWT: {e}")
         raise AuthenticationError("Token invalide ou expiré")
 
 # ========== DISCORD API FUNCTIONS ==========
 
-async def get_discord_user_from_code(code: str) -> Dict[str, Any]:
-    """Échanger le code Discord contre les données utilisateur."""
+def _translate_discord_error(e: Exception, context: str) -> Exception:
+    """Convertir une erreur d'appel Discord en erreur d'authentification."""
+    if isinstance(e, (DeadlineExceeded, DiscordOAuthError)):
+        return e
+    if isinstance(e, DiscordRateLimitError):
+        logger.error(f"Limite de débit Discord ({context}): {e}")
+        return DiscordUnavailableError("Discord limite temporairement les connexions")
+    if isinstance(e, CircuitOpenError):
+        logger.error(f"Discord indisponible ({context}): {e}")
+        return DiscordUnavailableError("Discord est temporairement indisponible")
+    if isinstance(e, httpx.TimeoutException):
+        logger.error(f"Délai dépassé lors de l'appel Discord ({context}): {e}")
+        if deadline_exceeded():
+            return DeadlineExceeded()
+        return DiscordUnavailableError("Discord n'a pas répondu à temps")
+    if isinstance(e, httpx.RequestError):
+        logger.error(f"Erreur réseau Discord ({context}): {e}")
+        return DiscordOAuthError("Erreur de communication avec Discord")
+    logger.error(f"Erreur inattendue Discord OAuth ({context}): {e}")
+    return DiscordOAuthError("Erreur interne lors de l'authentification Discord")
+
+async def exchange_discord_code(code: str) -> str:
+    """Échanger le code Discord contre un access token."""
+    token_data = {
+        "client_id": DISCORD_CLIENT_ID,
+        "client_secret": DISCORD_CLIENT_SECRET,
+        "grant_type": "authorization_code",
+        "code": code,
+        "redirect_uri": DISCORD_REDIRECT_URI,
+    }
+    
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    
     try:
-        async with httpx.AsyncClient() as client:
-            # 1. Échanger le code contre un access token
-            token_data = {
-                "client_id": DISCORD_CLIENT_ID,
-                "client_secret": DISCORD_CLIENT_SECRET,
-                "grant_type": "authorization_code",
-                "code": code,
-                "redirect_uri": DISCORD_REDIRECT_URI,
-            }
-            
-            headers = {"Content-Type": "application/x-www-form-urlencoded"}
-            
-            token_response = await client.post(
-                DISCORD_OAUTH_URL,
-                data=token_data,
-                headers=headers
-            )
-            
-            if token_response.status_code != 200:
-                logger.error(f"Erreur token Discord: {token_response.status_code} - {token_response.text}")
-                raise DiscordOAuthError("Erreur lors de l'échange du code Discord")
-            
-            token_json = token_response.json()
-            access_token = token_json.get("access_token")
-            
-            if not access_token:
-                raise DiscordOAuthError("Access token Discord manquant")
-            
-            # 2. Récupérer les données utilisateur
-            user_headers = {"Authorization": f"Bearer {access_token}"}
-            
-            user_response = await client.get(DISCORD_USER_URL, headers=user_headers)
-            
-            if user_response.status_code != 200:
-                logger.error(f"Erreur utilisateur Discord: {user_response.status_code}")
-                raise DiscordOAuthError("Erreur lors de la récupération des données utilisateur Discord")
-            
-            user_data = user_response.json()
-            
-            # 3. Récupérer les guilds/serveurs de l'utilisateur
-            guilds_response = await client.get(DISCORD_GUILDS_URL, headers=user_headers)
-            guilds_data = []
-            
-            if guilds_response.status_code == 200:
-                guilds_data = guilds_response.json()
-            
-            user_data["guilds"] = guilds_data
-            user_data["access_token"] = access_token
-            
-            return user_data
-            
-    except httpx.RequestError as e:
-        logger.error(f"Erreur réseau Discord: {e}")
-        raise DiscordOAuthError("Erreur de communication avec Discord")
+        token_response = await discord_client.post(
+            DISCORD_OAUTH_URL,
+            data=token_data,
+            headers=headers
+        )
+        
+        if token_response.status_code != 200:
+            logger.error(f"Erreur token Discord: {token_response.status_code} - {token_response.text}")
+            raise DiscordOAuthError("Erreur lors de l'échange du code Discord")
+        
+        access_token = token_response.json().get("access_token")
+        
+        if not access_token:
+            raise DiscordOAuthError("Access token Discord manquant")
+        
+        return access_token
+    except Exception as e:
+        raise _translate_discord_error(e, "échange du code")
+
+async def get_discord_profile(access_token: str) -> Dict[str, Any]:
+    """Récupérer le profil Discord de l'utilisateur."""
+    try:
+        user_response = await discord_client.get(
+            DISCORD_USER_URL, headers={"Authorization": f"Bearer {access_token}"}
+        )
+        
+        if user_response.status_code != 200:
+            logger.error(f"Erreur utilisateur Discord: {user_response.status_code}")
+            raise DiscordOAuthError("Erreur lors de la récupération des données utilisateur Discord")
+        
+        return user_response.json()
+    except Exception as e:
+        raise _translate_discord_error(e, "profil")
+
+async def get_discord_guilds(access_token: str) -> List[Dict[str, Any]]:
+    """Récupérer les guilds/serveurs de l'utilisateur (liste vide en cas d'échec)."""
+    try:
+        guilds_response = await discord_client.get(
+            DISCORD_GUILDS_URL, headers={"Authorization": f"Bearer {access_token}"}
+        )
+        
+        if guilds_response.status_code == 200:
+            return guilds_response.json()
+        
+        logger.warning(f"Guilds Discord indisponibles: {guilds_response.status_code}")
+        return []
     except Exception as e:
-        logger.error(f"Erreur inattendue Discord OAuth: {e}")
-        raise DiscordOAuthError("Erreur interne lors de l'authentification Discord")
+        raise _translate_discord_error(e, "guilds")
+
+async def get_discord_user_from_code(code: str) -> Dict[str, Any]:
+    """Échanger le code Discord contre les données utilisateur."""
+    # 1. Échanger le code contre un access token
+    access_token = await exchange_discord_code(code)
+    
+    # 2. Profil et guilds sont indépendants : récupérés en parallèle
+    user_data, guilds_data = await asyncio.gather(
+        get_discord_profile(access_token),
+        get_discord_guilds(access_token)
+    )
+    
+    user_data["guilds"] = guilds_data
+    user_data["access_token"] = access_token
+    
+    return user_data
+
+def invalidate_member_roles(guild_id: str, user_id: Optional[str] = None) -> int:
+    """Invalider les rôles en cache d'un membre, ou de toute la guild si user_id est omis."""
+    guild_id = str(guild_id)
+    if user_id is not None:
+        member_key = (guild_id, str(user_id))
+        return member_roles_cache.invalidate_where(lambda key: key == member_key)
+    return member_roles_cache.invalidate_where(lambda key: key[0] == guild_id)
+
+def _stale_member(key, reason: str) -> Optional[Dict[str, Any]]:
+    """Rôles en cache (même expirés) quand Discord ne répond pas correctement."""
+    roles = member_roles_cache.get_stale(key, _NOT_CACHED)
+    if roles is _NOT_CACHED:
+        raise DiscordUnavailableError(f"Rôles du membre {key[1]} indisponibles: {reason}")
+    logger.warning(f"Rôles du membre {key[1]} (guild {key[0]}) servis depuis le cache expiré: {reason}")
+    return None if roles is None else {"roles": roles}
 
 async def get_discord_guild_member(guild_id: str, user_id: str) -> Optional[Dict[str, Any]]:
-    """Récupérer les informations d'un membre dans une guild Discord."""
+    """
+    Récupérer les rôles d'un membre dans une guild Discord.
+    
+    Les rôles sont mis en cache par (guild_id, user_id), y compris l'absence
+    du membre (404) ; en cas d'erreur Discord, la dernière valeur connue est
+    servie même expirée. Sans valeur connue, DiscordUnavailableError est levée
+    pour que l'appelant conserve le rôle enregistré plutôt que de le rétrograder.
+    """
+    key = (str(guild_id), str(user_id))
+    roles = member_roles_cache.get(key, _NOT_CACHED)
+    if roles is not _NOT_CACHED:
+        return None if roles is None else {"roles": roles}
+    
     if not DISCORD_BOT_TOKEN:
         logger.warning("DISCORD_BOT_TOKEN non configuré - impossible de récupérer les rôles")
         return None
     
     try:
-        async with httpx.AsyncClient() as client:
-            headers = {"Authorization": f"Bot {DISCORD_BOT_TOKEN}"}
-            url = f"{DISCORD_API_BASE}/guilds/{guild_id}/members/{user_id}"
-            
-            response = await client.get(url, headers=headers)
-            
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == 404:
-                logger.info(f"Utilisateur {user_id} non trouvé dans la guild {guild_id}")
-                return None
-            else:
-                logger.error(f"Erreur API Discord: {response.status_code} - {response.text}")
-                return None
+        headers = {"Authorization": f"Bot {DISCORD_BOT_TOKEN}"}
+        url = f"{DISCORD_API_BASE}/guilds/{guild_id}/members/{user_id}"
+        
+        response = await discord_client.get(url, headers=headers)
+        
+        if response.status_code == 200:
+            roles = list(response.json().get("roles", []))
+            member_roles_cache.set(key, roles)
+            return {"roles": roles}
+        elif response.status_code == 404:
+            logger.info(f"Utilisateur {user_id} non trouvé dans la guild {guild_id}")
+            member_roles_cache.set(key, None, ttl=DISCORD_MEMBER_CACHE_NEGATIVE_TTL)
+            return None
+        else:
+            logger.error(f"Erreur API Discord: {response.status_code} - {response.text}")
+            return _stale_member(key, f"HTTP {response.status_code}")
+    except (DeadlineExceeded, DiscordUnavailableError):
+        raise
+    except DiscordRateLimitError as e:
+        logger.error(f"Membre {user_id} (guild {guild_id}) non récupéré: {e}")
+        return _stale_member(key, "limite de débit")
+    except CircuitOpenError as e:
+        logger.warning(f"Membre {user_id} (guild {guild_id}) non récupéré: {e}")
+        return _stale_member(key, "disjoncteur ouvert")
+    except httpx.TimeoutException:
+        if deadline_exceeded():
+            raise DeadlineExceeded()
+        logger.error(f"Délai dépassé lors de la récupération du membre {user_id} (guild {guild_id})")
+        return _stale_member(key, "délai dépassé")
     except Exception as e:
         logger.error(f"Erreur lors de la récupération du membre Discord: {e}")
-        return None
+        return _stale_member(key, str(e))
 
 def determine_user_role(member_data: Optional[Dict], enterprise: Optional[Enterprise]) -> UserRole:
     """Déterminer le rôle d'un utilisateur basé sur ses rôles Discord."""
@@ -188,60 +345,102 @@ def determine_user_role(member_data: Optional[Dict], enterprise: Optional[Enterp
 
 # ========== DATABASE FUNCTIONS ==========
 
-def get_or_create_user(db: Session, discord_user_data: Dict[str, Any], enterprise: Optional[Enterprise] = None) -> User:
-    """Récupérer ou créer un utilisateur à partir des données Discord."""
+async def get_or_create_user(db: AsyncSession, discord_user_data: Dict[str, Any], enterprise: Optional[Enterprise] = None) -> User:
+    """
+    Créer ou mettre à jour un utilisateur à partir des données Discord.
+    
+    Un seul INSERT ... ON DUPLICATE KEY UPDATE (MySQL) ou ON CONFLICT DO UPDATE
+    ... RETURNING (SQLite), sans course entre deux premières connexions
+    simultanées. last_login est écrit en différé (utils/last_login.py).
+    Un changement d'entreprise incrémente token_version : les tokens émis
+    avant (claim enterprise_id du mode sans état) sont refusés.
+    """
     discord_id = str(discord_user_data["id"])
+    logged_in_at = datetime.now(timezone.utc)
     
-    # Chercher l'utilisateur existant
-    user = db.query(User).filter(User.discord_id == discord_id).first()
+    profile = {
+        "discord_username": discord_user_data.get("username", "Unknown"),
+        "email": discord_user_data.get("email"),
+        "avatar_url": f"https://cdn.discordapp.com/avatars/{discord_id}/{discord_user_data.get('avatar', '')}.png" if discord_user_data.get('avatar') else None,
+    }
+    if enterprise:
+        profile["enterprise_id"] = enterprise.id
     
-    if user:
-        # Mettre à jour les données existantes
-        user.discord_username = discord_user_data.get("username", "Unknown")
-        user.email = discord_user_data.get("email")
-        user.avatar_url = f"https://cdn.discordapp.com/avatars/{discord_id}/{discord_user_data.get('avatar', '')}.png" if discord_user_data.get('avatar') else None
-        user.last_login = datetime.now(timezone.utc)
-        
+    values = {
+        **profile,
+        "discord_id": discord_id,
+        "enterprise_id": enterprise.id if enterprise else None,
+        "role": UserRole.EMPLOYE,  # Rôle par défaut
+    }
+    
+    if db.bind.dialect.name == "mysql":
+        users = User.__table__
+        statement = mysql_insert(User).values(**values)
+        # ON DUPLICATE KEY se déclenche aussi sur l'index unique de l'email :
+        # seule la ligne du même discord_id est modifiée
+        same_user = users.c.discord_id == statement.inserted.discord_id
+        assignments = {}
         if enterprise:
-            user.enterprise_id = enterprise.id
+            # Évalué avant l'affectation de enterprise_id (MySQL applique les affectations dans l'ordre)
+            assignments["token_version"] = case(
+                (and_(same_user, users.c.enterprise_id.is_distinct_from(statement.inserted.enterprise_id)), users.c.token_version + 1),
+                else_=users.c.token_version
+            )
+        assignments.update({
+            key: case((same_user, statement.inserted[key]), else_=users.c[key])
+            for key in [*profile, "updated_at"]
+        })
+        statement = statement.on_duplicate_key_update(assignments)
+        await db.execute(statement)
         
-        db.commit()
-        db.refresh(user)
-        return user
-    else:
-        # Créer un nouvel utilisateur
-        new_user = User(
-            discord_id=discord_id,
-            discord_username=discord_user_data.get("username", "Unknown"),
-            email=discord_user_data.get("email"),
-            avatar_url=f"https://cdn.discordapp.com/avatars/{discord_id}/{discord_user_data.get('avatar', '')}.png" if discord_user_data.get('avatar') else None,
-            enterprise_id=enterprise.id if enterprise else None,
-            role=UserRole.EMPLOYE,  # Rôle par défaut
-            last_login=datetime.now(timezone.utc)
+        # Pas de RETURNING sur MySQL : relecture par l'index unique discord_id
+        result = await db.execute(
+            select(User)
+            .where(User.discord_id == discord_id)
+            .execution_options(populate_existing=True)
         )
-        
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-        return new_user
-
-def find_user_enterprise(db: Session, discord_user_data: Dict[str, Any]) -> Optional[Enterprise]:
-    """Trouver l'entreprise d'un utilisateur basé sur ses guilds Discord."""
-    user_guilds = discord_user_data.get("guilds", [])
-    
-    for guild in user_guilds:
-        guild_id = str(guild["id"])
-        enterprise = db.query(Enterprise).filter(Enterprise.discord_guild_id == guild_id).first()
+        user = result.scalar_one_or_none()
+        if user is None:
+            await db.rollback()
+            raise DiscordOAuthError("Adresse e-mail déjà associée à un autre compte")
+    else:
+        statement = sqlite_insert(User).values(**values)
+        assignments = {**profile, "updated_at": logged_in_at}
         if enterprise:
-            return enterprise
+            assignments["token_version"] = case(
+                (User.enterprise_id.is_distinct_from(statement.excluded.enterprise_id), User.token_version + 1),
+                else_=User.token_version
+            )
+        statement = statement.on_conflict_do_update(
+            index_elements=[User.discord_id],
+            set_=assignments
+        ).returning(User)
+        try:
+            result = await db.execute(statement, execution_options={"populate_existing": True})
+        except IntegrityError:
+            # Conflit sur l'index unique de l'email (seul discord_id est traité par ON CONFLICT)
+            await db.rollback()
+            raise DiscordOAuthError("Adresse e-mail déjà associée à un autre compte")
+        user = result.scalar_one()
     
-    return None
+    await db.commit()
+    
+    # Version éventuellement incrémentée : effective immédiatement dans ce processus
+    token_versions.record(user.id, user.token_version or 0, user.is_active)
+    last_login_buffer.record(user.id, logged_in_at)
+    set_committed_value(user, "last_login", logged_in_at)
+    return user
+
+async def find_user_enterprise(db: AsyncSession, discord_user_data: Dict[str, Any]) -> Optional[EnterpriseSnapshot]:
+    """Trouver l'entreprise d'un utilisateur basé sur ses guilds Discord."""
+    guild_ids = [str(guild["id"]) for guild in discord_user_data.get("guilds", [])]
+    return await enterprise_index.resolve(db, guild_ids)
 
 # ========== AUTHENTICATION DEPENDENCIES ==========
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Dépendance pour récupérer l'utilisateur actuel à partir du token JWT."""
     
@@ -260,10 +459,35 @@ async def get_current_user(
     except AuthenticationError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    # Révocations : contrôle en mémoire, relu périodiquement depuis revoked_tokens
+    await revocations.ensure_fresh()
+    if revocations.is_revoked(token_data.jti):
+        raise credentials_exception
+    
+    if JWT_STATELESS_AUTH and token_data.role is not None and token_data.version is not None:
+        # Claims du token : pas de requête SQL, seulement le contrôle de version en mémoire
+        await token_versions.ensure_fresh()
+        if not token_versions.is_valid(token_data.user_id, token_data.version):
+            raise credentials_exception
+        
+        try:
+            role = UserRole(token_data.role)
+        except ValueError:
+            raise credentials_exception
+        
+        set_request_user(token_data.user_id)
+        return AuthenticatedUser(
+            token_data.user_id, role, token_data.enterprise_id,
+            token_data.username or "", token_data.version
+        )
+    
+    user = await db.get(User, token_data.user_id)
     if user is None or not user.is_active:
         raise credentials_exception
     
+    # Routage read-your-writes des sessions de lecture
+    set_request_user(user.id)
+    
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
@@ -272,6 +496,23 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+async def get_current_user_row(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Dépendance pour les routes qui ont besoin de la ligne User complète."""
+    if isinstance(current_user, User):
+        return current_user
+    
+    user = await db.get(User, current_user.id)
+    if user is None or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
 # ========== ROLE-BASED ACCESS CONTROL ==========
 
 class RequireRole:
@@ -294,6 +535,21 @@ require_patron_or_staff = RequireRole([UserRole.PATRON, UserRole.CO_PATRON, User
 require_patron = RequireRole([UserRole.PATRON, UserRole.CO_PATRON])
 require_dotation_access = RequireRole([UserRole.PATRON, UserRole.CO_PATRON, UserRole.STAFF, UserRole.DOT])
 
+# ========== TOKEN REVOCATION ==========
+
+async def revoke_token(db: AsyncSession, token_data: TokenData) -> bool:
+    """Révoquer un token décodé jusqu'à son expiration (False s'il l'était déjà ou n'est pas révocable)."""
+    if not token_data.jti or not token_data.exp:
+        return False
+    
+    return await revocations.revoke(
+        db,
+        token_data.jti,
+        datetime.fromtimestamp(token_data.exp, tz=timezone.utc),
+        user_id=token_data.user_id,
+        token_type=token_data.token_type
+    )
+
 # ========== UTILITY FUNCTIONS ==========
 
 def generate_discord_oauth_url(state: Optional[str] = None) -> str:
@@ -316,7 +572,14 @@ def create_tokens_for_user(user: User) -> Dict[str, str]:
     """Créer les tokens JWT pour un utilisateur."""
     token_data = {"sub": user.id}
     
-    access_token = create_access_token(token_data)
+    # Claims d'autorisation (utilisés en mode JWT_STATELESS_AUTH)
+    access_token = create_access_token({
+        **token_data,
+        "role": user.role.value,
+        "enterprise_id": user.enterprise_id,
+        "username": user.discord_username,
+        "ver": user.token_version or 0,
+    })
     refresh_token = create_refresh_token(token_data)
     
     return {
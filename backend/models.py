@@ -1,13 +1,15 @@
 from sqlalchemy import (
-    Column, String, Integer, Float, DateTime, Boolean, Text, 
-    ForeignKey, JSON, Enum, BigInteger, Date, Time
+    Column, String, Integer, Float, Boolean, Text, 
+    ForeignKey, JSON, Enum, BigInteger, Date, Time, Index
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime, timezone
-import uuid
 import enum
 
+from utils.ids import CompactUUID, new_id
+from utils.db_types import UTCDateTime
+
 Base = declarative_base()
 
 class UserRole(enum.Enum):
@@ -40,17 +42,19 @@ class DocumentType(enum.Enum):
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(CompactUUID, primary_key=True, default=new_id)
     discord_id = Column(String(20), unique=True, nullable=False, index=True)
     discord_username = Column(String(100), nullable=False)
     email = Column(String(100), unique=True, nullable=True)
     avatar_url = Column(String(500), nullable=True)
     role = Column(Enum(UserRole), default=UserRole.EMPLOYE, nullable=False)
-    enterprise_id = Column(String(36), ForeignKey("enterprises.id"), nullable=True)
+    enterprise_id = Column(CompactUUID, ForeignKey("enterprises.id"), nullable=True)
     is_active = Column(Boolean, default=True)
-    last_login = Column(DateTime(timezone=True), nullable=True)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    last_login = Column(UTCDateTime, nullable=True)
+    # Incrémenté à chaque changement de rôle : invalide les tokens porteurs de l'ancien rôle
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
     # Relations
     enterprise = relationship("Enterprise", back_populates="users")
@@ -59,12 +63,12 @@ class User(Base):
     documents = relationship("Document", back_populates="uploaded_by_user")
     blanchiment_operations = relationship("BlanchimentOperation", back_populates="created_by_user")
     archives = relationship("Archive", back_populates="created_by_user")
-    audit_logs = relationship("AuditLog", back_populates="user")
+    audit_logs = relationship("AuditLog", back_populates="user", primaryjoin="User.id == foreign(AuditLog.user_id)")
 
 class Enterprise(Base):
     __tablename__ = "enterprises"
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(CompactUUID, primary_key=True, default=new_id)
     name = Column(String(100), nullable=False, unique=True)
     discord_guild_id = Column(String(20), unique=True, nullable=False)
     main_guild_role_id = Column(String(20), nullable=True)
@@ -74,8 +78,8 @@ class Enterprise(Base):
     dot_role_id = Column(String(20), nullable=True)
     member_role_id = Column(String(20), nullable=True)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
     # Relations
     users = relationship("User", back_populates="enterprise")
@@ -90,10 +94,13 @@ class Enterprise(Base):
 
 class DotationReport(Base):
     __tablename__ = "dotation_reports"
+    __table_args__ = (
+        Index("ix_dotation_reports_enterprise_created", "enterprise_id", "created_at", "id"),
+    )
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    enterprise_id = Column(String(36), ForeignKey("enterprises.id"), nullable=False)
-    created_by = Column(String(36), ForeignKey("users.id"), nullable=False)
+    id = Column(CompactUUID, primary_key=True, default=new_id)
+    enterprise_id = Column(CompactUUID, ForeignKey("enterprises.id"), nullable=False)
+    created_by = Column(CompactUUID, ForeignKey("users.id"), nullable=False)
     title = Column(String(200), nullable=False)
     period = Column(String(50), nullable=True)  # "2024-Q1", "Janvier 2024", etc.
     status = Column(Enum(ArchiveStatus), default=ArchiveStatus.EN_ATTENTE)
@@ -102,19 +109,22 @@ class DotationReport(Base):
     total_primes = Column(Float, default=0.0)
     total_employees = Column(Integer, default=0)
     notes = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
     # Relations
     enterprise = relationship("Enterprise", back_populates="dotation_reports")
     created_by_user = relationship("User", back_populates="dotation_reports")
-    rows = relationship("DotationRow", back_populates="report", cascade="all, delete-orphan")
+    rows = relationship("DotationRow", back_populates="report", cascade="all, delete-orphan", passive_deletes=True)
 
 class DotationRow(Base):
     __tablename__ = "dotation_rows"
+    __table_args__ = (
+        Index("ix_dotation_rows_report_id", "report_id"),
+    )
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    report_id = Column(String(36), ForeignKey("dotation_reports.id"), nullable=False)
+    id = Column(CompactUUID, primary_key=True, default=new_id)
+    report_id = Column(CompactUUID, ForeignKey("dotation_reports.id", ondelete="CASCADE"), nullable=False)
     employee_name = Column(String(100), nullable=False)
     grade = Column(String(50), nullable=True)
     run = Column(Float, default=0.0)
@@ -123,7 +133,7 @@ class DotationRow(Base):
     ca_total = Column(Float, default=0.0)
     salaire = Column(Float, default=0.0)
     prime = Column(Float, default=0.0)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
     
     # Relations
     report = relationship("DotationReport", back_populates="rows")
@@ -132,21 +142,27 @@ class DotationRow(Base):
 
 class TaxBracket(Base):
     __tablename__ = "tax_brackets"
+    __table_args__ = (
+        Index("ix_tax_brackets_type_active_min", "bracket_type", "is_active", "min_amount"),
+    )
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(CompactUUID, primary_key=True, default=new_id)
     bracket_type = Column(String(20), nullable=False)  # "revenus" ou "patrimoine"
     min_amount = Column(Float, nullable=False)
     max_amount = Column(Float, nullable=True)  # NULL pour la dernière tranche
     tax_rate = Column(Float, nullable=False)  # Taux en décimal (0.10 pour 10%)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
     
 class TaxDeclaration(Base):
     __tablename__ = "tax_declarations"
+    __table_args__ = (
+        Index("ix_tax_declarations_enterprise_created", "enterprise_id", "created_at", "id"),
+    )
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    enterprise_id = Column(String(36), ForeignKey("enterprises.id"), nullable=False)
-    user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+    id = Column(CompactUUID, primary_key=True, default=new_id)
+    enterprise_id = Column(CompactUUID, ForeignKey("enterprises.id"), nullable=False)
+    user_id = Column(CompactUUID, ForeignKey("users.id"), nullable=False)
     period = Column(String(50), nullable=False)  # "2024-Q1"
     revenus_totaux = Column(Float, default=0.0)
     revenus_imposables = Column(Float, default=0.0)
@@ -157,8 +173,8 @@ class TaxDeclaration(Base):
     impot_total = Column(Float, default=0.0)
     status = Column(Enum(ArchiveStatus), default=ArchiveStatus.EN_ATTENTE)
     notes = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
     # Relations
     enterprise = relationship("Enterprise", back_populates="tax_declarations")
@@ -168,10 +184,13 @@ class TaxDeclaration(Base):
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        Index("ix_documents_enterprise_created", "enterprise_id", "created_at"),
+    )
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    enterprise_id = Column(String(36), ForeignKey("enterprises.id"), nullable=False)
-    uploaded_by = Column(String(36), ForeignKey("users.id"), nullable=False)
+    id = Column(CompactUUID, primary_key=True, default=new_id)
+    enterprise_id = Column(CompactUUID, ForeignKey("enterprises.id"), nullable=False)
+    uploaded_by = Column(CompactUUID, ForeignKey("users.id"), nullable=False)
     filename = Column(String(255), nullable=False)
     original_filename = Column(String(255), nullable=False)
     file_path = Column(String(500), nullable=False)
@@ -179,7 +198,7 @@ class Document(Base):
     mime_type = Column(String(100), nullable=False)
     document_type = Column(Enum(DocumentType), nullable=False)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
     
     # Relations
     enterprise = relationship("Enterprise", back_populates="documents")
@@ -190,23 +209,26 @@ class Document(Base):
 class BlanchimentSetting(Base):
     __tablename__ = "blanchiment_settings"
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    enterprise_id = Column(String(36), ForeignKey("enterprises.id"), nullable=False)
+    id = Column(CompactUUID, primary_key=True, default=new_id)
+    enterprise_id = Column(CompactUUID, ForeignKey("enterprises.id"), nullable=False)
     is_enabled = Column(Boolean, default=True)
     use_global_settings = Column(Boolean, default=True)
     perc_entreprise = Column(Float, default=15.0)
     perc_groupe = Column(Float, default=5.0)
-    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    updated_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
     # Relations
     enterprise = relationship("Enterprise", back_populates="blanchiment_settings")
 
 class BlanchimentOperation(Base):
     __tablename__ = "blanchiment_operations"
+    __table_args__ = (
+        Index("ix_blanchiment_operations_enterprise_created", "enterprise_id", "created_at"),
+    )
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    enterprise_id = Column(String(36), ForeignKey("enterprises.id"), nullable=False)
-    created_by = Column(String(36), ForeignKey("users.id"), nullable=False)
+    id = Column(CompactUUID, primary_key=True, default=new_id)
+    enterprise_id = Column(CompactUUID, ForeignKey("enterprises.id"), nullable=False)
+    created_by = Column(CompactUUID, ForeignKey("users.id"), nullable=False)
     status = Column(Enum(BlanchimentStatus), default=BlanchimentStatus.EN_COURS)
     date_recu = Column(Date, nullable=True)
     date_rendu = Column(Date, nullable=True)
@@ -218,8 +240,8 @@ class BlanchimentOperation(Base):
     somme = Column(Float, nullable=False)
     entreprise_perc = Column(Float, nullable=False)
     groupe_perc = Column(Float, nullable=False)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
     # Relations
     enterprise = relationship("Enterprise", back_populates="blanchiment_operations")
@@ -229,10 +251,13 @@ class BlanchimentOperation(Base):
 
 class Archive(Base):
     __tablename__ = "archives"
+    __table_args__ = (
+        Index("ix_archives_enterprise_created", "enterprise_id", "created_at"),
+    )
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    enterprise_id = Column(String(36), ForeignKey("enterprises.id"), nullable=False)
-    created_by = Column(String(36), ForeignKey("users.id"), nullable=False)
+    id = Column(CompactUUID, primary_key=True, default=new_id)
+    enterprise_id = Column(CompactUUID, ForeignKey("enterprises.id"), nullable=False)
+    created_by = Column(CompactUUID, ForeignKey("users.id"), nullable=False)
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=True)
     archive_type = Column(String(50), nullable=False)  # "Dotation", "Impot", "Blanchiment", etc.
@@ -241,8 +266,8 @@ class Archive(Base):
     period = Column(String(50), nullable=True)
     reference_id = Column(String(36), nullable=True)  # ID de l'objet source
     archive_metadata = Column(JSON, nullable=True)  # Données additionnelles JSON
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
     # Relations
     enterprise = relationship("Enterprise", back_populates="archives")
@@ -253,22 +278,30 @@ class Archive(Base):
 class GradeRule(Base):
     __tablename__ = "grade_rules"
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(CompactUUID, primary_key=True, default=new_id)
     grade_name = Column(String(50), nullable=False, unique=True)
     salaire_base = Column(Float, default=0.0)
     prime_base = Column(Float, default=0.0)
     ca_multiplier = Column(Float, default=0.35)  # 35% du CA par défaut
     prime_multiplier = Column(Float, default=0.08)  # 8% du CA par défaut
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
 
 # ========== AUDIT & LOGS ==========
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # Index de l'API d'audit : tri (created_at, id) après chaque filtre
+        Index("ix_audit_logs_created_id", "created_at", "id"),
+        Index("ix_audit_logs_user_created", "user_id", "created_at"),
+        Index("ix_audit_logs_table_record_created", "table_name", "record_id", "created_at"),
+        Index("ix_audit_logs_action_created", "action", "created_at"),
+    )
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String(36), ForeignKey("users.id"), nullable=True)
+    id = Column(CompactUUID, primary_key=True, default=new_id)
+    # Sans clé étrangère : non supportée par les tables partitionnées MySQL
+    user_id = Column(CompactUUID, nullable=True)
     action = Column(String(100), nullable=False)  # "CREATE", "UPDATE", "DELETE", "LOGIN", etc.
     table_name = Column(String(50), nullable=True)
     record_id = Column(String(36), nullable=True)
@@ -276,22 +309,39 @@ class AuditLog(Base):
     new_values = Column(JSON, nullable=True)
     ip_address = Column(String(45), nullable=True)
     user_agent = Column(String(500), nullable=True)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    # Colonne de partitionnement (partitions mensuelles sur MySQL) : incluse dans la clé primaire
+    created_at = Column(UTCDateTime, primary_key=True, default=lambda: datetime.now(timezone.utc))
     
     # Relations
-    user = relationship("User", back_populates="audit_logs")
+    user = relationship("User", back_populates="audit_logs", primaryjoin="foreign(AuditLog.user_id) == User.id")
 
 # ========== CONFIGURATION DISCORD ==========
 
 class DiscordConfig(Base):
     __tablename__ = "discord_configs"
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(CompactUUID, primary_key=True, default=new_id)
     guild_id = Column(String(20), unique=True, nullable=False)
     guild_name = Column(String(100), nullable=False)
     client_id = Column(String(50), nullable=True)
     webhook_url = Column(String(500), nullable=True)
     sync_enabled = Column(Boolean, default=True)
-    last_sync = Column(DateTime(timezone=True), nullable=True)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
\ No newline at end of file
+    last_sync = Column(UTCDateTime, nullable=True)
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+# ========== RÉVOCATION DES TOKENS ==========
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+    __table_args__ = (
+        # Relecture incrémentale par les workers et purge des révocations expirées
+        Index("ix_revoked_tokens_revoked_at", "revoked_at"),
+        Index("ix_revoked_tokens_expires_at", "expires_at"),
+    )
+    
+    jti = Column(String(32), primary_key=True)
+    user_id = Column(CompactUUID, nullable=True)
+    token_type = Column(String(10), nullable=False, default="access")
+    expires_at = Column(UTCDateTime, nullable=False)
+    revoked_at = Column(UTCDateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,215 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, Optional, Set
+from datetime import datetime, timezone
+import json
+import os
+import logging
+
+from database import get_async_read_db, AsyncReadSessionLocal
+from models import User, AuditLog
+from schemas import PaginationParams, PaginatedResponse, AuditLogResponse, AuditHistoryResponse
+from auth import require_patron_or_staff
+from utils.audit import serialize_value
+from utils.audit_archive import audit_archive
+from utils.pagination import paginate, InvalidCursorError
+
+router = APIRouter(prefix="/api/audit", tags=["Audit"])
+logger = logging.getLogger(__name__)
+
+# Nombre maximal d'entrées renvoyées par l'historique d'un enregistrement
+AUDIT_HISTORY_LIMIT = int(os.getenv("AUDIT_HISTORY_LIMIT", "1000"))
+# Lignes lues par aller-retour lors d'un export NDJSON
+AUDIT_EXPORT_FETCH_SIZE = 1000
+
+_COLUMNS = tuple(AuditLog.__table__.c)
+
+def _utc(value: datetime) -> datetime:
+    # MySQL rend des datetimes naïfs (UTC), les archives des datetimes "aware"
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+def enterprise_users(current_user: User):
+    """Sous-requête des utilisateurs de l'entreprise de l'utilisateur courant."""
+    return select(User.id).where(User.enterprise_id == current_user.enterprise_id)
+
+def build_audit_query(
+    query,
+    current_user: User,
+    user_id: Optional[str] = None,
+    table_name: Optional[str] = None,
+    record_id: Optional[str] = None,
+    action: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None
+):
+    """
+    Appliquer le périmètre de l'utilisateur et les filtres à une requête sur audit_logs.
+
+    Chaque filtre correspond au préfixe d'un index terminé par created_at ;
+    les bornes de date limitent en plus les partitions mensuelles parcourues.
+    """
+    # Filtrer par entreprise de l'utilisateur (actions de ses membres)
+    if current_user.enterprise_id:
+        query = query.where(AuditLog.user_id.in_(enterprise_users(current_user)))
+
+    if user_id:
+        query = query.where(AuditLog.user_id == user_id)
+    if table_name:
+        query = query.where(AuditLog.table_name == table_name)
+    if record_id:
+        query = query.where(AuditLog.record_id == record_id)
+    if action:
+        query = query.where(AuditLog.action == action.upper())
+    if date_from:
+        query = query.where(AuditLog.created_at >= date_from)
+    if date_to:
+        query = query.where(AuditLog.created_at < date_to)
+
+    return query
+
+@router.get("", response_model=PaginatedResponse, summary="Consulter le journal d'audit")
+async def list_audit_logs(
+    pagination: PaginationParams = Depends(),
+    user_id: Optional[str] = Query(None, description="Auteur des actions"),
+    table_name: Optional[str] = Query(None, alias="table", description="Table concernée"),
+    record_id: Optional[str] = Query(None, description="Enregistrement concerné"),
+    action: Optional[str] = Query(None, description="Type d'action (CREATE, UPDATE, DELETE, ...)"),
+    date_from: Optional[datetime] = Query(None, description="Début de période (inclus)"),
+    date_to: Optional[datetime] = Query(None, description="Fin de période (exclue)"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(require_patron_or_staff)
+):
+    """
+    Lister les entrées d'audit, des plus récentes aux plus anciennes.
+
+    - **user_id / table / record_id / action**: Filtres exacts
+    - **date_from / date_to**: Période sur created_at
+    - **cursor**: Reprendre après le `next_cursor` de la page précédente (pagination par curseur)
+
+    Le total n'est jamais calculé (table volumineuse) : parcourir les pages
+    avec `next_cursor`. Les entrées archivées hors de la base sont
+    consultables par `/api/audit/history/{table}/{record_id}`.
+    """
+    try:
+        query = build_audit_query(
+            select(AuditLog), current_user, user_id, table_name, record_id, action, date_from, date_to
+        )
+
+        entries, _, next_cursor = await paginate(
+            db, query, AuditLog, pagination.model_copy(update={"include_total": False}),
+            count_key=None
+        )
+
+        return PaginatedResponse(
+            items=[AuditLogResponse.from_orm(entry) for entry in entries],
+            total=None,
+            page=pagination.page,
+            limit=pagination.limit,
+            total_pages=None,
+            next_cursor=next_cursor
+        )
+
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors de la consultation du journal d'audit: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erreur lors de la consultation du journal d'audit"
+        )
+
+@router.get("/export", summary="Exporter le journal d'audit (NDJSON)")
+async def export_audit_logs(
+    user_id: Optional[str] = Query(None, description="Auteur des actions"),
+    table_name: Optional[str] = Query(None, alias="table", description="Table concernée"),
+    record_id: Optional[str] = Query(None, description="Enregistrement concerné"),
+    action: Optional[str] = Query(None, description="Type d'action (CREATE, UPDATE, DELETE, ...)"),
+    date_from: Optional[datetime] = Query(None, description="Début de période (inclus)"),
+    date_to: Optional[datetime] = Query(None, description="Fin de période (exclue)"),
+    current_user: User = Depends(require_patron_or_staff)
+):
+    """
+    Exporter les entrées d'audit filtrées, une entrée JSON par ligne.
+
+    Les lignes sont lues par un curseur côté serveur et envoyées au fil de
+    l'eau : la mémoire utilisée ne dépend pas du nombre d'entrées.
+    """
+    query = build_audit_query(
+        select(*_COLUMNS), current_user, user_id, table_name, record_id, action, date_from, date_to
+    ).order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
+
+    async def stream_entries():
+        # Session propre au flux : elle vit jusqu'à la dernière ligne envoyée
+        async with AsyncReadSessionLocal() as db:
+            result = await db.stream(query.execution_options(yield_per=AUDIT_EXPORT_FETCH_SIZE))
+            async for partition in result.partitions():
+                # Colonnes JSON sérialisées telles quelles ; serialize_value seulement pour les dates et enums
+                yield "".join(
+                    json.dumps(dict(row._mapping), default=serialize_value, separators=(",", ":"), ensure_ascii=False) + "\n"
+                    for row in partition
+                )
+
+    logger.info(f"Export NDJSON du journal d'audit par {current_user.discord_username}")
+
+    return StreamingResponse(stream_entries(), media_type="application/x-ndjson")
+
+@router.get("/history/{table_name}/{record_id}", response_model=AuditHistoryResponse, summary="Historique d'un enregistrement")
+async def get_record_history(
+    table_name: str,
+    record_id: str,
+    include_archive: bool = Query(True, description="Inclure les entrées archivées hors de la base"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(require_patron_or_staff)
+):
+    """
+    Chronologie complète des actions sur un enregistrement (qui a modifié quoi, et quand).
+
+    Les entrées encore en base (index table, enregistrement, date) sont
+    complétées par celles des segments d'archive qui référencent
+    l'enregistrement ; au plus AUDIT_HISTORY_LIMIT entrées, les plus récentes.
+    """
+    try:
+        query = build_audit_query(select(AuditLog), current_user, table_name=table_name, record_id=record_id)
+        result = await db.scalars(
+            query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(AUDIT_HISTORY_LIMIT)
+        )
+        entries: Dict[str, Any] = {entry.id: AuditLogResponse.from_orm(entry) for entry in result.all()}
+
+        if include_archive:
+            allowed_users: Optional[Set[str]] = None
+            if current_user.enterprise_id:
+                allowed_users = set((await db.scalars(enterprise_users(current_user))).all())
+
+            # Lecture des segments compressés hors de la boucle d'événements
+            for entry in await run_in_threadpool(audit_archive.history, table_name, record_id):
+                if entry["id"] in entries:
+                    continue  # Archivée mais pas encore supprimée de la base
+                if allowed_users is not None and entry["user_id"] not in allowed_users:
+                    continue
+                entries[entry["id"]] = AuditLogResponse(**entry, archived=True)
+
+        items = sorted(entries.values(), key=lambda entry: (_utc(entry.created_at), entry.id))[-AUDIT_HISTORY_LIMIT:]
+
+        return AuditHistoryResponse(
+            table_name=table_name,
+            record_id=record_id,
+            items=items,
+            archived=sum(1 for entry in items if entry.archived)
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture de l'historique de {table_name}:{record_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erreur lors de la lecture de l'historique"
+        )
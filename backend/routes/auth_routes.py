@@ -1,22 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
-from datetime import datetime, timezone
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import datetime
+import asyncio
 import logging
-from typing import Dict, Any
+from typing import Optional
 
-from database import get_db
-from models import User, Enterprise
+from database import get_async_db
+from models import User
 from schemas import (
-    DiscordAuthCallback, AuthResponse, Token, TokenRefresh,
+    DiscordAuthCallback, AuthResponse, Token, TokenRefresh, LogoutRequest,
     UserResponse, BaseResponse, ApiResponse
 )
 from auth import (
     get_discord_user_from_code, get_or_create_user, find_user_enterprise,
     create_tokens_for_user, verify_token, generate_discord_oauth_url,
-    get_current_active_user, get_discord_guild_member, determine_user_role,
-    DiscordOAuthError, AuthenticationError
+    get_current_active_user, get_current_user_row, get_discord_guild_member, determine_user_role,
+    DiscordOAuthError, DiscordUnavailableError, AuthenticationError,
+    revoke_token, security
 )
+from utils.token_versions import token_versions
+from utils.revocation import revocations
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 logger = logging.getLogger(__name__)
@@ -47,7 +53,7 @@ async def discord_auth(request: Request):
 @router.post("/discord/callback", response_model=AuthResponse, summary="Callback Discord OAuth")
 async def discord_callback(
     callback_data: DiscordAuthCallback,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Traiter le callback Discord OAuth et authentifier l'utilisateur.
@@ -56,6 +62,9 @@ async def discord_callback(
     - Créer ou mettre à jour l'utilisateur en base
     - Déterminer l'entreprise et le rôle
     - Générer les tokens JWT
+    
+    Les appels indépendants sont parallélisés : profil et guilds Discord,
+    puis upsert de l'utilisateur et récupération du membre de la guild.
     """
     try:
         # 1. Récupérer les données utilisateur depuis Discord
@@ -72,29 +81,47 @@ async def discord_callback(
         logger.info(f"Utilisateur Discord récupéré: {discord_user_data.get('username', 'Unknown')}")
         
         # 2. Trouver l'entreprise associée
-        enterprise = find_user_enterprise(db, discord_user_data)
+        enterprise = await find_user_enterprise(db, discord_user_data)
         
         if not enterprise:
             # Créer une entreprise par défaut ou refuser l'accès
             logger.warning(f"Aucune entreprise trouvée pour l'utilisateur {discord_user_data.get('username')}")
             # Pour l'instant, on continue sans entreprise
         
-        # 3. Créer ou mettre à jour l'utilisateur
-        user = get_or_create_user(db, discord_user_data, enterprise)
-        
-        # 4. Déterminer le rôle basé sur Discord
+        # 3. Créer ou mettre à jour l'utilisateur pendant la récupération du membre Discord
         if enterprise:
-            member_data = await get_discord_guild_member(
-                enterprise.discord_guild_id, 
-                discord_user_data["id"]
+            # Attendre les deux branches avant de propager une erreur : la session
+            # ne doit plus être utilisée quand la dépendance la referme
+            user, member_data = await asyncio.gather(
+                get_or_create_user(db, discord_user_data, enterprise),
+                get_discord_guild_member(enterprise.discord_guild_id, discord_user_data["id"]),
+                return_exceptions=True
             )
+            if isinstance(user, BaseException):
+                raise user
+            if isinstance(member_data, DiscordUnavailableError):
+                # Discord indisponible : le dernier rôle connu (users.role) est conservé
+                logger.warning(f"Rôle de {user.discord_username} non vérifié, conservé: {user.role} ({member_data})")
+            elif isinstance(member_data, BaseException):
+                raise member_data
+        else:
+            user = await get_or_create_user(db, discord_user_data, enterprise)
+        
+        # 4. Déterminer le rôle basé sur Discord
+        if enterprise and not isinstance(member_data, DiscordUnavailableError):
             user_role = determine_user_role(member_data, enterprise)
             
             # Mettre à jour le rôle si différent
             if user.role != user_role:
                 user.role = user_role
-                db.commit()
-                db.refresh(user)
+                # Les tokens émis avec l'ancien rôle ne sont plus acceptés
+                user.token_version = (user.token_version or 0) + 1
+                # last_login est en attente dans le tampon : la relecture rendrait l'ancienne valeur
+                logged_in_at = user.last_login
+                await db.commit()
+                await db.refresh(user)
+                set_committed_value(user, "last_login", logged_in_at)
+                token_versions.record(user.id, user.token_version, user.is_active)
                 logger.info(f"Rôle utilisateur mis à jour: {user_role}")
         
         # 5. Générer les tokens JWT
@@ -111,6 +138,14 @@ async def discord_callback(
         
         return auth_response
         
+    except HTTPException:
+        raise
+    except DiscordUnavailableError as e:
+        logger.error(f"Discord indisponible: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Discord est temporairement indisponible, veuillez réessayer"
+        )
     except DiscordOAuthError as e:
         logger.error(f"Erreur Discord OAuth: {e}")
         raise HTTPException(
@@ -127,7 +162,7 @@ async def discord_callback(
 @router.post("/refresh", response_model=Token, summary="Rafraîchir le token d'accès")
 async def refresh_token(
     token_data: TokenRefresh,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Rafraîchir le token d'accès à partir du refresh token.
@@ -139,13 +174,21 @@ async def refresh_token(
         if token_payload.token_type != "refresh":
             raise AuthenticationError("Token de refresh invalide")
         
+        await revocations.ensure_fresh()
+        if revocations.is_revoked(token_payload.jti):
+            raise AuthenticationError("Refresh token révoqué")
+        
         # Récupérer l'utilisateur
-        user = db.query(User).filter(User.id == token_payload.user_id).first()
+        user = await db.get(User, token_payload.user_id)
         
         if not user or not user.is_active:
             raise AuthenticationError("Utilisateur introuvable ou inactif")
         
-        # Générer de nouveaux tokens
+        # Rotation : révoquer l'ancien refresh token avant d'en émettre de nouveaux.
+        # L'insertion en base échoue si un autre refresh (ou un autre worker) l'a déjà utilisé
+        if not await revoke_token(db, token_payload):
+            raise AuthenticationError("Refresh token déjà utilisé")
+        
         new_tokens = create_tokens_for_user(user)
         
         logger.info(f"Tokens rafraîchis pour l'utilisateur {user.discord_username}")
@@ -167,19 +210,30 @@ async def refresh_token(
 
 @router.post("/logout", response_model=BaseResponse, summary="Déconnexion")
 async def logout(
-    current_user: User = Depends(get_current_active_user)
+    logout_data: Optional[LogoutRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Déconnecter l'utilisateur.
-    Note: Avec JWT, la déconnexion côté serveur est limitée.
-    Le client doit supprimer les tokens.
+    
+    Le token d'accès (et le refresh token s'il est fourni) est révoqué
+    côté serveur jusqu'à son expiration.
     """
     try:
         logger.info(f"Déconnexion de l'utilisateur {current_user.discord_username}")
         
-        # Optionnel: Mettre à jour la dernière activité
-        # current_user.last_activity = datetime.now(timezone.utc)
-        # db.commit()
+        await revoke_token(db, verify_token(credentials.credentials))
+        
+        if logout_data and logout_data.refresh_token:
+            try:
+                refresh_payload = verify_token(logout_data.refresh_token)
+                if refresh_payload.token_type == "refresh" and refresh_payload.user_id == current_user.id:
+                    await revoke_token(db, refresh_payload)
+            except AuthenticationError:
+                # Refresh token déjà expiré ou invalide : rien à révoquer
+                pass
         
         return BaseResponse(
             success=True,
@@ -195,7 +249,7 @@ async def logout(
 
 @router.get("/me", response_model=UserResponse, summary="Profile utilisateur actuel")
 async def get_current_user_profile(
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_user_row)
 ):
     """
     Récupérer le profil de l'utilisateur actuellement connecté.
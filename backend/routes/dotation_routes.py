@@ -1,19 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, desc, select
 from typing import List, Optional
 import logging
 import tempfile
 import os
 from datetime import datetime, timezone
 
-from database import get_db
+from database import get_db, get_async_db, get_read_db, get_async_read_db
 from models import User, DotationReport, DotationRow
 from schemas import (
     DotationReportCreate, DotationReportUpdate, DotationReportResponse,
     DotationRowCreate, DotationRowUpdate, DotationRowResponse,
-    DotationBulkImport, PaginationParams, PaginatedResponse,
+    DotationBulkImport, DotationBulkDelete, PaginationParams, PaginatedResponse,
     ExportRequest, ApiResponse
 )
 from auth import get_current_active_user, require_dotation_access
@@ -22,6 +23,7 @@ from utils.dotation_utils import (
     export_dotation_pdf, export_dotation_excel
 )
 from utils.audit import log_action
+from utils.pagination import paginate, invalidate_counts, InvalidCursorError
 
 router = APIRouter(prefix="/api/dotations", tags=["Dotations"])
 logger = logging.getLogger(__name__)
@@ -29,9 +31,9 @@ logger = logging.getLogger(__name__)
 @router.get("", response_model=PaginatedResponse, summary="Lister les rapports de dotation")
 async def list_dotation_reports(
     pagination: PaginationParams = Depends(),
-    status: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
     period: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(require_dotation_access)
 ):
     """
@@ -41,29 +43,32 @@ async def list_dotation_reports(
     - **period**: Filtrer par période
     - **page**: Numéro de page (défaut: 1)
     - **limit**: Nombre d'éléments par page (défaut: 20, max: 100)
+    - **cursor**: Reprendre après le `next_cursor` de la page précédente (pagination par curseur)
+    - **include_total**: `false` pour ne pas calculer le total
     """
     try:
-        query = db.query(DotationReport)
+        query = select(DotationReport)
         
         # Filtrer par entreprise de l'utilisateur
         if current_user.enterprise_id:
-            query = query.filter(DotationReport.enterprise_id == current_user.enterprise_id)
+            query = query.where(DotationReport.enterprise_id == current_user.enterprise_id)
         
         # Filtres optionnels
-        if status:
-            query = query.filter(DotationReport.status == status)
+        if status_filter:
+            query = query.where(DotationReport.status == status_filter)
         
         if period:
-            query = query.filter(DotationReport.period.ilike(f"%{period}%"))
+            query = query.where(DotationReport.period.ilike(f"%{period}%"))
         
-        # Pagination
-        total = query.count()
-        reports = query.order_by(desc(DotationReport.created_at)).offset(
-            (pagination.page - 1) * pagination.limit
-        ).limit(pagination.limit).all()
+        # Pagination (total mis en cache par entreprise et filtres)
+        reports, total, next_cursor = await paginate(
+            db, query, DotationReport, pagination,
+            count_key=("dotation_reports", current_user.enterprise_id, status_filter, period),
+            options=[selectinload(DotationReport.rows)]
+        )
         
         # Calculer le nombre total de pages
-        total_pages = (total + pagination.limit - 1) // pagination.limit
+        total_pages = (total + pagination.limit - 1) // pagination.limit if total is not None else None
         
         # Convertir en réponse
         report_responses = [DotationReportResponse.from_orm(report) for report in reports]
@@ -75,9 +80,17 @@ async def list_dotation_reports(
             total=total,
             page=pagination.page,
             limit=pagination.limit,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=next_cursor
         )
         
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des rapports de dotation: {e}")
         raise HTTPException(
@@ -145,16 +158,19 @@ async def create_dotation_report(
         db.commit()
         db.refresh(new_report)
         
+        invalidate_counts("dotation_reports", current_user.enterprise_id)
+        
         # Log de l'action
         await log_action(
-            db, current_user.id, "CREATE", "dotation_reports", 
-            new_report.id, None, new_report.__dict__
+            db, current_user.id, "CREATE", "dotation_reports", new_report.id
         )
         
         logger.info(f"Rapport de dotation créé: {new_report.id} par {current_user.discord_username}")
         
         return DotationReportResponse.from_orm(new_report)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la création du rapport de dotation: {e}")
         db.rollback()
@@ -166,16 +182,17 @@ async def create_dotation_report(
 @router.get("/{report_id}", response_model=DotationReportResponse, summary="Récupérer un rapport de dotation")
 async def get_dotation_report(
     report_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_dotation_access)
 ):
     """
     Récupérer un rapport de dotation spécifique avec toutes ses lignes.
     """
     try:
-        report = db.query(DotationReport).filter(
-            DotationReport.id == report_id
-        ).first()
+        report = await db.get(
+            DotationReport, report_id,
+            options=[selectinload(DotationReport.rows)]
+        )
         
         if not report:
             raise HTTPException(
@@ -229,9 +246,6 @@ async def update_dotation_report(
                 detail="Accès non autorisé à ce rapport"
             )
         
-        # Sauvegarder les anciennes valeurs pour l'audit
-        old_values = report.__dict__.copy()
-        
         # Mettre à jour les champs
         update_data = report_data.dict(exclude_unset=True)
         for field, value in update_data.items():
@@ -244,8 +258,7 @@ async def update_dotation_report(
         
         # Log de l'action
         await log_action(
-            db, current_user.id, "UPDATE", "dotation_reports",
-            report.id, old_values, report.__dict__
+            db, current_user.id, "UPDATE", "dotation_reports", report.id
         )
         
         logger.info(f"Rapport de dotation mis à jour: {report_id} par {current_user.discord_username}")
@@ -289,17 +302,15 @@ async def delete_dotation_report(
                 detail="Accès non autorisé à ce rapport"
             )
         
-        # Sauvegarder pour l'audit
-        old_values = report.__dict__.copy()
-        
-        # Supprimer (cascade supprime automatiquement les lignes)
+        # Supprimer (ON DELETE CASCADE supprime les lignes côté base)
         db.delete(report)
         db.commit()
         
+        invalidate_counts("dotation_reports", report.enterprise_id)
+        
         # Log de l'action
         await log_action(
-            db, current_user.id, "DELETE", "dotation_reports",
-            report_id, old_values, None
+            db, current_user.id, "DELETE", "dotation_reports", report_id
         )
         
         logger.info(f"Rapport de dotation supprimé: {report_id} par {current_user.discord_username}")
@@ -378,6 +389,8 @@ async def bulk_import_dotation_data(
         
         db.commit()
         
+        invalidate_counts("dotation_reports", current_user.enterprise_id)
+        
         # Log de l'action
         await log_action(
             db, current_user.id, "BULK_IMPORT", "dotation_reports",
@@ -402,11 +415,61 @@ async def bulk_import_dotation_data(
             detail="Erreur lors de l'import des données"
         )
 
+@router.post("/bulk-delete", response_model=ApiResponse, summary="Supprimer plusieurs rapports de dotation")
+async def bulk_delete_dotation_reports(
+    delete_data: DotationBulkDelete,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_dotation_access)
+):
+    """
+    Supprimer plusieurs rapports de dotation en une seule requête.
+    
+    Les lignes associées sont supprimées par la base (ON DELETE CASCADE).
+    Les rapports d'autres entreprises sont ignorés.
+    """
+    try:
+        report_ids = list(dict.fromkeys(delete_data.report_ids))
+        
+        query = db.query(DotationReport).filter(DotationReport.id.in_(report_ids))
+        
+        # Limiter à l'entreprise de l'utilisateur
+        if current_user.enterprise_id:
+            query = query.filter(DotationReport.enterprise_id == current_user.enterprise_id)
+        
+        deleted = query.delete(synchronize_session=False)
+        db.commit()
+        
+        invalidate_counts("dotation_reports", current_user.enterprise_id)
+        
+        # Log de l'action
+        await log_action(
+            db, current_user.id, "BULK_DELETE", "dotation_reports",
+            None, {"report_ids": report_ids}, {"deleted": deleted}
+        )
+        
+        logger.info(f"Suppression en lot: {deleted} rapports de dotation supprimés par {current_user.discord_username}")
+        
+        return ApiResponse(
+            success=True,
+            message=f"{deleted} rapport(s) de dotation supprimé(s)",
+            data={"deleted": deleted, "requested": len(report_ids)}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors de la suppression en lot des rapports de dotation: {e}")
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erreur lors de la suppression en lot des rapports de dotation"
+        )
+
 @router.post("/{report_id}/export-pdf", summary="Exporter un rapport en PDF")
 async def export_dotation_pdf_report(
     report_id: str,
     export_request: ExportRequest,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_dotation_access)
 ):
     """
@@ -460,7 +523,7 @@ async def export_dotation_pdf_report(
 async def export_dotation_excel_report(
     report_id: str,
     export_request: ExportRequest,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_dotation_access)
 ):
     """
@@ -515,7 +578,7 @@ async def export_dotation_excel_report(
 @router.get("/{report_id}/rows", response_model=List[DotationRowResponse], summary="Lister les lignes d'un rapport")
 async def list_dotation_rows(
     report_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_dotation_access)
 ):
     """
@@ -523,7 +586,7 @@ async def list_dotation_rows(
     """
     try:
         # Vérifier que le rapport existe et que l'utilisateur y a accès
-        report = db.query(DotationReport).filter(DotationReport.id == report_id).first()
+        report = await db.get(DotationReport, report_id)
         
         if not report:
             raise HTTPException(
@@ -538,7 +601,8 @@ async def list_dotation_rows(
             )
         
         # Récupérer les lignes
-        rows = db.query(DotationRow).filter(DotationRow.report_id == report_id).all()
+        result = await db.scalars(select(DotationRow).where(DotationRow.report_id == report_id))
+        rows = result.all()
         
         return [DotationRowResponse.from_orm(row) for row in rows]
         
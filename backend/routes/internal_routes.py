@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Optional
+import logging
+
+from models import User
+from schemas import ApiResponse
+from auth import require_staff, member_roles_cache, invalidate_member_roles, token_cache
+from utils.db_pool import pool_snapshot
+from utils.discord_client import discord_client
+from utils.enterprise_index import enterprise_index
+from utils.audit import audit_writer
+
+router = APIRouter(prefix="/internal", tags=["Internal"])
+logger = logging.getLogger(__name__)
+
+@router.get("/db-pool", response_model=ApiResponse, summary="Télémétrie des pools de connexions")
+async def get_db_pool_metrics(
+    current_user: User = Depends(require_staff)
+):
+    """
+    Exposer l'état des pools de connexions (réservé au staff).
+    
+    - **in_use / idle / overflow** : jauges instantanées
+    - **checkout_histogram** : distribution des temps d'attente de checkout
+    - **timeouts / recycled / invalidated** : connexions perdues ou refusées
+    - **recommended_pool_size** : taille suggérée d'après le pic de concurrence observé
+    """
+    try:
+        return ApiResponse(
+            success=True,
+            message="Télémétrie des pools de connexions",
+            data=pool_snapshot()
+        )
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture de la télémétrie des pools: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erreur lors de la lecture de la télémétrie des pools"
+        )
+
+@router.get("/discord", response_model=ApiResponse, summary="Télémétrie des appels Discord")
+async def get_discord_metrics(
+    current_user: User = Depends(require_staff)
+):
+    """Compteurs du client Discord partagé (dont les transitions du disjoncteur), du cache des rôles et de l'index des guilds."""
+    return ApiResponse(
+        success=True,
+        message="Télémétrie Discord",
+        data={
+            "client": dict(discord_client.stats),
+            "circuit_breaker": discord_client.breaker.snapshot(),
+            "member_roles_cache": member_roles_cache.stats(),
+            "enterprise_index": dict(enterprise_index.stats),
+        }
+    )
+
+@router.post("/discord/member-cache/invalidate", response_model=ApiResponse, summary="Invalider le cache des rôles Discord")
+async def invalidate_discord_member_cache(
+    guild_id: str = Query(..., description="Guild Discord"),
+    user_id: Optional[str] = Query(None, description="Membre (toute la guild si omis)"),
+    current_user: User = Depends(require_staff)
+):
+    """Forcer la relecture des rôles Discord d'un membre ou de toute une guild."""
+    invalidated = invalidate_member_roles(guild_id, user_id)
+    logger.info(f"Cache des rôles Discord invalidé ({invalidated} entrée(s)) par {current_user.discord_username}")
+    
+    return ApiResponse(
+        success=True,
+        message=f"{invalidated} entrée(s) invalidée(s)",
+        data={"invalidated": invalidated}
+    )
+
+@router.get("/auth", response_model=ApiResponse, summary="Télémétrie de l'authentification")
+async def get_auth_metrics(
+    current_user: User = Depends(require_staff)
+):
+    """Compteurs du cache des tokens décodés (hits, misses, évictions, taille)."""
+    return ApiResponse(
+        success=True,
+        message="Télémétrie de l'authentification",
+        data={"token_cache": token_cache.stats()}
+    )
+
+@router.get("/audit", response_model=ApiResponse, summary="Télémétrie du journal d'audit")
+async def get_audit_metrics(
+    current_user: User = Depends(require_staff)
+):
+    """Compteurs de l'écriture groupée de l'audit (entrées en file, écrites, abandonnées, attentes sur file pleine)."""
+    return ApiResponse(
+        success=True,
+        message="Télémétrie du journal d'audit",
+        data=audit_writer.snapshot()
+    )
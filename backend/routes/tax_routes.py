@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import List, Optional
 import logging
 from datetime import datetime, timezone
 
-from database import get_db
+from database import get_db, get_async_read_db
 from models import User, TaxDeclaration, TaxBracket
 from schemas import (
     TaxDeclarationCreate, TaxDeclarationUpdate, TaxDeclarationResponse,
@@ -15,6 +16,7 @@ from schemas import (
 from auth import get_current_active_user, require_patron_or_staff
 from utils.tax_utils import calculate_taxes, get_tax_brackets
 from utils.audit import log_action
+from utils.pagination import paginate, invalidate_counts, InvalidCursorError
 
 router = APIRouter(prefix="/api/tax-declarations", tags=["Tax Declarations"])
 logger = logging.getLogger(__name__)
@@ -23,40 +25,48 @@ logger = logging.getLogger(__name__)
 async def list_tax_declarations(
     pagination: PaginationParams = Depends(),
     period: Optional[str] = None,
-    status: Optional[str] = None,
-    db: Session = Depends(get_db),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(require_patron_or_staff)
 ):
-    """Lister les déclarations d'impôts avec pagination et filtres."""
+    """Lister les déclarations d'impôts avec pagination (page ou curseur) et filtres."""
     try:
-        query = db.query(TaxDeclaration)
+        query = select(TaxDeclaration)
         
         # Filtrer par entreprise
         if current_user.enterprise_id:
-            query = query.filter(TaxDeclaration.enterprise_id == current_user.enterprise_id)
+            query = query.where(TaxDeclaration.enterprise_id == current_user.enterprise_id)
         
         # Filtres
         if period:
-            query = query.filter(TaxDeclaration.period.ilike(f"%{period}%"))
-        if status:
-            query = query.filter(TaxDeclaration.status == status)
+            query = query.where(TaxDeclaration.period.ilike(f"%{period}%"))
+        if status_filter:
+            query = query.where(TaxDeclaration.status == status_filter)
         
         # Pagination
-        total = query.count()
-        declarations = query.order_by(desc(TaxDeclaration.created_at)).offset(
-            (pagination.page - 1) * pagination.limit
-        ).limit(pagination.limit).all()
+        declarations, total, next_cursor = await paginate(
+            db, query, TaxDeclaration, pagination,
+            count_key=("tax_declarations", current_user.enterprise_id, status_filter, period)
+        )
         
-        total_pages = (total + pagination.limit - 1) // pagination.limit
+        total_pages = (total + pagination.limit - 1) // pagination.limit if total is not None else None
         
         return PaginatedResponse(
             items=[TaxDeclarationResponse.from_orm(d) for d in declarations],
             total=total,
             page=pagination.page,
             limit=pagination.limit,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=next_cursor
         )
         
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des déclarations: {e}")
         raise HTTPException(
@@ -105,16 +115,19 @@ async def create_tax_declaration(
         db.commit()
         db.refresh(new_declaration)
         
+        invalidate_counts("tax_declarations", current_user.enterprise_id)
+        
         # Log de l'action
         await log_action(
-            db, current_user.id, "CREATE", "tax_declarations",
-            new_declaration.id, None, new_declaration.__dict__
+            db, current_user.id, "CREATE", "tax_declarations", new_declaration.id
         )
         
         logger.info(f"Déclaration d'impôts créée: {new_declaration.id}")
         
         return TaxDeclarationResponse.from_orm(new_declaration)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la création de la déclaration: {e}")
         db.rollback()
@@ -140,6 +153,8 @@ async def calculate_tax_preview(
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors du calcul des impôts: {e}")
         raise HTTPException(
@@ -158,6 +173,8 @@ async def get_tax_brackets_endpoint(
         brackets = await get_tax_brackets(db, bracket_type)
         return brackets
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des paliers: {e}")
         raise HTTPException(
@@ -40,19 +40,28 @@ class BaseResponse(BaseModel):
 class PaginationParams(BaseModel):
     page: int = Field(1, ge=1)
     limit: int = Field(20, ge=1, le=100)
+    cursor: Optional[str] = None  # Curseur (created_at, id) renvoyé par next_cursor
+    include_total: bool = True  # False pour ne pas calculer le total
 
 class PaginatedResponse(BaseModel):
     items: List[Any]
-    total: int
+    total: Optional[int] = None
     page: int
     limit: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 # ========== AUTHENTICATION ==========
 
 class TokenData(BaseModel):
     user_id: str
     token_type: str = "access"
+    role: Optional[str] = None
+    enterprise_id: Optional[str] = None
+    username: Optional[str] = None
+    version: Optional[int] = None
+    jti: Optional[str] = None
+    exp: Optional[int] = None
 
 class Token(BaseModel):
     access_token: str
@@ -62,6 +71,9 @@ class Token(BaseModel):
 class TokenRefresh(BaseModel):
     refresh_token: str
 
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
 class DiscordAuthCallback(BaseModel):
     code: str
     state: Optional[str] = None
@@ -218,6 +230,9 @@ class DotationBulkImport(BaseModel):
     data: str  # Données CSV/Excel collées
     format: str = "auto"  # "csv", "excel", "auto"
 
+class DotationBulkDelete(BaseModel):
+    report_ids: List[str] = Field(..., min_length=1, max_length=500)
+
 # ========== TAX DECLARATIONS ==========
 
 class TaxDeclarationBase(BaseModel):
@@ -432,6 +447,30 @@ class ArchiveSearch(BaseModel):
     montant_min: Optional[float] = None
     montant_max: Optional[float] = None
 
+# ========== AUDIT ==========
+
+class AuditLogResponse(BaseModel):
+    id: str
+    user_id: Optional[str] = None
+    action: str
+    table_name: Optional[str] = None
+    record_id: Optional[str] = None
+    old_values: Optional[Dict[str, Any]] = None
+    new_values: Optional[Dict[str, Any]] = None
+    ip_address: Optional[str] = None
+    user_agent: Optional[str] = None
+    created_at: datetime
+    archived: bool = False  # Entrée lue dans les segments d'archive
+    
+    class Config:
+        from_attributes = True
+
+class AuditHistoryResponse(BaseModel):
+    table_name: str
+    record_id: str
+    items: List[AuditLogResponse]
+    archived: int = 0  # Nombre d'entrées provenant des archives
+
 # ========== EXPORT REQUESTS ==========
 
 class ExportRequest(BaseModel):
@@ -4,6 +4,7 @@ from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
 from contextlib import asynccontextmanager
+import asyncio
 import os
 import logging
 import time
@@ -11,11 +12,21 @@ from datetime import datetime, timezone
 from pathlib import Path
 
 # Import de nos modules
-from database import engine, get_db
+from database import engine, async_engine, get_db
 from models import Base
 from schemas import HealthResponse, ApiResponse
 from routes.auth_routes import router as auth_router
 from routes.dotation_routes import router as dotation_router
+from routes.internal_routes import router as internal_router
+from routes.audit_routes import router as audit_router
+from utils.query_stats import start_tracking, QUERY_BUDGET_STRICT
+from utils.deadlines import DeadlineMiddleware
+from utils.discord_client import discord_client
+from utils.enterprise_index import enterprise_index
+from utils.role_sync import ROLE_SYNC_ENABLED, run_role_sync_loop
+from utils.last_login import last_login_buffer
+from utils.audit import audit_writer
+from utils.audit_partitions import AUDIT_PARTITION_MAINTENANCE_ENABLED, run_partition_maintenance_loop
 
 # Configuration du logging
 logging.basicConfig(
@@ -47,19 +58,69 @@ async def lifespan(app: FastAPI):
     upload_dir.mkdir(parents=True, exist_ok=True)
     logger.info(f"📁 Répertoire d'upload créé: {UPLOAD_DIR}")
     
+    # Profil SQLite (local, benchmarks, CI) : schéma créé à partir des modèles
+    if engine.dialect.name == "sqlite":
+        Base.metadata.create_all(bind=engine)
+        logger.info(f"🗄️ Schéma SQLite initialisé: {engine.url.database}")
+    
     # Vérifier la connexion à la base de données
     try:
         # Test de connexion
         from sqlalchemy import text
         with engine.connect() as conn:
             conn.execute(text("SELECT 1"))
-        logger.info("✅ Connexion à la base de données MySQL réussie")
+        logger.info(f"✅ Connexion à la base de données {engine.dialect.name} réussie")
     except Exception as e:
         logger.error(f"❌ Erreur de connexion à la base de données: {e}")
         raise
     
+    # Client HTTP partagé (keep-alive) pour tous les appels à l'API Discord
+    await discord_client.start()
+    
+    # Index guild -> entreprise utilisé au login (rechargé ensuite à expiration)
+    try:
+        await enterprise_index.refresh()
+    except Exception as e:
+        logger.warning(f"⚠️ Index guild -> entreprise non préchargé: {e}")
+    
+    # Synchronisation des rôles Discord en tâche de fond (DISCORD_ROLE_SYNC_ENABLED)
+    role_sync_task = asyncio.create_task(run_role_sync_loop()) if ROLE_SYNC_ENABLED else None
+    
+    # Écriture groupée des dates de dernière connexion
+    last_login_task = asyncio.create_task(last_login_buffer.run_flush_loop())
+    
+    # Écriture groupée du journal d'audit (AUDIT_DURABILITY=async)
+    audit_writer.start()
+    
+    # Partitions mensuelles du journal d'audit : création à l'avance et rétention (MySQL)
+    partition_task = (
+        asyncio.create_task(run_partition_maintenance_loop())
+        if AUDIT_PARTITION_MAINTENANCE_ENABLED and engine.dialect.name == "mysql" else None
+    )
+    
     yield
     
+    for task in (role_sync_task, last_login_task, partition_task):
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    
+    try:
+        await last_login_buffer.flush()
+    except Exception as e:
+        logger.error(f"❌ Dernières connexions non écrites à l'arrêt: {e}")
+    
+    # Écrire les entrées d'audit encore en file
+    await audit_writer.stop()
+    
+    await discord_client.close()
+    
+    # Fermer proprement les connexions du moteur asynchrone
+    await async_engine.dispose()
+    
     logger.info("🛑 Arrêt de l'API Portail Entreprise Flashback Fa")
 
 # Création de l'application FastAPI
@@ -84,6 +145,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Budget de temps par requête (ajouté avant CORS pour que les 504 portent les en-têtes CORS)
+app.add_middleware(DeadlineMiddleware)
+
 # Configuration CORS
 app.add_middleware(
     CORSMiddleware,
@@ -115,6 +179,45 @@ async def log_requests(request: Request, call_next):
     response.headers["X-Process-Time"] = str(process_time)
     return response
 
+# Middleware de comptage des requêtes SQL (Server-Timing + détection N+1)
+@app.middleware("http")
+async def track_db_queries(request: Request, call_next):
+    stats = start_tracking()
+    
+    response = await call_next(request)
+    
+    response.headers["Server-Timing"] = stats.server_timing()
+    
+    worst_shape, worst_repeats = stats.worst_repeat()
+    logger.info(
+        f"📊 {request.method} {request.url.path} - "
+        f"db_queries={stats.count} db_time_ms={stats.duration * 1000:.2f} max_repeat={worst_repeats}",
+        extra={
+            "path": request.url.path,
+            "method": request.method,
+            "db_queries": stats.count,
+            "db_time_ms": round(stats.duration * 1000, 2),
+            "db_max_repeat": worst_repeats,
+        }
+    )
+    
+    violations = stats.violations()
+    if violations:
+        logger.warning(f"⚠️ Budget SQL dépassé sur {request.method} {request.url.path}: {'; '.join(violations)}")
+        
+        if QUERY_BUDGET_STRICT:
+            return JSONResponse(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                content={
+                    "success": False,
+                    "message": "Budget de requêtes SQL dépassé",
+                    "errors": violations
+                },
+                headers={"Server-Timing": stats.server_timing()}
+            )
+    
+    return response
+
 # Middleware pour la gestion globale des erreurs
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -220,6 +323,12 @@ app.include_router(auth_router)
 # Routes de dotations
 app.include_router(dotation_router)
 
+# Routes internes (télémétrie)
+app.include_router(internal_router)
+
+# Journal d'audit (consultation, export, historique par enregistrement)
+app.include_router(audit_router)
+
 # TODO: Ajouter les autres routes
 # app.include_router(tax_router)
 # app.include_router(documents_router)
@@ -246,7 +355,7 @@ async def api_status():
     return {
         "status": "ok",
         "version": API_VERSION,
-        "database": "mysql",
+        "database": engine.dialect.name,
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
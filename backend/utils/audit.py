@@ -1,13 +1,172 @@
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any
-import json
+from typing import Optional, Dict, Any, List, Tuple, Callable
+import asyncio
+import datetime as dt
+import decimal
+import enum
+import math
+import os
+import uuid
 import logging
 from datetime import datetime, timezone
 
+from database import async_engine
 from models import AuditLog
+from utils.ids import new_id
 
 logger = logging.getLogger(__name__)
 
+# Mode d'écriture de l'audit : "async" (file + écriture groupée) ou "sync" (écrit avant de rendre la main)
+AUDIT_DURABILITY = os.getenv("AUDIT_DURABILITY", "async").lower()
+# Capacité de la file d'attente des entrées d'audit
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+# Nombre maximal d'entrées par INSERT groupé
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+# Délai maximal avant l'écriture d'un lot incomplet (secondes)
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1"))
+# Attente maximale d'une place dans la file pleine avant abandon de l'entrée (secondes)
+AUDIT_ENQUEUE_TIMEOUT = float(os.getenv("AUDIT_ENQUEUE_TIMEOUT", "0.05"))
+# Tables dont les modifications sont relevées au flush pour l'audit
+AUDITED_TABLES = frozenset(
+    name.strip() for name in os.getenv("AUDITED_TABLES", "dotation_reports,tax_declarations").split(",") if name.strip()
+)
+
+class AuditWriter:
+    """
+    Écriture groupée des entrées d'audit, hors du chemin critique des requêtes.
+
+    log_action dépose les entrées dans une file bornée ; une tâche de fond
+    les écrit par lots (un seul INSERT multi-lignes, sur sa propre connexion)
+    dès que AUDIT_BATCH_SIZE entrées sont prêtes ou au plus tard après
+    AUDIT_FLUSH_INTERVAL secondes. File pleine : l'appelant attend au plus
+    AUDIT_ENQUEUE_TIMEOUT, puis l'entrée est abandonnée et comptée. Les
+    entrées en file sont perdues si le processus s'arrête brutalement ;
+    l'arrêt normal vide la file. En mode "sync", ou tant que la tâche n'est
+    pas démarrée (scripts, CLI), l'entrée est écrite immédiatement.
+    """
+
+    def __init__(
+        self,
+        durability: str = AUDIT_DURABILITY,
+        queue_size: int = AUDIT_QUEUE_SIZE,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL
+    ):
+        if durability not in ("async", "sync"):
+            logger.warning(f"⚠️ AUDIT_DURABILITY invalide ({durability}) - mode async utilisé")
+            durability = "async"
+        self.durability = durability
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "dropped": 0,
+            "backpressure_waits": 0,
+            "failed": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Démarrer la tâche d'écriture (lifespan de l'application)."""
+        if self.durability != "async" or self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"📝 Audit asynchrone: lots de {self.batch_size} entrées, toutes les {self.flush_interval:g}s au plus")
+
+    async def stop(self):
+        """Arrêter la tâche d'écriture après l'écriture des entrées en file."""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        # Marqueur de fin : la tâche écrit tout ce qui le précède puis s'arrête
+        await self._queue.put(None)
+        await task
+
+    async def submit(self, row: Dict[str, Any]):
+        if not self.running:
+            await self.write([row])
+            return
+
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.stats["backpressure_waits"] += 1
+            try:
+                await asyncio.wait_for(self._queue.put(row), AUDIT_ENQUEUE_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.stats["dropped"] += 1
+                logger.warning(f"⚠️ File d'audit pleine - entrée abandonnée: {row['action']} sur {row['table_name']}:{row['record_id']}")
+                return
+        self.stats["enqueued"] += 1
+
+    async def write(self, rows: List[Dict[str, Any]]):
+        """Écrire un lot d'entrées par un seul INSERT multi-lignes."""
+        if not rows:
+            return
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(AuditLog.__table__.insert().values(rows))
+        except Exception as e:
+            self.stats["failed"] += len(rows)
+            logger.error(f"❌ Écriture de {len(rows)} entrée(s) d'audit impossible: {e}")
+            return
+        self.stats["written"] += len(rows)
+        self.stats["batches"] += 1
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            batch: List[Dict[str, Any]] = []
+            first = await self._queue.get()
+            if first is None:
+                return
+            batch.append(first)
+
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    row = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        row = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+
+            await self.write(batch)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Compteurs et état de la file d'audit."""
+        return {
+            "durability": self.durability,
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            **self.stats,
+        }
+
+audit_writer = AuditWriter()
+
 async def log_action(
     db: Session,
     user_id: Optional[str],
@@ -20,10 +179,18 @@ async def log_action(
     user_agent: Optional[str] = None
 ):
     """
-    Enregistrer une action d'audit dans la base de données.
+    Enregistrer une action d'audit.
+    
+    L'entrée est confiée à audit_writer, qui l'écrit sur sa propre connexion :
+    la session de l'appelant n'est ni validée ni annulée, et une erreur
+    d'audit ne fait jamais échouer l'opération principale.
+    
+    Sans old_values ni new_values, pour une table de AUDITED_TABLES, l'entrée
+    reprend uniquement les colonnes modifiées de l'enregistrement, relevées
+    dans la session au moment du flush (voir record_changes).
     
     Args:
-        db: Session de base de données
+        db: Session de base de données de l'appelant (modifications relevées au flush)
         user_id: ID de l'utilisateur qui effectue l'action
         action: Type d'action (CREATE, UPDATE, DELETE, LOGIN, etc.)
         table_name: Nom de la table concernée
@@ -34,6 +201,10 @@ async def log_action(
         user_agent: User-Agent du navigateur
     """
     try:
+        # Sans valeurs explicites : colonnes modifiées relevées au flush
+        if old_values is None and new_values is None and db is not None and table_name and record_id:
+            old_values, new_values = pop_recorded_changes(db, table_name, record_id)
+        
         # Nettoyer les valeurs pour la sérialisation JSON
         clean_old_values = None
         clean_new_values = None
@@ -44,27 +215,79 @@ async def log_action(
         if new_values:
             clean_new_values = clean_values_for_json(new_values)
         
-        # Créer l'entrée d'audit
-        audit_log = AuditLog(
-            user_id=user_id,
-            action=action,
-            table_name=table_name,
-            record_id=record_id,
-            old_values=clean_old_values,
-            new_values=clean_new_values,
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
-        
-        db.add(audit_log)
-        db.commit()
+        # Horodatage au moment de l'action, pas de l'écriture du lot
+        await audit_writer.submit({
+            "id": new_id(),
+            "user_id": user_id,
+            "action": action,
+            "table_name": table_name,
+            "record_id": record_id,
+            "old_values": clean_old_values,
+            "new_values": clean_new_values,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "created_at": datetime.now(timezone.utc),
+        })
         
-        logger.info(f"Action d'audit enregistrée: {action} sur {table_name}:{record_id} par user:{user_id}")
+        logger.debug(f"Action d'audit enregistrée: {action} sur {table_name}:{record_id} par user:{user_id}")
         
     except Exception as e:
-        logger.error(f"Erreur lors de l'enregistrement de l'audit: {e}")
         # Ne pas faire échouer l'opération principale à cause de l'audit
-        db.rollback()
+        logger.error(f"Erreur lors de l'enregistrement de l'audit: {e}")
+
+# ========== SÉRIALISATION ==========
+
+def _serialize_float(value: float) -> Optional[float]:
+    # NaN et infinis ne sont pas du JSON valide
+    return value if math.isfinite(value) else None
+
+def _identity(value: Any) -> Any:
+    return value
+
+_SERIALIZERS: Dict[type, Callable[[Any], Any]] = {
+    str: _identity,
+    int: _identity,
+    bool: _identity,
+    type(None): _identity,
+    float: _serialize_float,
+    datetime: datetime.isoformat,
+    dt.date: dt.date.isoformat,
+    dt.time: dt.time.isoformat,
+    decimal.Decimal: lambda value: _serialize_float(float(value)),
+    uuid.UUID: str,
+}
+
+def _serialize_mapping(value: Dict[Any, Any]) -> Dict[str, Any]:
+    return {key if isinstance(key, str) else str(serialize_value(key)): serialize_value(item) for key, item in value.items()}
+
+def _serialize_sequence(value) -> List[Any]:
+    return [serialize_value(item) for item in value]
+
+# Conteneurs (colonnes JSON, valeurs passées à log_action) : seules les feuilles sont converties
+_SERIALIZERS.update({
+    dict: _serialize_mapping,
+    list: _serialize_sequence,
+    tuple: _serialize_sequence,
+})
+
+def _serializer_for(value_type: type) -> Callable[[Any], Any]:
+    """Sérialiseur d'un type, résolu une fois puis mémorisé dans _SERIALIZERS."""
+    if issubclass(value_type, enum.Enum):
+        serializer = lambda value: serialize_value(value.value)
+    else:
+        serializer = next(
+            (_SERIALIZERS[base] for base in value_type.__mro__[1:] if base in _SERIALIZERS),
+            str
+        )
+    _SERIALIZERS[value_type] = serializer
+    return serializer
+
+def serialize_value(value: Any) -> Any:
+    """Convertir une valeur en valeur JSON (aiguillage sur le type exact, récursif pour dict/list/tuple)."""
+    serializer = _SERIALIZERS.get(type(value))
+    if serializer is None:
+        serializer = _serializer_for(type(value))
+    return serializer(value)
 
 def clean_values_for_json(values: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -73,30 +296,87 @@ def clean_values_for_json(values: Dict[str, Any]) -> Dict[str, Any]:
     cleaned = {}
     
     for key, value in values.items():
-        # Ignorer les clés privées et les relations SQLAlchemy
+        # Ignorer les clés privées (état SQLAlchemy)
         if key.startswith('_'):
             continue
         
         try:
-            # Convertir les datetime en chaînes ISO
-            if hasattr(value, 'isoformat'):
-                cleaned[key] = value.isoformat()
-            # Convertir les enums en valeurs string
-            elif hasattr(value, 'value'):
-                cleaned[key] = value.value
-            # Garder les types JSON-sérialisables
-            elif isinstance(value, (str, int, float, bool, type(None))):
-                cleaned[key] = value
-            # Convertir le reste en string
-            else:
-                cleaned[key] = str(value)
-                
+            cleaned[key] = serialize_value(value)
         except Exception as e:
             logger.warning(f"Impossible de sérialiser la valeur {key}: {e}")
             cleaned[key] = f"<non-serializable: {type(value).__name__}>"
     
     return cleaned
 
+# ========== MODIFICATIONS RELEVÉES AU FLUSH ==========
+
+_CHANGES_KEY = "audit_changes"
+
+def _column_keys(mapper) -> Tuple[str, ...]:
+    return tuple(attr.key for attr in mapper.column_attrs)
+
+def record_changes(session: Session, instances, kind: str):
+    """
+    Relever les colonnes modifiées des instances auditées (état avant flush).
+
+    Les modifications d'un même enregistrement sont fusionnées sur la durée
+    de la transaction : ancienne valeur du premier flush, nouvelle valeur du
+    dernier ; une colonne revenue à sa valeur d'origine disparaît.
+    """
+    changes = None
+    for obj in instances:
+        state = inspect(obj)
+        table_name = state.mapper.local_table.name
+        if table_name not in AUDITED_TABLES:
+            continue
+        if changes is None:
+            changes = session.info.setdefault(_CHANGES_KEY, {})
+
+        identity = state.identity or state.mapper.primary_key_from_instance(obj)
+        key = (table_name, str(identity[0]))
+        old, new = changes.setdefault(key, ({}, {}))
+
+        # Seules les valeurs déjà chargées sont lues : aucun chargement différé
+        loaded = state.dict
+        if kind == "new":
+            for attr in _column_keys(state.mapper):
+                if attr in loaded and loaded[attr] is not None:
+                    new[attr] = loaded[attr]
+        elif kind == "deleted":
+            for attr in _column_keys(state.mapper):
+                if attr in loaded:
+                    old.setdefault(attr, loaded[attr])
+            new.clear()
+        else:
+            for attr in _column_keys(state.mapper):
+                history = state.attrs[attr].history
+                if not history.added and not history.deleted:
+                    continue
+                if attr not in old and attr not in new:
+                    old[attr] = history.deleted[0] if history.deleted else None
+                new[attr] = history.added[0] if history.added else None
+                if attr in old and old[attr] == new[attr]:
+                    del old[attr], new[attr]
+
+def pop_recorded_changes(db: Session, table_name: str, record_id: Any) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Retirer de la session les modifications relevées pour un enregistrement."""
+    changes = db.info.get(_CHANGES_KEY)
+    if not changes:
+        return None, None
+    old, new = changes.pop((table_name, str(record_id)), ({}, {}))
+    return old or None, new or None
+
+@event.listens_for(Session, "after_flush")
+def _record_flush_changes(session, flush_context):
+    # Avant after_flush_postexec : l'historique des attributs est encore disponible
+    record_changes(session, session.new, "new")
+    record_changes(session, session.dirty, "dirty")
+    record_changes(session, session.deleted, "deleted")
+
+@event.listens_for(Session, "after_rollback")
+def _discard_flush_changes(session):
+    session.info.pop(_CHANGES_KEY, None)
+
 def get_client_ip(request) -> Optional[str]:
     """
     Extraire l'adresse IP du client à partir de la requête FastAPI.
@@ -0,0 +1,329 @@
+from sqlalchemy import select, delete
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+import argparse
+import gzip
+import json
+import os
+import sys
+import threading
+import logging
+
+from database import engine
+from models import AuditLog
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Répertoire des segments archivés (stockage froid : volume ou montage objet)
+AUDIT_ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "/app/backend/audit_archive")
+# Âge à partir duquel les entrées d'audit quittent la base (jours)
+AUDIT_ARCHIVE_AFTER_DAYS = int(os.getenv("AUDIT_ARCHIVE_AFTER_DAYS", "90"))
+# Lignes lues par aller-retour du curseur côté serveur
+AUDIT_ARCHIVE_FETCH_SIZE = int(os.getenv("AUDIT_ARCHIVE_FETCH_SIZE", "1000"))
+# Lignes supprimées par transaction après archivage
+AUDIT_ARCHIVE_DELETE_BATCH = int(os.getenv("AUDIT_ARCHIVE_DELETE_BATCH", "500"))
+
+# Cache en mémoire des index mensuels (nombre de mois)
+AUDIT_ARCHIVE_INDEX_CACHE = int(os.getenv("AUDIT_ARCHIVE_INDEX_CACHE", "24"))
+
+INDEX_FILE = "index.json"
+
+_COLUMNS = tuple(AuditLog.__table__.c)
+
+def _parse_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def _month_key(day: date) -> str:
+    return f"{day.year:04d}-{day.month:02d}"
+
+def _read_json(path: Path, default: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+class AuditArchive:
+    """
+    Segments JSONL compressés (gzip) du journal d'audit, un par jour.
+
+    Organisation : <racine>/AAAA/MM/audit-AAAA-MM-JJ[.N].jsonl.gz, un index
+    par mois (AAAA/MM/index.json : intervalle created_at, nombre de lignes et
+    identifiants d'enregistrements par table de chaque segment) et un
+    manifeste à la racine (index.json) qui ne résume que les mois. L'ajout
+    d'un segment ne réécrit que l'index de son mois ; le lecteur ne
+    décompresse que les segments qui contiennent l'enregistrement cherché.
+    Un jour réarchivé (reprise après un arrêt entre l'écriture et la
+    suppression) produit un segment .N supplémentaire ; les doublons sont
+    écartés à la lecture par identifiant.
+    """
+
+    def __init__(self, root: str = AUDIT_ARCHIVE_DIR):
+        self.root = Path(root)
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._manifest_mtime: Optional[float] = None
+        # Index mensuels relus : mois -> (mtime, segments avec identifiants en ensembles)
+        self._months = TTLCache(maxsize=AUDIT_ARCHIVE_INDEX_CACHE, ttl=3600)
+        self._lock = threading.Lock()
+
+    # ========== INDEX ==========
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / INDEX_FILE
+
+    def month_index_path(self, month: str) -> Path:
+        year, month_number = month.split("-")
+        return self.root / year / month_number / INDEX_FILE
+
+    def load_manifest(self) -> Dict[str, Any]:
+        """Résumé des mois archivés, relu seulement s'il a changé sur disque."""
+        with self._lock:
+            try:
+                mtime = self.index_path.stat().st_mtime
+            except FileNotFoundError:
+                return {"months": {}}
+            if self._manifest is None or mtime != self._manifest_mtime:
+                self._manifest = _read_json(self.index_path, {"months": {}})
+                self._manifest_mtime = mtime
+            return self._manifest
+
+    def month_segments(self, month: str) -> List[Dict[str, Any]]:
+        """Segments d'un mois (identifiants d'enregistrements en ensembles), mis en cache."""
+        path = self.month_index_path(month)
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return []
+        cached = self._months.get(month)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        segments = _read_json(path, {"segments": []})["segments"]
+        for segment in segments:
+            segment["records"] = {table: set(ids) for table, ids in segment["records"].items()}
+        self._months.set(month, (mtime, segments))
+        return segments
+
+    def _write_atomic(self, path: Path, write):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _write_json(self, path: Path, data: Dict[str, Any]):
+        def write(tmp_path: Path):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+
+        self._write_atomic(path, write)
+
+    def _add_segment(self, month: str, entry: Dict[str, Any]):
+        # Index du mois relu sur disque : quelques dizaines de segments au plus
+        path = self.month_index_path(month)
+        segments = [*_read_json(path, {"segments": []})["segments"], entry]
+        self._write_json(path, {"segments": segments})
+
+        # Résumé recalculé depuis l'index du mois : corrige un manifeste resté en retard
+        manifest = dict(self.load_manifest())
+        manifest["months"] = {
+            **manifest.get("months", {}),
+            month: {
+                "first_created_at": min(segment["first_created_at"] for segment in segments),
+                "last_created_at": max(segment["last_created_at"] for segment in segments),
+                "rows": sum(segment["rows"] for segment in segments),
+                "segments": len(segments),
+            },
+        }
+        self._write_json(self.index_path, manifest)
+
+    def archived_before(self) -> Optional[datetime]:
+        """Borne sous laquelle toutes les entrées d'audit sont archivées (None si aucune)."""
+        value = self.load_manifest().get("archived_before")
+        return _parse_datetime(value) if value else None
+
+    def mark_archived_before(self, cutoff: datetime):
+        """Enregistrer la borne d'un archivage terminé (jamais en recul)."""
+        current = self.archived_before()
+        if current is not None and current >= cutoff:
+            return
+        self._write_json(self.index_path, {**self.load_manifest(), "archived_before": cutoff.isoformat()})
+
+    # ========== ÉCRITURE ==========
+
+    def _segment_path(self, day: date) -> Path:
+        directory = self.root / f"{day.year:04d}" / f"{day.month:02d}"
+        path = directory / f"audit-{day.isoformat()}.jsonl.gz"
+        part = 1
+        while path.exists():
+            path = directory / f"audit-{day.isoformat()}.{part}.jsonl.gz"
+            part += 1
+        return path
+
+    def write_segment(self, day: date, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Écrire (fichier temporaire puis renommage) le segment d'une journée et l'ajouter à l'index du mois."""
+        path = self._segment_path(day)
+        records: Dict[str, set] = {}
+
+        def write(tmp_path: Path):
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, separators=(",", ":"), ensure_ascii=False))
+                    f.write("\n")
+                    if row["table_name"] and row["record_id"]:
+                        records.setdefault(row["table_name"], set()).add(row["record_id"])
+            with open(tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+
+        self._write_atomic(path, write)
+
+        entry = {
+            "file": path.relative_to(self.root).as_posix(),
+            "day": day.isoformat(),
+            "first_created_at": rows[0]["created_at"],
+            "last_created_at": rows[-1]["created_at"],
+            "rows": len(rows),
+            "records": {table: sorted(ids) for table, ids in records.items()},
+        }
+        self._add_segment(_month_key(day), entry)
+        return entry
+
+    # ========== LECTURE ==========
+
+    def months(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[str]:
+        """Mois archivés (AAAA-MM) dont l'intervalle created_at recoupe [start, end]."""
+        return sorted(
+            month for month, summary in self.load_manifest()["months"].items()
+            if (start is None or _parse_datetime(summary["last_created_at"]) >= start)
+            and (end is None or _parse_datetime(summary["first_created_at"]) <= end)
+        )
+
+    def segments(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Segments dont l'intervalle created_at recoupe [start, end]."""
+        return [
+            segment for month in self.months(start, end) for segment in self.month_segments(month)
+            if (start is None or _parse_datetime(segment["last_created_at"]) >= start)
+            and (end is None or _parse_datetime(segment["first_created_at"]) <= end)
+        ]
+
+    def read_segment(self, segment: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        with gzip.open(self.root / segment["file"], "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def history(self, table_name: str, record_id: str) -> List[Dict[str, Any]]:
+        """Entrées archivées d'un enregistrement, par ordre chronologique."""
+        record_id = str(record_id)
+        seen = set()
+        entries = []
+        for month in self.months():
+            for segment in self.month_segments(month):
+                if record_id not in segment["records"].get(table_name, ()):
+                    continue
+                for entry in self.read_segment(segment):
+                    if entry["table_name"] == table_name and entry["record_id"] == record_id and entry["id"] not in seen:
+                        seen.add(entry["id"])
+                        entries.append(entry)
+        entries.sort(key=lambda entry: (entry["created_at"], entry["id"]))
+        return entries
+
+audit_archive = AuditArchive()
+
+# ========== ARCHIVAGE ==========
+
+def _row_to_json(row, created_at: datetime) -> Dict[str, Any]:
+    # Colonnes JSON (old_values, new_values) écrites telles quelles ; seul created_at est converti
+    entry = {column.name: row._mapping[column] for column in _COLUMNS}
+    entry["created_at"] = created_at.isoformat()
+    return entry
+
+def _delete_archived(ids: List[str], day: date) -> int:
+    """Supprimer les lignes archivées d'une journée par petites transactions."""
+    day_start = datetime.combine(day, dt_time.min, tzinfo=timezone.utc)
+    day_end = day_start + timedelta(days=1)
+    deleted = 0
+    for start in range(0, len(ids), AUDIT_ARCHIVE_DELETE_BATCH):
+        with engine.begin() as conn:
+            # Borne sur created_at : seule la partition du jour est parcourue
+            result = conn.execute(
+                delete(AuditLog.__table__).where(
+                    AuditLog.id.in_(ids[start:start + AUDIT_ARCHIVE_DELETE_BATCH]),
+                    AuditLog.created_at >= day_start,
+                    AuditLog.created_at < day_end,
+                )
+            )
+            deleted += result.rowcount
+    return deleted
+
+def archive_audit_logs(
+    older_than_days: int = AUDIT_ARCHIVE_AFTER_DAYS,
+    archive: AuditArchive = audit_archive
+) -> Dict[str, int]:
+    """
+    Archiver puis supprimer les entrées d'audit antérieures à older_than_days.
+
+    Les lignes sont lues dans l'ordre de created_at par un curseur côté
+    serveur (stream_results), sans charger la table en mémoire ; chaque
+    journée complète est écrite dans son segment, indexée, puis supprimée de
+    la base par lots de AUDIT_ARCHIVE_DELETE_BATCH, sur une autre connexion.
+    La borne est arrondie à minuit UTC : une journée est archivée en une fois.
+    Elle est enregistrée dans le manifeste en fin d'archivage : la rétention
+    des partitions (mode drop) ne supprime que les mois qu'elle couvre.
+    """
+    cutoff = datetime.combine(
+        datetime.now(timezone.utc).date() - timedelta(days=older_than_days), dt_time.min, tzinfo=timezone.utc
+    )
+    totals = {"segments": 0, "archived": 0, "deleted": 0}
+
+    def flush(day: Optional[date], rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        archive.write_segment(day, rows)
+        deleted = _delete_archived([row["id"] for row in rows], day)
+        totals["segments"] += 1
+        totals["archived"] += len(rows)
+        totals["deleted"] += deleted
+        logger.info(f"🗄️ Audit du {day.isoformat()} archivé: {len(rows)} entrée(s), {deleted} supprimée(s) de la base")
+
+    query = (
+        select(*_COLUMNS)
+        .where(AuditLog.created_at < cutoff)
+        .order_by(AuditLog.created_at, AuditLog.id)
+    )
+
+    current_day: Optional[date] = None
+    rows: List[Dict[str, Any]] = []
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=AUDIT_ARCHIVE_FETCH_SIZE).execute(query)
+        for row in result:
+            # MySQL rend des datetimes naïfs (UTC) : horodatages normalisés en UTC "aware"
+            created_at = row.created_at
+            created_at = created_at.replace(tzinfo=timezone.utc) if created_at.tzinfo is None else created_at.astimezone(timezone.utc)
+            day = created_at.date()
+            if day != current_day:
+                flush(current_day, rows)
+                current_day, rows = day, []
+            rows.append(_row_to_json(row, created_at))
+        flush(current_day, rows)
+
+    # Borne lue par la rétention des partitions avant tout DROP PARTITION
+    archive.mark_archived_before(cutoff)
+
+    return totals
+
+if __name__ == "__main__":
+    # Usage : python -m utils.audit_archive [--days N] (par ex. depuis un cron quotidien)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Archiver les entrées d'audit anciennes en segments JSONL compressés")
+    parser.add_argument("--days", type=int, default=AUDIT_ARCHIVE_AFTER_DAYS, help="Âge minimal des entrées archivées (jours)")
+    args = parser.parse_args()
+
+    totals = archive_audit_logs(args.days)
+    print(f"{totals['archived']} entrée(s) archivée(s) en {totals['segments']} segment(s), {totals['deleted']} supprimée(s)")
+    sys.exit(0)
@@ -0,0 +1,219 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional
+import asyncio
+import os
+import re
+import sys
+import logging
+
+from database import engine, async_engine
+from utils.audit_archive import AuditArchive, audit_archive
+
+logger = logging.getLogger(__name__)
+
+AUDIT_TABLE = "audit_logs"
+
+# Durée de conservation du journal d'audit en mois (0 : conservation illimitée)
+AUDIT_RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", "24"))
+# Partitions expirées : "detach" (échangées vers une table audit_logs_pAAAAMM) ou "drop"
+# (supprimées, seulement une fois couvertes par l'archive, voir utils/audit_archive.py)
+AUDIT_RETENTION_MODE = os.getenv("AUDIT_RETENTION_MODE", "detach").lower()
+# Nombre de mois futurs pour lesquels une partition est créée à l'avance
+AUDIT_PARTITIONS_AHEAD = int(os.getenv("AUDIT_PARTITIONS_AHEAD", "3"))
+# Maintenance périodique des partitions par l'application (MySQL uniquement)
+AUDIT_PARTITION_MAINTENANCE_ENABLED = os.getenv("AUDIT_PARTITION_MAINTENANCE_ENABLED", "True").lower() == "true"
+AUDIT_PARTITION_MAINTENANCE_INTERVAL = float(os.getenv("AUDIT_PARTITION_MAINTENANCE_INTERVAL", "86400"))
+
+# Partition de débordement (lignes au-delà de la dernière partition mensuelle)
+OVERFLOW_PARTITION = "pmax"
+# Verrou MySQL : un seul worker à la fois modifie les partitions
+MAINTENANCE_LOCK = "audit_logs_partition_maintenance"
+
+_PARTITION_NAME = re.compile(r"^p(\d{4})(\d{2})$")
+
+class PartitionMaintenanceError(Exception):
+    pass
+
+# ========== NOMMAGE ==========
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    """Partition des lignes du mois (p202610 pour octobre 2026)."""
+    return f"p{month.year:04d}{month.month:02d}"
+
+def partition_month(name: str) -> Optional[date]:
+    match = _PARTITION_NAME.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+def partition_definition(month: date) -> str:
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN (TO_DAYS('{add_months(month, 1).isoformat()}'))"
+
+def partition_definitions(first_month: date, last_month: date) -> List[str]:
+    """Partitions mensuelles de first_month à last_month inclus, puis pmax."""
+    definitions = []
+    month = first_month
+    while month <= last_month:
+        definitions.append(partition_definition(month))
+        month = add_months(month, 1)
+    definitions.append(f"PARTITION {OVERFLOW_PARTITION} VALUES LESS THAN MAXVALUE")
+    return definitions
+
+# ========== MAINTENANCE ==========
+
+def list_partitions(conn: Connection) -> List[str]:
+    """Partitions de audit_logs dans l'ordre des bornes (vide si la table n'est pas partitionnée)."""
+    rows = conn.execute(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    ), {"table": AUDIT_TABLE}).scalars().all()
+    return [name for name in rows if name]
+
+def create_future_partitions(conn: Connection, partitions: List[str], today: date, months_ahead: int) -> List[str]:
+    """
+    Créer les partitions des months_ahead prochains mois.
+
+    La partition pmax est réorganisée : elle est vide tant que les partitions
+    sont créées à l'avance, l'opération ne déplace alors aucune ligne.
+    """
+    months = [month for month in map(partition_month, partitions) if month]
+    target = add_months(month_start(today), months_ahead)
+    first = add_months(max(months), 1) if months else month_start(today)
+    if first > target:
+        return []
+
+    if OVERFLOW_PARTITION not in partitions:
+        raise PartitionMaintenanceError(f"Partition {OVERFLOW_PARTITION} absente de {AUDIT_TABLE}")
+
+    definitions = partition_definitions(first, target)
+    conn.execute(text(
+        f"ALTER TABLE {AUDIT_TABLE} REORGANIZE PARTITION {OVERFLOW_PARTITION} INTO ({', '.join(definitions)})"
+    ))
+    return [definition.split()[1] for definition in definitions[:-1]]
+
+def expire_partitions(
+    conn: Connection,
+    partitions: List[str],
+    today: date,
+    retention_months: int,
+    mode: str,
+    archived_before: Optional[date] = None
+) -> List[str]:
+    """
+    Retirer les partitions entièrement antérieures à la période de conservation.
+
+    detach : la partition est d'abord échangée (EXCHANGE PARTITION) avec une
+    table vide audit_logs_pAAAAMM, qui conserve les lignes hors de la table
+    principale (archivage, export), puis supprimée.
+    drop : DROP PARTITION, instantané quel que soit le volume ; seulement pour
+    les mois entièrement antérieurs à archived_before (borne du dernier
+    archivage terminé), les autres sont conservés.
+    """
+    if mode not in ("drop", "detach"):
+        raise PartitionMaintenanceError(f"AUDIT_RETENTION_MODE invalide: {mode}")
+    if retention_months <= 0:
+        return []
+
+    cutoff = add_months(month_start(today), -retention_months)
+    expired = [name for name in partitions if (partition_month(name) or cutoff) < cutoff]
+
+    if mode == "drop":
+        archived = [
+            name for name in expired
+            if archived_before is not None and add_months(partition_month(name), 1) <= archived_before
+        ]
+        if len(archived) < len(expired):
+            logger.warning(
+                f"⚠️ Partitions d'audit expirées conservées, non couvertes par l'archive: "
+                f"{', '.join(name for name in expired if name not in archived)}"
+            )
+        expired = archived
+    if not expired:
+        return []
+
+    if mode == "detach":
+        for name in expired:
+            detached = f"{AUDIT_TABLE}_{name}"
+            conn.execute(text(f"CREATE TABLE {detached} LIKE {AUDIT_TABLE}"))
+            conn.execute(text(f"ALTER TABLE {detached} REMOVE PARTITIONING"))
+            conn.execute(text(f"ALTER TABLE {AUDIT_TABLE} EXCHANGE PARTITION {name} WITH TABLE {detached}"))
+
+    conn.execute(text(f"ALTER TABLE {AUDIT_TABLE} DROP PARTITION {', '.join(expired)}"))
+    return expired
+
+def maintain_partitions(
+    conn: Connection,
+    today: Optional[date] = None,
+    months_ahead: int = AUDIT_PARTITIONS_AHEAD,
+    retention_months: int = AUDIT_RETENTION_MONTHS,
+    mode: str = AUDIT_RETENTION_MODE,
+    archive: AuditArchive = audit_archive
+) -> Dict[str, List[str]]:
+    """
+    Créer les partitions à venir et retirer les partitions expirées de audit_logs.
+
+    Sans effet sur SQLite (table non partitionnée) ou si la table n'a pas
+    encore été partitionnée par la migration Alembic. En mode drop, la borne
+    d'archivage est lue dans le manifeste de l'archive.
+    """
+    if conn.dialect.name != "mysql":
+        logger.debug(f"Partitionnement de {AUDIT_TABLE} non supporté par {conn.dialect.name} - ignoré")
+        return {}
+
+    today = today or datetime.now(timezone.utc).date()
+
+    if not conn.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": MAINTENANCE_LOCK}).scalar():
+        logger.info(f"Maintenance des partitions de {AUDIT_TABLE} déjà en cours sur un autre worker")
+        return {}
+
+    try:
+        partitions = list_partitions(conn)
+        if not partitions:
+            logger.warning(f"⚠️ Table {AUDIT_TABLE} non partitionnée - exécuter les migrations Alembic")
+            return {}
+
+        archived_before = archive.archived_before()
+        archived_before = archived_before.date() if archived_before else None
+
+        return {
+            "created": create_future_partitions(conn, partitions, today, months_ahead),
+            "expired": expire_partitions(conn, partitions, today, retention_months, mode, archived_before),
+        }
+    finally:
+        conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MAINTENANCE_LOCK})
+
+def _log_result(result: Dict[str, List[str]]):
+    if result.get("created"):
+        logger.info(f"🗂️ Partitions d'audit créées: {', '.join(result['created'])}")
+    if result.get("expired"):
+        logger.info(f"🗑️ Partitions d'audit expirées ({AUDIT_RETENTION_MODE}): {', '.join(result['expired'])}")
+
+async def run_partition_maintenance_loop():
+    """Boucle de maintenance lancée par le lifespan de l'application."""
+    while True:
+        try:
+            async with async_engine.connect() as conn:
+                _log_result(await conn.run_sync(maintain_partitions))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Maintenance des partitions d'audit impossible: {e}")
+        await asyncio.sleep(AUDIT_PARTITION_MAINTENANCE_INTERVAL)
+
+if __name__ == "__main__":
+    # Usage : python -m utils.audit_partitions (maintenance immédiate, par ex. depuis un cron)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    with engine.connect() as conn:
+        result = maintain_partitions(conn)
+    _log_result(result)
+    print(f"{len(result.get('created', []))} partition(s) créée(s), {len(result.get('expired', []))} partition(s) expirée(s)")
+    sys.exit(0)
@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+import threading
+import time
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    Cache LRU borné en mémoire avec expiration par entrée.
+
+    Les entrées expirées sont considérées comme absentes ; au-delà de maxsize,
+    l'entrée la moins récemment utilisée est évincée.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Récupérer une valeur non expirée (default sinon)."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] <= time.monotonic():
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def get_stale(self, key: Hashable, default: Any = None) -> Any:
+        """Récupérer une valeur même expirée, tant qu'elle n'a pas été évincée."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            return default if entry is _MISSING else entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Enregistrer une valeur pour ttl secondes (ttl du cache par défaut)."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any:
+        """Invalider une entrée et renvoyer sa valeur (None si absente)."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[1] if entry else None
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Invalider toutes les entrées dont la clé satisfait le prédicat."""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Compteurs du cache (hits, misses, évictions, taille)."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
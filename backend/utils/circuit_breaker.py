@@ -0,0 +1,131 @@
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Tuple
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Appel refusé : le disjoncteur de la dépendance est ouvert."""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Disjoncteur {name} ouvert (nouvel essai dans {retry_after:.1f}s)")
+
+class CircuitBreaker:
+    """
+    Disjoncteur à taux d'échec sur fenêtre glissante.
+
+    - closed : les appels passent ; le disjoncteur s'ouvre quand, sur les
+      window_seconds dernières secondes et au moins minimum_calls appels,
+      le taux d'échec atteint failure_rate_threshold.
+    - open : les appels sont refusés immédiatement (CircuitOpenError)
+      pendant open_seconds.
+    - half_open : half_open_max_calls appels de test passent ; un succès
+      referme le disjoncteur, un échec le rouvre.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        minimum_calls: int = 10,
+        window_seconds: float = 30.0,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._lock = threading.Lock()
+        self.transitions: Counter = Counter()
+        self.rejected = 0
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        self.transitions[f"{self.state}->{state}"] += 1
+        log = logger.warning if state == OPEN else logger.info
+        log(f"⚡ Disjoncteur {self.name}: {self.state} -> {state}")
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state != CLOSED:
+            self._half_open_calls = 0
+        else:
+            self._outcomes.clear()
+
+    def allow(self):
+        """Autoriser un appel ou lever CircuitOpenError."""
+        with self._lock:
+            if self.state == OPEN:
+                retry_after = self._opened_at + self.open_seconds - time.monotonic()
+                if retry_after > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, retry_after)
+                self._transition(HALF_OPEN)
+
+            if self.state == HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, 0.0)
+                self._half_open_calls += 1
+
+    def release(self):
+        """Appel autorisé puis abandonné sans résultat (annulation) : libérer l'essai half_open."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._transition(CLOSED)
+                return
+            self._record(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._transition(OPEN)
+                return
+            self._record(False)
+
+            calls = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if calls >= self.minimum_calls and failures / calls >= self.failure_rate_threshold:
+                self._transition(OPEN)
+
+    def _record(self, ok: bool):
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+            self._outcomes.popleft()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """État et compteurs de transitions du disjoncteur."""
+        with self._lock:
+            calls = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                "name": self.name,
+                "state": self.state,
+                "window_calls": calls,
+                "window_failure_rate": round(failures / calls, 3) if calls else 0.0,
+                "rejected": self.rejected,
+                "transitions": dict(self.transitions),
+            }
@@ -0,0 +1,171 @@
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from typing import Dict, Any, Optional, Tuple
+import math
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bornes (en millisecondes) de l'histogramme des temps d'attente de checkout
+CHECKOUT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class PoolStats:
+    """Compteurs d'un pool de connexions (histogramme de checkout, timeouts, cycle de vie)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.buckets = [0] * (len(CHECKOUT_BUCKETS_MS) + 1)
+        self.checkouts = 0
+        self.checkout_time_total = 0.0
+        self.checkout_time_max = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.closes = 0
+        self.recycled = 0
+        self.invalidated = 0
+        self.peak_in_use = 0
+
+    def record_checkout(self, duration: float, in_use: int):
+        duration_ms = duration * 1000
+        index = len(CHECKOUT_BUCKETS_MS)
+        for i, bound in enumerate(CHECKOUT_BUCKETS_MS):
+            if duration_ms <= bound:
+                index = i
+                break
+
+        with self._lock:
+            self.buckets[index] += 1
+            self.checkouts += 1
+            self.checkout_time_total += duration
+            self.checkout_time_max = max(self.checkout_time_max, duration)
+            self.peak_in_use = max(self.peak_in_use, in_use)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool) -> Dict[str, Any]:
+        with self._lock:
+            histogram = {
+                f"le_{bound}ms": count
+                for bound, count in zip(CHECKOUT_BUCKETS_MS, self.buckets)
+            }
+            histogram["gt_10000ms"] = self.buckets[-1]
+
+            return {
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "peak_in_use": self.peak_in_use,
+                "recommended_pool_size": recommended_pool_size(self.peak_in_use),
+                "checkouts": self.checkouts,
+                "checkout_avg_ms": round(self.checkout_time_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "checkout_max_ms": round(self.checkout_time_max * 1000, 3),
+                "checkout_histogram": histogram,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "closes": self.closes,
+                "recycled": self.recycled,
+                "invalidated": self.invalidated,
+            }
+
+# Statistiques par nom de pool (logging_name), conservées après engine.dispose()
+_pool_stats: Dict[str, PoolStats] = {}
+_pools: Dict[str, Any] = {}
+
+def get_pool_stats(name: str) -> PoolStats:
+    if name not in _pool_stats:
+        _pool_stats[name] = PoolStats(name)
+    return _pool_stats[name]
+
+class _InstrumentedPoolMixin:
+    """Mesure le temps d'attente de chaque checkout et compte les timeouts."""
+
+    def connect(self):
+        stats = get_pool_stats(self._orig_logging_name or "default")
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            stats.record_timeout()
+            logger.warning(f"Pool '{stats.name}' saturé: timeout de checkout ({self.status()})")
+            raise
+        stats.record_checkout(time.perf_counter() - start, self.checkedout())
+        return connection
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def instrument_engine(engine, name: str):
+    """Brancher les événements de cycle de vie du pool d'un moteur (synchrone)."""
+    pool = engine.pool
+    stats = get_pool_stats(name)
+    _pools[name] = engine
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        with stats._lock:
+            stats.connects += 1
+
+    @event.listens_for(pool, "close")
+    def _on_close(dbapi_connection, connection_record):
+        recycle = engine.pool._recycle
+        age = time.time() - connection_record.starttime
+        with stats._lock:
+            stats.closes += 1
+            if recycle > -1 and age >= recycle:
+                stats.recycled += 1
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        with stats._lock:
+            stats.invalidated += 1
+
+def pool_snapshot() -> Dict[str, Any]:
+    """État courant de tous les pools instrumentés."""
+    return {
+        name: get_pool_stats(name).snapshot(engine.pool)
+        for name, engine in _pools.items()
+    }
+
+# ========== DIMENSIONNEMENT DU POOL ==========
+
+def recommended_pool_size(peak_in_use: int) -> int:
+    """Taille de pool suggérée à partir de la concurrence observée (+25% de marge)."""
+    return max(2, math.ceil(peak_in_use * 1.25))
+
+def compute_pool_sizing(engines_per_worker: int = 2) -> Tuple[int, int]:
+    """
+    Calculer (pool_size, max_overflow) pour chaque moteur.
+
+    Mode "fixed" (défaut) : DB_POOL_SIZE / DB_MAX_OVERFLOW.
+    Mode "auto" : répartir le budget de connexions du serveur (DB_MAX_CONNECTIONS,
+    moins 10% de réserve) entre les workers (WEB_CONCURRENCY) et les moteurs de
+    chaque worker, un tiers en connexions permanentes et le reste en overflow.
+    """
+    mode = os.getenv("DB_POOL_SIZING", "fixed").lower()
+
+    if mode != "auto":
+        return int(os.getenv("DB_POOL_SIZE", "10")), int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    budget = int(os.getenv("DB_MAX_CONNECTIONS", "150"))
+    per_engine = max(2, int(budget * 0.9) // workers // max(1, engines_per_worker))
+
+    pool_size = max(2, per_engine // 3)
+    max_overflow = max(0, per_engine - pool_size)
+
+    logger.info(
+        f"Dimensionnement automatique du pool: {workers} worker(s), budget {budget} "
+        f"-> pool_size={pool_size}, max_overflow={max_overflow}"
+    )
+    return pool_size, max_overflow
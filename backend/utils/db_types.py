@@ -0,0 +1,24 @@
+from sqlalchemy import DateTime
+from sqlalchemy.types import TypeDecorator
+from datetime import timezone
+
+class UTCDateTime(TypeDecorator):
+    """
+    DateTime(timezone=True) qui reste cohérent sur SQLite.
+
+    SQLite ne conserve pas le fuseau : les valeurs sont enregistrées en UTC
+    et relues comme des datetimes UTC "aware". Les autres dialectes gardent
+    le comportement de DateTime(timezone=True).
+    """
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and dialect.name == "sqlite" and value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and dialect.name == "sqlite" and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
@@ -0,0 +1,154 @@
+from fastapi import HTTPException, status
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from contextvars import ContextVar
+from fnmatch import fnmatch
+from typing import Dict, Optional
+import asyncio
+import json
+import os
+import time
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Budget par défaut d'une requête HTTP (secondes)
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "30"))
+
+# Budgets par route (motifs fnmatch), surchargeables via ROUTE_TIMEOUTS="motif=secondes,..."
+DEFAULT_ROUTE_TIMEOUTS: Dict[str, float] = {
+    "/health": 5,
+    "/auth/*": 15,
+    "/api/dotations/*/export-*": 60,
+    "/api/audit/export": 300,
+}
+
+# Code d'erreur MySQL : "Query execution was interrupted, maximum statement execution time exceeded"
+MYSQL_MAX_EXECUTION_TIME_EXCEEDED = 3024
+
+def _parse_route_timeouts(raw: str) -> Dict[str, float]:
+    timeouts = {}
+    for item in raw.split(","):
+        if "=" in item:
+            pattern, seconds = item.rsplit("=", 1)
+            try:
+                timeouts[pattern.strip()] = float(seconds)
+            except ValueError:
+                logger.warning(f"Budget de route invalide ignoré: {item}")
+    return timeouts
+
+ROUTE_TIMEOUTS = {**DEFAULT_ROUTE_TIMEOUTS, **_parse_route_timeouts(os.getenv("ROUTE_TIMEOUTS", ""))}
+
+class DeadlineExceeded(HTTPException):
+    """Le budget de temps de la requête est épuisé (réponse 504)."""
+
+    def __init__(self, detail: str = "Délai de traitement de la requête dépassé"):
+        super().__init__(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=detail)
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+def budget_for(path: str) -> float:
+    """Budget de la route : motif le plus spécifique (le plus long) qui correspond."""
+    matches = [pattern for pattern in ROUTE_TIMEOUTS if fnmatch(path, pattern)]
+    if not matches:
+        return REQUEST_TIMEOUT_SECONDS
+    return ROUTE_TIMEOUTS[max(matches, key=len)]
+
+def remaining() -> Optional[float]:
+    """Temps restant avant l'échéance de la requête courante (None hors requête)."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+def deadline_exceeded() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+def httpx_timeout(default: float = 10.0, connect: float = 5.0) -> httpx.Timeout:
+    """Timeout httpx borné par le temps restant de la requête."""
+    left = remaining()
+    if left is None:
+        return httpx.Timeout(default, connect=connect)
+    if left <= 0:
+        raise DeadlineExceeded()
+    budget = min(default, left)
+    return httpx.Timeout(budget, connect=min(connect, budget))
+
+class DeadlineMiddleware:
+    """
+    Middleware ASGI qui fixe l'échéance de chaque requête HTTP.
+
+    L'échéance est propagée aux requêtes MySQL (MAX_EXECUTION_TIME) et aux
+    appels httpx (httpx_timeout) ; si la requête n'a pas répondu à temps,
+    elle est annulée et un 504 est renvoyé.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = budget_for(scope["path"])
+        token = _deadline.set(time.monotonic() + budget)
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await asyncio.wait_for(self.app(scope, receive, send_wrapper), timeout=budget)
+        except asyncio.TimeoutError:
+            logger.error(f"⏱️ Délai dépassé ({budget:g}s) sur {scope.get('method')} {scope['path']}")
+            if response_started:
+                raise
+
+            body = json.dumps({
+                "success": False,
+                "message": "Délai de traitement de la requête dépassé",
+                "detail": f"La requête n'a pas abouti en {budget:g}s"
+            }).encode()
+            await send({
+                "type": "http.response.start",
+                "status": status.HTTP_504_GATEWAY_TIMEOUT,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+        finally:
+            _deadline.reset(token)
+
+# ========== PROPAGATION À MYSQL ==========
+
+@event.listens_for(Engine, "before_cursor_execute", retval=True)
+def _apply_statement_deadline(conn, cursor, statement, parameters, context, executemany):
+    left = remaining()
+    if left is None:
+        return statement, parameters
+
+    if left <= 0:
+        raise DeadlineExceeded()
+
+    # Indice d'optimiseur MySQL : borne la durée des SELECT au temps restant
+    if conn.dialect.name == "mysql" and statement.lstrip()[:6].upper() == "SELECT":
+        stripped = statement.lstrip()
+        statement = f"SELECT /*+ MAX_EXECUTION_TIME({max(1, int(left * 1000))}) */{stripped[6:]}"
+
+    return statement, parameters
+
+@event.listens_for(Engine, "handle_error")
+def _translate_statement_timeout(exception_context):
+    original = exception_context.original_exception
+    code = original.args[0] if original is not None and getattr(original, "args", None) else None
+    if exception_context.engine.dialect.name == "mysql" and code == MYSQL_MAX_EXECUTION_TIME_EXCEEDED:
+        return DeadlineExceeded("Requête SQL interrompue : délai de traitement dépassé")
@@ -0,0 +1,215 @@
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+import asyncio
+import os
+import re
+import time
+import logging
+
+import httpx
+
+from utils.deadlines import httpx_timeout, remaining
+from utils.circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+DISCORD_API_BASE = "https://discord.com/api/v10"
+
+# Connexions keep-alive partagées par tous les appels Discord
+DISCORD_MAX_CONNECTIONS = int(os.getenv("DISCORD_MAX_CONNECTIONS", "20"))
+DISCORD_MAX_KEEPALIVE = int(os.getenv("DISCORD_MAX_KEEPALIVE", "10"))
+DISCORD_KEEPALIVE_EXPIRY = float(os.getenv("DISCORD_KEEPALIVE_EXPIRY", "60"))
+DISCORD_TIMEOUT_SECONDS = float(os.getenv("DISCORD_TIMEOUT_SECONDS", "10"))
+DISCORD_HTTP2 = os.getenv("DISCORD_HTTP2", "True").lower() == "true"
+# Attente maximale acceptée avant de réessayer après un 429 (au-delà : erreur)
+DISCORD_MAX_RETRY_AFTER = float(os.getenv("DISCORD_MAX_RETRY_AFTER", "5"))
+DISCORD_MAX_RETRIES = int(os.getenv("DISCORD_MAX_RETRIES", "2"))
+# Disjoncteur : taux d'échec (5xx, erreurs réseau, délais) déclenchant l'ouverture
+DISCORD_BREAKER_FAILURE_RATE = float(os.getenv("DISCORD_BREAKER_FAILURE_RATE", "0.5"))
+DISCORD_BREAKER_MIN_CALLS = int(os.getenv("DISCORD_BREAKER_MIN_CALLS", "10"))
+DISCORD_BREAKER_WINDOW_SECONDS = float(os.getenv("DISCORD_BREAKER_WINDOW_SECONDS", "30"))
+DISCORD_BREAKER_OPEN_SECONDS = float(os.getenv("DISCORD_BREAKER_OPEN_SECONDS", "30"))
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Identifiants Discord (snowflakes) dans un chemin d'API
+_SNOWFLAKE = re.compile(r"/\d{15,25}")
+# Paramètres "majeurs" : Discord applique une limite distincte par guild/salon/webhook
+_MAJOR_PARAM = re.compile(r"^/(?:api/v\d+/)?(guilds|channels|webhooks)/(\d+)")
+
+class DiscordRateLimitError(Exception):
+    """Limite de débit Discord atteinte et attente trop longue pour réessayer."""
+
+    def __init__(self, retry_after: float, is_global: bool = False):
+        self.retry_after = retry_after
+        self.is_global = is_global
+        super().__init__(f"Limite de débit Discord atteinte (réessayer dans {retry_after:.2f}s)")
+
+def route_key(method: str, url: str) -> str:
+    """Clé de limite de débit d'une route : identifiants remplacés sauf le paramètre majeur."""
+    path = urlsplit(url).path
+    major = _MAJOR_PARAM.match(path)
+    generic = _SNOWFLAKE.sub("/:id", path)
+    if major:
+        generic = f"{major.group(1)}/{major.group(2)}:{generic}"
+    return f"{method.upper()} {generic}"
+
+class DiscordClient:
+    """
+    Client HTTP partagé pour l'API Discord.
+
+    Un seul httpx.AsyncClient (keep-alive, HTTP/2 si h2 est installé) est
+    créé au démarrage de l'application. Les en-têtes X-RateLimit-* sont
+    suivis par bucket pour attendre avant d'épuiser une limite, et les 429
+    sont réessayés après retry_after quand l'attente reste raisonnable.
+    Un disjoncteur refuse les appels (CircuitOpenError) quand Discord est
+    dégradé, au lieu de laisser chaque requête attendre le délai réseau.
+    """
+
+    def __init__(self, base_url: str = DISCORD_API_BASE):
+        self.base_url = base_url
+        self._client: Optional[httpx.AsyncClient] = None
+        # Route -> bucket Discord, bucket -> instant (monotonic) de réinitialisation
+        self._route_buckets: Dict[str, str] = {}
+        self._bucket_resets: Dict[str, float] = {}
+        self._global_reset = 0.0
+        self.stats = {"requests": 0, "rate_limited": 0, "retries": 0, "waits": 0}
+        self.breaker = CircuitBreaker(
+            "discord",
+            failure_rate_threshold=DISCORD_BREAKER_FAILURE_RATE,
+            minimum_calls=DISCORD_BREAKER_MIN_CALLS,
+            window_seconds=DISCORD_BREAKER_WINDOW_SECONDS,
+            open_seconds=DISCORD_BREAKER_OPEN_SECONDS
+        )
+
+    async def start(self):
+        if self._client is not None:
+            return
+        http2 = DISCORD_HTTP2 and HTTP2_AVAILABLE
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=DISCORD_MAX_CONNECTIONS,
+                max_keepalive_connections=DISCORD_MAX_KEEPALIVE,
+                keepalive_expiry=DISCORD_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(DISCORD_TIMEOUT_SECONDS, connect=5.0),
+            headers={"User-Agent": "FlashbackFaPortal (https://flashbackfa.local, 2.0)"}
+        )
+        logger.info(f"🌐 Client Discord initialisé (HTTP/2: {'oui' if http2 else 'non'})")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _wait_for_bucket(self, key: str):
+        now = time.monotonic()
+        reset_at = max(self._global_reset, self._bucket_resets.get(self._route_buckets.get(key, ""), 0.0))
+        delay = reset_at - now
+        if delay <= 0:
+            return
+
+        left = remaining()
+        if delay > DISCORD_MAX_RETRY_AFTER or (left is not None and delay >= left):
+            raise DiscordRateLimitError(delay, is_global=self._global_reset > now)
+
+        self.stats["waits"] += 1
+        await asyncio.sleep(delay)
+
+    def _record_limits(self, key: str, response: httpx.Response):
+        headers = response.headers
+        bucket = headers.get("X-RateLimit-Bucket")
+        if bucket:
+            self._route_buckets[key] = bucket
+        bucket = self._route_buckets.get(key)
+        if not bucket:
+            return
+
+        if headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset-After"):
+            self._bucket_resets[bucket] = time.monotonic() + float(headers["X-RateLimit-Reset-After"])
+        else:
+            self._bucket_resets.pop(bucket, None)
+
+    def _retry_after(self, response: httpx.Response) -> float:
+        try:
+            return float(response.json().get("retry_after", 0))
+        except (ValueError, AttributeError):
+            return float(response.headers.get("Retry-After", 1))
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Appel Discord avec gestion des limites de débit et du délai de la requête."""
+        if self._client is None:
+            # Scripts et workers hors application : démarrage à la demande
+            await self.start()
+
+        key = route_key(method, url)
+        timeout = kwargs.pop("timeout", None)
+
+        for attempt in range(DISCORD_MAX_RETRIES + 1):
+            await self._wait_for_bucket(key)
+
+            # DeadlineExceeded levé ici, avant d'occuper le disjoncteur
+            request_timeout = timeout or httpx_timeout(DISCORD_TIMEOUT_SECONDS)
+
+            self.breaker.allow()
+            self.stats["requests"] += 1
+            try:
+                response = await self._client.request(method, url, timeout=request_timeout, **kwargs)
+            except httpx.TransportError:
+                # Erreur réseau ou délai httpx dépassé : défaillance de Discord
+                self.breaker.record_failure()
+                raise
+            except BaseException:
+                # Annulation (échéance de la requête, client déconnecté) ou erreur locale : sans verdict
+                self.breaker.release()
+                raise
+
+            if response.status_code == 429:
+                # Limite de débit dépassée : Discord répond, ni succès ni défaillance
+                self.breaker.release()
+            elif response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            self._record_limits(key, response)
+
+            if response.status_code != 429:
+                return response
+
+            self.stats["rate_limited"] += 1
+            retry_after = self._retry_after(response)
+            is_global = response.headers.get("X-RateLimit-Global", "").lower() == "true"
+            if is_global:
+                self._global_reset = time.monotonic() + retry_after
+            elif key in self._route_buckets:
+                self._bucket_resets[self._route_buckets[key]] = time.monotonic() + retry_after
+
+            logger.warning(f"⏳ 429 Discord sur {key} (retry_after={retry_after:.2f}s, global={is_global})")
+
+            left = remaining()
+            if (
+                attempt >= DISCORD_MAX_RETRIES
+                or retry_after > DISCORD_MAX_RETRY_AFTER
+                or (left is not None and retry_after >= left)
+            ):
+                raise DiscordRateLimitError(retry_after, is_global)
+
+            self.stats["retries"] += 1
+            await asyncio.sleep(retry_after)
+
+        return response
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+# Client applicatif (démarré et fermé par le lifespan de server.py)
+discord_client = DiscordClient()
@@ -0,0 +1,140 @@
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterable, List, Optional
+import asyncio
+import contextvars
+import os
+import time
+import logging
+
+from database import AsyncSessionLocal
+from models import Enterprise
+
+logger = logging.getLogger(__name__)
+
+# Durée de validité de l'index en mémoire (secondes)
+ENTERPRISE_INDEX_TTL = float(os.getenv("ENTERPRISE_INDEX_TTL", "300"))
+
+_ENTERPRISE_COLUMNS = tuple(column.key for column in inspect(Enterprise).column_attrs)
+
+class EnterpriseSnapshot:
+    """Copie en lecture seule d'une entreprise (id, guild et rôles), utilisable hors session."""
+    __slots__ = _ENTERPRISE_COLUMNS
+
+    def __init__(self, enterprise: Enterprise):
+        for key in _ENTERPRISE_COLUMNS:
+            object.__setattr__(self, key, getattr(enterprise, key))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("EnterpriseSnapshot est en lecture seule")
+
+    def __repr__(self) -> str:
+        return f"<EnterpriseSnapshot {self.name} guild={self.discord_guild_id}>"
+
+class EnterpriseIndex:
+    """
+    Index en mémoire discord_guild_id -> entreprise pour la résolution au login.
+
+    L'index complet est rechargé en une requête toutes les ENTERPRISE_INDEX_TTL
+    secondes, et immédiatement invalidé quand une entreprise est modifiée dans
+    ce processus. Tant qu'il est froid ou invalidé, les guilds de l'utilisateur
+    sont résolues par une seule requête IN (...) et un rechargement est lancé
+    en arrière-plan. Entre processus, la fraîcheur est bornée par le TTL.
+    """
+
+    def __init__(self, ttl: float = ENTERPRISE_INDEX_TTL):
+        self.ttl = ttl
+        self._by_guild: Dict[str, EnterpriseSnapshot] = {}
+        self._expires_at = 0.0
+        self._generation = 0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "fallbacks": 0, "refreshes": 0}
+
+    def is_fresh(self) -> bool:
+        return self._expires_at > time.monotonic()
+
+    def invalidate(self):
+        self._expires_at = 0.0
+        self._generation += 1
+
+    async def refresh(self, db: Optional[AsyncSession] = None):
+        """Recharger l'index complet (une requête sur enterprises)."""
+        generation = self._generation
+        if db is None:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(select(Enterprise))
+                enterprises = list(result.scalars())
+        else:
+            result = await db.execute(select(Enterprise))
+            enterprises = list(result.scalars())
+
+        self._by_guild = {e.discord_guild_id: EnterpriseSnapshot(e) for e in enterprises}
+        # Une invalidation survenue pendant le chargement garde l'index froid
+        if generation == self._generation:
+            self._expires_at = time.monotonic() + self.ttl
+        self.stats["refreshes"] += 1
+        logger.info(f"🗂️ Index guild -> entreprise rechargé ({len(self._by_guild)} entreprise(s))")
+
+    def _schedule_refresh(self):
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+
+        async def run():
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Rechargement de l'index guild -> entreprise impossible: {e}")
+
+        # Contexte vide : la tâche survit à la requête qui la lance et ne doit hériter
+        # ni de son échéance, ni de son compteur de requêtes, ni de son utilisateur
+        self._refresh_task = asyncio.create_task(run(), context=contextvars.Context())
+
+    async def resolve(self, db: AsyncSession, guild_ids: Iterable[str]) -> Optional[EnterpriseSnapshot]:
+        """Première entreprise correspondant aux guilds, dans l'ordre des guilds Discord."""
+        guild_ids: List[str] = [str(guild_id) for guild_id in guild_ids]
+        if not guild_ids:
+            return None
+
+        if self.is_fresh():
+            self.stats["hits"] += 1
+            by_guild = self._by_guild
+        else:
+            # Index froid : une seule requête pour toutes les guilds de l'utilisateur
+            self.stats["fallbacks"] += 1
+            result = await db.execute(
+                select(Enterprise).where(Enterprise.discord_guild_id.in_(guild_ids))
+            )
+            by_guild = {e.discord_guild_id: EnterpriseSnapshot(e) for e in result.scalars()}
+            self._schedule_refresh()
+
+        for guild_id in guild_ids:
+            if guild_id in by_guild:
+                return by_guild[guild_id]
+
+        return None
+
+enterprise_index = EnterpriseIndex()
+
+# ========== INVALIDATION ==========
+
+@event.listens_for(Session, "after_flush")
+def _track_enterprise_changes(session, flush_context):
+    if any(isinstance(obj, Enterprise) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["enterprise_changed"] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_enterprise_bulk_changes(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert) and any(
+        mapper.class_ is Enterprise for mapper in orm_execute_state.all_mappers
+    ):
+        orm_execute_state.session.info["enterprise_changed"] = True
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("enterprise_changed", False):
+        enterprise_index.invalidate()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("enterprise_changed", None)
@@ -0,0 +1,156 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.types import BINARY, VARBINARY
+from typing import Any, Dict, List, Tuple
+import argparse
+import logging
+import sys
+
+from models import Base
+from utils.ids import CompactUUID
+
+logger = logging.getLogger(__name__)
+
+def id_columns() -> Dict[str, List[str]]:
+    """Colonnes d'identifiants (CompactUUID) par table."""
+    columns = {}
+    for table in Base.metadata.sorted_tables:
+        names = [column.name for column in table.columns if isinstance(column.type, CompactUUID)]
+        if names:
+            columns[table.name] = names
+    return columns
+
+def expected_foreign_keys() -> Dict[Tuple[str, Tuple[str, ...]], Dict[str, Any]]:
+    """Clés étrangères déclarées par les modèles, par (table, colonnes locales)."""
+    foreign_keys = {}
+    for table in Base.metadata.sorted_tables:
+        for constraint in table.foreign_key_constraints:
+            columns = tuple(constraint.column_keys)
+            foreign_keys[(table.name, columns)] = {
+                "name": constraint.name or f"fk_{table.name}_{'_'.join(columns)}_{constraint.referred_table.name}",
+                "constrained_columns": list(columns),
+                "referred_table": constraint.referred_table.name,
+                "referred_columns": [element.column.name for element in constraint.elements],
+                "ondelete": constraint.ondelete,
+            }
+    return foreign_keys
+
+def column_storage(column_type) -> str:
+    """Stockage actuel d'une colonne : "binary", "string" ou "intermediate" (conversion interrompue)."""
+    if isinstance(column_type, VARBINARY):
+        return "intermediate"
+    if isinstance(column_type, BINARY):
+        return "binary"
+    return "string"
+
+def convert_ids(engine: Engine, target: str):
+    """
+    Convertir les identifiants existants entre CHAR(36) et BINARY(16) (MySQL 8+).
+
+    Le DDL MySQL valide implicitement chaque étape : la conversion est donc
+    reprenable plutôt que transactionnelle. Chaque étape vérifie l'état actuel
+    avant d'agir : clés étrangères supprimées seulement si présentes, colonnes
+    déjà converties ignorées, lignes converties une seule fois (longueur de la
+    valeur), puis clés étrangères des modèles recréées si absentes. Relancer
+    la commande après un échec termine la conversion.
+    Les UUID4 existants restent aléatoires ; seuls les nouveaux identifiants
+    (ID_STRATEGY=uuid7-binary) sont ordonnés dans le temps.
+    """
+    if engine.dialect.name != "mysql":
+        logger.info(f"Conversion des identifiants ignorée pour le dialecte {engine.dialect.name}")
+        return
+
+    if target not in ("binary", "string"):
+        raise ValueError("La cible doit être 'binary' ou 'string'")
+
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    tables = {name: cols for name, cols in id_columns().items() if name in existing_tables}
+    columns_info = {
+        name: {column["name"]: column for column in inspector.get_columns(name)}
+        for name in tables
+    }
+    pending = {
+        name: [col for col in cols if column_storage(columns_info[name][col]["type"]) != target]
+        for name, cols in tables.items()
+    }
+    pending = {name: cols for name, cols in pending.items() if cols}
+
+    if target == "binary":
+        source_length, convert, final_type = 36, "UUID_TO_BIN", "BINARY(16)"
+    else:
+        source_length, convert, final_type = 16, "BIN_TO_UUID", "CHAR(36)"
+
+    # 1. Supprimer les clés étrangères encore présentes (types incompatibles pendant la conversion)
+    dropped = {}
+    if pending:
+        for table_name in tables:
+            for fk in inspector.get_foreign_keys(table_name):
+                with engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE `{table_name}` DROP FOREIGN KEY `{fk['name']}`"))
+                dropped[(table_name, tuple(fk["constrained_columns"]))] = {
+                    "name": fk["name"],
+                    "constrained_columns": fk["constrained_columns"],
+                    "referred_table": fk["referred_table"],
+                    "referred_columns": fk["referred_columns"],
+                    "ondelete": fk.get("options", {}).get("ondelete"),
+                }
+
+    # 2. Convertir les colonnes restantes, table par table
+    for table_name, columns in pending.items():
+        def modify(cols: List[str], column_type: str) -> str:
+            return ", ".join(
+                f"MODIFY `{col}` {column_type} {'NULL' if columns_info[table_name][col]['nullable'] else 'NOT NULL'}"
+                for col in cols
+            )
+
+        logger.info(f"Conversion de {table_name} ({', '.join(columns)}) vers {final_type}")
+        widen = [col for col in columns if column_storage(columns_info[table_name][col]["type"]) != "intermediate"]
+        with engine.begin() as conn:
+            if widen:
+                conn.execute(text(f"ALTER TABLE `{table_name}` {modify(widen, 'VARBINARY(36)')}"))
+            # Valeurs déjà converties (reprise) laissées telles quelles
+            conversions = ", ".join(
+                f"`{col}` = IF(LENGTH(`{col}`) = {source_length}, {convert}(`{col}`), `{col}`)" for col in columns
+            )
+            conn.execute(text(f"UPDATE `{table_name}` SET {conversions}"))
+            conn.execute(text(f"ALTER TABLE `{table_name}` {modify(columns, final_type)}"))
+
+    # 3. Recréer les clés étrangères des modèles absentes de la base
+    inspector = inspect(engine)
+    present = {
+        (table_name, tuple(fk["constrained_columns"]))
+        for table_name in tables
+        for fk in inspector.get_foreign_keys(table_name)
+    }
+    # Définitions lues avant suppression prioritaires ; celles des modèles après une reprise
+    for key, fk in {**expected_foreign_keys(), **dropped}.items():
+        if key[0] not in tables or key in present:
+            continue
+        local = ", ".join(f"`{col}`" for col in fk["constrained_columns"])
+        remote = ", ".join(f"`{col}`" for col in fk["referred_columns"])
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"ALTER TABLE `{key[0]}` ADD CONSTRAINT `{fk['name']}` "
+                f"FOREIGN KEY ({local}) REFERENCES `{fk['referred_table']}` ({remote})"
+                + (f" ON DELETE {fk['ondelete']}" if fk["ondelete"] else "")
+            ))
+
+    logger.info("✅ Conversion des identifiants terminée")
+
+if __name__ == "__main__":
+    # Usage : python -m utils.id_migration binary   (puis ID_STRATEGY=uuid7-binary)
+    #         python -m utils.id_migration string   (retour à CHAR(36))
+    from database import engine
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Conversion du stockage des identifiants")
+    parser.add_argument("target", choices=["binary", "string"])
+    args = parser.parse_args()
+
+    try:
+        convert_ids(engine, args.target)
+    except Exception as e:
+        logger.error(f"❌ Échec de la conversion des identifiants: {e}")
+        sys.exit(1)
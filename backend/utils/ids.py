@@ -0,0 +1,92 @@
+from sqlalchemy import String
+from sqlalchemy.types import TypeDecorator, BINARY
+import os
+import secrets
+import threading
+import time
+import uuid
+
+# Stratégie d'identifiants :
+# - "uuid4"        : UUID aléatoires en CHAR(36) (comportement historique)
+# - "uuid7"        : UUIDv7 ordonnés dans le temps, toujours stockés en CHAR(36)
+# - "uuid7-binary" : UUIDv7 stockés en BINARY(16) (voir utils/id_migration.py)
+ID_STRATEGY = os.getenv("ID_STRATEGY", "uuid4").lower()
+BINARY_IDS = ID_STRATEGY == "uuid7-binary"
+
+# Valeur liée à la place d'un identifiant invalide : jamais générée (UUID nil)
+UNMATCHED_ID = bytes(16)
+
+_uuid7_lock = threading.Lock()
+_uuid7_last_ms = 0
+_uuid7_counter = 0
+
+def uuid7() -> uuid.UUID:
+    """
+    Générer un UUIDv7 (RFC 9562) : 48 bits de timestamp en millisecondes,
+    puis un compteur sur 12 bits qui garantit l'ordre au sein d'une même
+    milliseconde, puis 62 bits aléatoires.
+    """
+    global _uuid7_last_ms, _uuid7_counter
+
+    with _uuid7_lock:
+        timestamp_ms = time.time_ns() // 1_000_000
+        if timestamp_ms <= _uuid7_last_ms:
+            _uuid7_counter += 1
+            if _uuid7_counter > 0xFFF:
+                # Compteur épuisé : emprunter la milliseconde suivante
+                _uuid7_last_ms += 1
+                _uuid7_counter = 0
+            timestamp_ms = _uuid7_last_ms
+        else:
+            _uuid7_last_ms = timestamp_ms
+            _uuid7_counter = secrets.randbits(8)
+        counter = _uuid7_counter
+
+    value = (timestamp_ms & 0xFFFFFFFFFFFF) << 80
+    value |= 0x7 << 76
+    value |= counter << 64
+    value |= 0b10 << 62
+    value |= secrets.randbits(62)
+    return uuid.UUID(int=value)
+
+def new_id() -> str:
+    """Nouvel identifiant de ligne selon ID_STRATEGY."""
+    if ID_STRATEGY in ("uuid7", "uuid7-binary"):
+        return str(uuid7())
+    return str(uuid.uuid4())
+
+class CompactUUID(TypeDecorator):
+    """
+    Identifiant exposé en chaîne UUID côté Python.
+
+    Stocké en BINARY(16) quand ID_STRATEGY=uuid7-binary, en CHAR(36) sinon,
+    de sorte que l'API et les schémas manipulent toujours des chaînes.
+    """
+    impl = String(36)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if BINARY_IDS:
+            return dialect.type_descriptor(BINARY(16))
+        return dialect.type_descriptor(String(36))
+
+    def process_bind_param(self, value, dialect):
+        if value is None or not BINARY_IDS:
+            return value
+        if isinstance(value, bytes) and len(value) == 16:
+            return value
+        try:
+            return uuid.UUID(str(value)).bytes
+        except ValueError:
+            # Identifiant de chemin qui n'est pas un UUID : aucune ligne ne correspond (404, pas 500)
+            return UNMATCHED_ID
+
+    def literal_processor(self, dialect):
+        if not BINARY_IDS:
+            return super().literal_processor(dialect)
+        return lambda value: "X'%s'" % uuid.UUID(str(value)).hex
+
+    def process_result_value(self, value, dialect):
+        if value is None or not BINARY_IDS:
+            return value
+        return str(uuid.UUID(bytes=bytes(value)))
@@ -0,0 +1,74 @@
+from sqlalchemy import bindparam
+from datetime import datetime
+from typing import Dict
+import asyncio
+import os
+import logging
+
+from database import async_engine
+from models import User
+
+logger = logging.getLogger(__name__)
+
+# Intervalle d'écriture groupée des dates de dernière connexion (secondes)
+LAST_LOGIN_FLUSH_SECONDS = float(os.getenv("LAST_LOGIN_FLUSH_SECONDS", "10"))
+
+class LastLoginBuffer:
+    """
+    Écriture différée (write-behind) de users.last_login.
+
+    Les connexions sont accumulées en mémoire (la plus récente par
+    utilisateur) puis écrites par un seul UPDATE exécuté en executemany.
+    Une connexion non encore écrite est perdue si le processus s'arrête
+    brutalement ; l'arrêt normal vide le tampon.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, datetime] = {}
+        self.stats = {"recorded": 0, "flushed": 0, "flushes": 0}
+
+    def record(self, user_id: str, logged_in_at: datetime):
+        self._pending[user_id] = logged_in_at
+        self.stats["recorded"] += 1
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        users = User.__table__
+        statement = (
+            users.update()
+            .where(users.c.id == bindparam("b_id"))
+            .values(last_login=bindparam("b_last_login"))
+        )
+
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(
+                    statement,
+                    [{"b_id": user_id, "b_last_login": logged_in_at} for user_id, logged_in_at in pending.items()]
+                )
+        except Exception:
+            # Remettre les entrées non écrites (sans écraser des connexions plus récentes)
+            for user_id, logged_in_at in pending.items():
+                self._pending.setdefault(user_id, logged_in_at)
+            raise
+
+        self.stats["flushed"] += len(pending)
+        self.stats["flushes"] += 1
+        return len(pending)
+
+    async def run_flush_loop(self):
+        """Boucle d'écriture lancée par le lifespan de l'application."""
+        while True:
+            await asyncio.sleep(LAST_LOGIN_FLUSH_SECONDS)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"❌ Écriture des dernières connexions impossible: {e}")
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+last_login_buffer = LastLoginBuffer()
@@ -0,0 +1,102 @@
+from sqlalchemy import and_, or_, desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Hashable, List, Optional, Tuple
+from datetime import datetime
+import base64
+import os
+import uuid
+import logging
+
+from schemas import PaginationParams
+from utils.cache import TTLCache
+from utils.ids import BINARY_IDS
+
+logger = logging.getLogger(__name__)
+
+# Durée de vie des totaux mis en cache (secondes)
+PAGINATION_COUNT_TTL = float(os.getenv("PAGINATION_COUNT_TTL", "30"))
+
+# Totaux par (table, entreprise, filtres)
+count_cache = TTLCache(maxsize=4096, ttl=PAGINATION_COUNT_TTL)
+
+class InvalidCursorError(ValueError):
+    pass
+
+def encode_cursor(created_at: datetime, record_id: str) -> str:
+    """Encoder la position (created_at, id) d'un élément en curseur opaque."""
+    raw = f"{created_at.isoformat()}|{record_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Décoder un curseur produit par encode_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_at, record_id = raw.split("|", 1)
+        if BINARY_IDS:
+            # Identifiant comparé en BINARY(16) : doit être un UUID
+            record_id = str(uuid.UUID(record_id))
+        return datetime.fromisoformat(created_at), record_id
+    except Exception:
+        raise InvalidCursorError("Curseur de pagination invalide")
+
+def apply_keyset(query, model, cursor: Optional[str]):
+    """Trier par (created_at, id) décroissants et reprendre après le curseur."""
+    if cursor:
+        created_at, record_id = decode_cursor(cursor)
+        query = query.where(
+            or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < record_id)
+            )
+        )
+    return query.order_by(desc(model.created_at), desc(model.id))
+
+async def cached_count(db: AsyncSession, query, key: Hashable) -> int:
+    """Compter les résultats d'une requête en réutilisant un total récent."""
+    total = count_cache.get(key)
+    if total is None:
+        total = await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+        count_cache.set(key, total)
+    return total
+
+def invalidate_counts(table_name: str, enterprise_id: Optional[str]):
+    """
+    Invalider les totaux d'une table pour une entreprise après une écriture,
+    ainsi que ceux calculés sans filtre d'entreprise (clé None, toutes entreprises).
+    """
+    count_cache.invalidate_where(lambda key: key[0] == table_name and key[1] in (enterprise_id, None))
+
+async def paginate(
+    db: AsyncSession,
+    query,
+    model,
+    pagination: PaginationParams,
+    count_key: Hashable,
+    options: Optional[List[Any]] = None
+) -> Tuple[List[Any], Optional[int], Optional[str]]:
+    """
+    Paginer une requête par curseur (pagination.cursor) ou par page.
+
+    Renvoie (éléments, total ou None si include_total=False, curseur suivant).
+    Le curseur suivant est fourni dès qu'une page suivante existe, y compris
+    en mode page, pour permettre de basculer en keyset.
+    """
+    total = await cached_count(db, query, count_key) if pagination.include_total else None
+
+    page_query = apply_keyset(query, model, pagination.cursor)
+    if options:
+        page_query = page_query.options(*options)
+    if not pagination.cursor:
+        page_query = page_query.offset((pagination.page - 1) * pagination.limit)
+
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    result = await db.scalars(page_query.limit(pagination.limit + 1))
+    items = result.all()
+
+    next_cursor = None
+    if len(items) > pagination.limit:
+        items = items[:pagination.limit]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+
+    return items, total, next_cursor
@@ -0,0 +1,133 @@
+from sqlalchemy import select, desc
+from sqlalchemy.engine import Engine
+from typing import Any, Dict, List, Tuple
+import logging
+import sys
+
+from models import DotationReport, DotationRow, TaxDeclaration, TaxBracket, AuditLog
+
+logger = logging.getLogger(__name__)
+
+def hot_queries() -> List[Tuple[str, Any, str]]:
+    """Requêtes critiques et index attendu pour chacune : (nom, requête, index)."""
+    sample_id = "00000000-0000-0000-0000-000000000000"
+
+    return [
+        (
+            "list_dotation_reports",
+            select(DotationReport)
+            .where(DotationReport.enterprise_id == sample_id)
+            .order_by(desc(DotationReport.created_at), desc(DotationReport.id))
+            .limit(20),
+            "ix_dotation_reports_enterprise_created",
+        ),
+        (
+            "list_tax_declarations",
+            select(TaxDeclaration)
+            .where(TaxDeclaration.enterprise_id == sample_id)
+            .order_by(desc(TaxDeclaration.created_at), desc(TaxDeclaration.id))
+            .limit(20),
+            "ix_tax_declarations_enterprise_created",
+        ),
+        (
+            "list_dotation_rows",
+            select(DotationRow).where(DotationRow.report_id == sample_id),
+            "ix_dotation_rows_report_id",
+        ),
+        (
+            "get_tax_brackets",
+            select(TaxBracket)
+            .where(TaxBracket.is_active == True, TaxBracket.bracket_type == "revenus")
+            .order_by(TaxBracket.min_amount),
+            "ix_tax_brackets_type_active_min",
+        ),
+        (
+            "audit_by_user",
+            select(AuditLog)
+            .where(AuditLog.user_id == sample_id)
+            .order_by(desc(AuditLog.created_at))
+            .limit(50),
+            "ix_audit_logs_user_created",
+        ),
+        (
+            "audit_by_record",
+            select(AuditLog)
+            .where(AuditLog.table_name == "dotation_reports", AuditLog.record_id == sample_id)
+            .order_by(desc(AuditLog.created_at), desc(AuditLog.id))
+            .limit(1000),
+            "ix_audit_logs_table_record_created",
+        ),
+        (
+            "audit_recent",
+            select(AuditLog)
+            .order_by(desc(AuditLog.created_at), desc(AuditLog.id))
+            .limit(50),
+            "ix_audit_logs_created_id",
+        ),
+        (
+            "audit_by_action",
+            select(AuditLog)
+            .where(AuditLog.action == "UPDATE")
+            .order_by(desc(AuditLog.created_at), desc(AuditLog.id))
+            .limit(50),
+            "ix_audit_logs_action_created",
+        ),
+    ]
+
+def explain_query(engine: Engine, statement) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Exécuter EXPLAIN (MySQL) ou EXPLAIN QUERY PLAN (SQLite) et renvoyer (index utilisés, plan brut)."""
+    sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            rows = [dict(row._mapping) for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+            used = [
+                word
+                for row in rows
+                for word in str(row.get("detail", "")).replace("(", " ").split()
+                if word.startswith("ix_")
+            ]
+        else:
+            rows = [dict(row._mapping) for row in conn.exec_driver_sql(f"EXPLAIN {sql}")]
+            used = [row["key"] for row in rows if row.get("key")]
+
+    return used, rows
+
+def check_hot_query_plans(engine: Engine) -> List[Dict[str, Any]]:
+    """Vérifier que chaque requête critique utilise son index composite."""
+    results = []
+
+    for name, statement, expected_index in hot_queries():
+        try:
+            used, plan = explain_query(engine, statement)
+            ok = expected_index in used
+        except Exception as e:
+            logger.error(f"EXPLAIN impossible pour {name}: {e}")
+            used, plan, ok = [], [], False
+
+        results.append({
+            "query": name,
+            "expected_index": expected_index,
+            "used_indexes": used,
+            "ok": ok,
+            "plan": plan,
+        })
+
+    return results
+
+if __name__ == "__main__":
+    # Usage : python -m utils.query_plans (depuis le répertoire backend)
+    # Sur MySQL, lancer sur une base représentative : l'optimiseur peut préférer
+    # un scan complet sur des tables presque vides.
+    from database import engine
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    failures = 0
+    for result in check_hot_query_plans(engine):
+        status = "✅" if result["ok"] else "❌"
+        if not result["ok"]:
+            failures += 1
+        print(f"{status} {result['query']}: attendu {result['expected_index']}, utilisé {result['used_indexes'] or 'aucun'}")
+
+    sys.exit(1 if failures else 0)
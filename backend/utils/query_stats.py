@@ -0,0 +1,108 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+import os
+import re
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Mode strict (tests/CI) : une requête HTTP qui dépasse le budget échoue
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "False").lower() == "true"
+# Nombre maximal de requêtes SQL par requête HTTP
+QUERY_BUDGET_MAX = int(os.getenv("QUERY_BUDGET_MAX", "30"))
+# Nombre de répétitions d'une même forme de requête signalant un N+1
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+
+# Listes de paramètres "IN (?, ?, ...)" ramenées à une seule forme
+_PARAM_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+def statement_shape(statement: str) -> str:
+    """Forme normalisée d'une requête (paramètres et listes IN regroupés)."""
+    return _WHITESPACE.sub(" ", _PARAM_LIST.sub("(?)", statement)).strip()
+
+class RequestQueryStats:
+    """Compteurs SQL d'une requête HTTP (ou d'un bloc track_queries)."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def worst_repeat(self) -> Tuple[Optional[str], int]:
+        """Forme de requête la plus répétée et son nombre d'exécutions."""
+        if not self.shapes:
+            return None, 0
+        return self.shapes.most_common(1)[0]
+
+    def violations(
+        self,
+        max_queries: int = QUERY_BUDGET_MAX,
+        max_repeats: int = QUERY_REPEAT_THRESHOLD
+    ) -> List[str]:
+        """Dépassements du budget de requêtes et répétitions suspectes (N+1)."""
+        problems = []
+        if self.count > max_queries:
+            problems.append(f"{self.count} requêtes SQL (budget: {max_queries})")
+        for shape, repeats in self.shapes.items():
+            if repeats >= max_repeats:
+                problems.append(f"{repeats}x la même requête (N+1 probable): {shape[:200]}")
+        return problems
+
+    def server_timing(self) -> str:
+        """Valeur d'en-tête Server-Timing pour la base de données."""
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"'
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+def start_tracking() -> RequestQueryStats:
+    """Démarrer le comptage des requêtes pour le contexte courant."""
+    stats = RequestQueryStats()
+    _current_stats.set(stats)
+    return stats
+
+@contextmanager
+def track_queries(max_queries: Optional[int] = None, max_repeats: Optional[int] = None):
+    """
+    Compter les requêtes exécutées dans le bloc ; lever QueryBudgetExceeded
+    si un budget est fourni et dépassé.
+    """
+    stats = RequestQueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+    if max_queries is not None or max_repeats is not None:
+        problems = stats.violations(
+            max_queries if max_queries is not None else QUERY_BUDGET_MAX,
+            max_repeats if max_repeats is not None else QUERY_REPEAT_THRESHOLD
+        )
+        if problems:
+            raise QueryBudgetExceeded("; ".join(problems))
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None and context is not None:
+        context._query_stats_start = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    start = getattr(context, "_query_stats_start", None)
+    if stats is not None and start is not None:
+        stats.record(statement, time.perf_counter() - start)
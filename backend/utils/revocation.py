@@ -0,0 +1,120 @@
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+import asyncio
+import os
+import time
+import logging
+
+from database import AsyncSessionLocal
+from models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Intervalle de relecture des révocations émises par les autres workers (secondes)
+REVOCATION_POLL_SECONDS = float(os.getenv("REVOCATION_POLL_SECONDS", "10"))
+# Recouvrement des relectures incrémentales (décalage d'horloge, transactions longues)
+REVOCATION_POLL_OVERLAP = timedelta(seconds=10)
+# Intervalle de purge des révocations expirées en base (secondes)
+REVOCATION_PURGE_SECONDS = 3600
+
+class RevocationStore:
+    """
+    Identifiants (jti) des tokens révoqués, jusqu'à leur expiration.
+
+    Le contrôle se fait dans un dictionnaire en mémoire (jti -> exp), sans
+    requête SQL par requête HTTP. La table revoked_tokens partage les
+    révocations entre workers : chaque processus relit les nouvelles lignes
+    au plus une fois par REVOCATION_POLL_SECONDS ; une révocation faite dans
+    ce processus est effective immédiatement.
+    """
+
+    def __init__(self, poll_seconds: float = REVOCATION_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._revoked: Dict[str, float] = {}
+        self._watermark: Optional[datetime] = None
+        self._next_poll = 0.0
+        self._next_purge = 0.0
+        self._lock = asyncio.Lock()
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti:
+            return False
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def _remember(self, jti: str, expires_at: datetime):
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        self._revoked[jti] = expires_at.timestamp()
+
+    async def revoke(
+        self,
+        db: AsyncSession,
+        jti: Optional[str],
+        expires_at: datetime,
+        user_id: Optional[str] = None,
+        token_type: str = "access"
+    ) -> bool:
+        """
+        Révoquer un token jusqu'à son expiration.
+
+        Renvoie False si le token était déjà révoqué en base (clé primaire
+        jti), y compris par un autre worker pas encore relu : la rotation des
+        refresh tokens s'appuie sur cette insertion pour détecter une réutilisation.
+        """
+        if not jti:
+            return False
+
+        self._remember(jti, expires_at)
+        db.add(RevokedToken(jti=jti, user_id=user_id, token_type=token_type, expires_at=expires_at))
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Déjà révoqué (double déconnexion, requêtes concurrentes)
+            await db.rollback()
+            return False
+        return True
+
+    async def ensure_fresh(self):
+        if self._next_poll > time.monotonic():
+            return
+
+        async with self._lock:
+            if self._next_poll > time.monotonic():
+                return
+            try:
+                await self.poll()
+            except Exception as e:
+                # Révocations connues conservées ; nouvel essai au prochain intervalle
+                logger.error(f"Relecture des tokens révoqués impossible: {e}")
+            self._next_poll = time.monotonic() + self.poll_seconds
+
+    async def poll(self):
+        started_at = datetime.now(timezone.utc)
+
+        query = select(RevokedToken.jti, RevokedToken.expires_at)
+        if self._watermark is None:
+            query = query.where(RevokedToken.expires_at > started_at)
+        else:
+            query = query.where(RevokedToken.revoked_at >= self._watermark - REVOCATION_POLL_OVERLAP)
+
+        async with AsyncSessionLocal() as db:
+            for jti, expires_at in (await db.execute(query)).all():
+                self._remember(jti, expires_at)
+
+            if self._next_purge <= time.monotonic():
+                await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= started_at))
+                await db.commit()
+                self._next_purge = time.monotonic() + REVOCATION_PURGE_SECONDS
+
+        now = time.time()
+        self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        self._watermark = started_at
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+revocations = RevocationStore()
@@ -0,0 +1,189 @@
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List
+import asyncio
+import os
+import sys
+import logging
+
+from database import AsyncSessionLocal
+from models import User, Enterprise, DiscordConfig, UserRole
+from auth import (
+    DISCORD_BOT_TOKEN, DISCORD_API_BASE, determine_user_role,
+    member_roles_cache, DISCORD_MEMBER_CACHE_NEGATIVE_TTL
+)
+from utils.discord_client import discord_client
+from utils.enterprise_index import EnterpriseSnapshot
+from utils.token_versions import token_versions
+
+logger = logging.getLogger(__name__)
+
+# Synchronisation périodique des rôles Discord (désactivée par défaut)
+ROLE_SYNC_ENABLED = os.getenv("DISCORD_ROLE_SYNC_ENABLED", "False").lower() == "true"
+ROLE_SYNC_INTERVAL_SECONDS = float(os.getenv("DISCORD_ROLE_SYNC_INTERVAL", "900"))
+# Taille de page de /guilds/{id}/members (maximum Discord : 1000)
+ROLE_SYNC_PAGE_SIZE = min(int(os.getenv("DISCORD_ROLE_SYNC_PAGE_SIZE", "1000")), 1000)
+# Taille des listes IN (...) des UPDATE
+ROLE_SYNC_UPDATE_CHUNK = 500
+
+class RoleSyncError(Exception):
+    pass
+
+async def iter_guild_members(guild_id: str) -> AsyncIterator[List[Dict]]:
+    """Parcourir les membres d'une guild par pages (pagination par identifiant croissant)."""
+    headers = {"Authorization": f"Bot {DISCORD_BOT_TOKEN}"}
+    after = "0"
+
+    while True:
+        response = await discord_client.get(
+            f"{DISCORD_API_BASE}/guilds/{guild_id}/members",
+            params={"limit": ROLE_SYNC_PAGE_SIZE, "after": after},
+            headers=headers
+        )
+        if response.status_code != 200:
+            raise RoleSyncError(f"Membres de la guild {guild_id} indisponibles: HTTP {response.status_code}")
+
+        page = response.json()
+        if not page:
+            return
+
+        yield page
+
+        if len(page) < ROLE_SYNC_PAGE_SIZE:
+            return
+        after = max((member["user"]["id"] for member in page), key=int)
+
+async def sync_enterprise_roles(db: AsyncSession, enterprise: EnterpriseSnapshot) -> Dict[str, int]:
+    """
+    Synchroniser les rôles des utilisateurs d'une entreprise avec sa guild Discord.
+
+    Les rôles attendus sont calculés avec determine_user_role, puis appliqués
+    par un UPDATE ... WHERE discord_id IN (...) par rôle cible, qui incrémente
+    aussi token_version pour invalider les tokens porteurs de l'ancien rôle.
+    Les membres récupérés alimentent aussi le cache des rôles utilisé au login.
+    """
+    guild_id = enterprise.discord_guild_id
+    cache_ttl = ROLE_SYNC_INTERVAL_SECONDS * 2
+
+    desired: Dict[str, UserRole] = {}
+    async for page in iter_guild_members(guild_id):
+        for member in page:
+            discord_id = str(member["user"]["id"])
+            roles = list(member.get("roles", []))
+            member_roles_cache.set((guild_id, discord_id), roles, ttl=cache_ttl)
+            desired[discord_id] = determine_user_role({"roles": roles}, enterprise)
+
+    result = await db.execute(
+        select(User.discord_id, User.role).where(User.enterprise_id == enterprise.id)
+    )
+
+    changes: Dict[UserRole, List[str]] = {}
+    for discord_id, current_role in result.all():
+        if discord_id not in desired:
+            # Plus membre de la guild : même traitement qu'au login
+            member_roles_cache.set((guild_id, discord_id), None, ttl=DISCORD_MEMBER_CACHE_NEGATIVE_TTL)
+        target = desired.get(discord_id, UserRole.EMPLOYE)
+        if target != current_role:
+            changes.setdefault(target, []).append(discord_id)
+
+    updated = 0
+    for role, discord_ids in changes.items():
+        for start in range(0, len(discord_ids), ROLE_SYNC_UPDATE_CHUNK):
+            chunk = discord_ids[start:start + ROLE_SYNC_UPDATE_CHUNK]
+            result = await db.execute(
+                update(User)
+                .where(User.enterprise_id == enterprise.id, User.discord_id.in_(chunk))
+                .values(role=role, token_version=User.token_version + 1)
+                .execution_options(synchronize_session=False)
+            )
+            updated += result.rowcount
+
+    config = (await db.execute(
+        select(DiscordConfig).where(DiscordConfig.guild_id == guild_id)
+    )).scalar_one_or_none()
+    if config is None:
+        config = DiscordConfig(guild_id=guild_id, guild_name=enterprise.name)
+        db.add(config)
+    config.last_sync = datetime.now(timezone.utc)
+
+    await db.commit()
+
+    if updated:
+        # Anciens tokens refusés dès la prochaine requête traitée par ce processus
+        token_versions.invalidate()
+
+    return {"members": len(desired), "updated": updated}
+
+async def sync_all_enterprises(force: bool = False) -> Dict[str, Dict[str, int]]:
+    """
+    Synchroniser toutes les entreprises actives dont la synchronisation est activée.
+
+    Sans force, une guild synchronisée depuis moins d'un intervalle (par un
+    autre worker par exemple) est ignorée.
+    """
+    if not DISCORD_BOT_TOKEN:
+        logger.warning("DISCORD_BOT_TOKEN non configuré - synchronisation des rôles impossible")
+        return {}
+
+    results = {}
+    async with AsyncSessionLocal() as db:
+        # Copies détachées : un rollback après l'échec d'une guild n'affecte pas les suivantes
+        enterprises = [
+            EnterpriseSnapshot(enterprise)
+            for enterprise in (await db.execute(
+                select(Enterprise).where(Enterprise.is_active == True)
+            )).scalars()
+        ]
+        configs = {
+            guild_id: (sync_enabled, last_sync)
+            for guild_id, sync_enabled, last_sync in (await db.execute(
+                select(DiscordConfig.guild_id, DiscordConfig.sync_enabled, DiscordConfig.last_sync)
+            )).all()
+        }
+
+        recent = datetime.now(timezone.utc) - timedelta(seconds=ROLE_SYNC_INTERVAL_SECONDS * 0.9)
+        for enterprise in enterprises:
+            sync_enabled, last_sync = configs.get(enterprise.discord_guild_id, (True, None))
+            if sync_enabled is False:
+                continue
+            if last_sync is not None and last_sync.tzinfo is None:
+                last_sync = last_sync.replace(tzinfo=timezone.utc)
+            if not force and last_sync is not None and last_sync > recent:
+                continue
+
+            try:
+                results[enterprise.name] = await sync_enterprise_roles(db, enterprise)
+                logger.info(f"🔄 Rôles synchronisés pour {enterprise.name}: {results[enterprise.name]}")
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"❌ Synchronisation des rôles impossible pour {enterprise.name}: {e}")
+
+    return results
+
+async def run_role_sync_loop():
+    """Boucle de synchronisation lancée par le lifespan de l'application."""
+    logger.info(f"🔄 Synchronisation des rôles Discord toutes les {ROLE_SYNC_INTERVAL_SECONDS:g}s")
+    while True:
+        try:
+            await sync_all_enterprises()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Erreur de la synchronisation des rôles: {e}")
+        await asyncio.sleep(ROLE_SYNC_INTERVAL_SECONDS)
+
+if __name__ == "__main__":
+    # Usage : python -m utils.role_sync (synchronisation immédiate, par ex. depuis un cron)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    async def main():
+        try:
+            return await sync_all_enterprises(force=True)
+        finally:
+            await discord_client.close()
+
+    results = asyncio.run(main())
+    for name, counts in results.items():
+        print(f"{name}: {counts['members']} membre(s), {counts['updated']} rôle(s) mis à jour")
+    sys.exit(0)
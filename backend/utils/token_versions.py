@@ -0,0 +1,83 @@
+from sqlalchemy import select, or_
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+import asyncio
+import os
+import time
+import logging
+
+from database import AsyncSessionLocal
+from models import User
+
+logger = logging.getLogger(__name__)
+
+# Intervalle de relecture des versions de tokens (secondes)
+TOKEN_VERSION_POLL_SECONDS = float(os.getenv("TOKEN_VERSION_POLL_SECONDS", "30"))
+# Recouvrement des relectures incrémentales (décalage d'horloge, transactions longues)
+TOKEN_VERSION_POLL_OVERLAP = timedelta(seconds=10)
+
+class TokenVersionRegistry:
+    """
+    Versions de tokens et statut actif des utilisateurs, gardés en mémoire.
+
+    Seuls les utilisateurs dont la version a changé (ou désactivés) sont
+    conservés ; un token porte la version de l'utilisateur à son émission et
+    est refusé si elle est dépassée. La table users est relue au plus une fois
+    par TOKEN_VERSION_POLL_SECONDS (lignes modifiées depuis la dernière
+    lecture), jamais à chaque requête. Entre processus, un changement de rôle
+    est donc pris en compte en TOKEN_VERSION_POLL_SECONDS au plus.
+    """
+
+    def __init__(self, poll_seconds: float = TOKEN_VERSION_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._versions: Dict[str, Tuple[int, bool]] = {}
+        self._watermark: Optional[datetime] = None
+        self._next_poll = 0.0
+        self._lock = asyncio.Lock()
+
+    def record(self, user_id: str, version: int, is_active: bool = True):
+        """Prendre en compte immédiatement une version émise par ce processus."""
+        if version or not is_active:
+            self._versions[user_id] = (version, is_active)
+        else:
+            self._versions.pop(user_id, None)
+
+    def invalidate(self):
+        """Forcer une relecture à la prochaine requête (versions modifiées en masse par ce processus)."""
+        self._next_poll = 0.0
+
+    def is_valid(self, user_id: str, version: int) -> bool:
+        current_version, is_active = self._versions.get(user_id, (0, True))
+        return is_active and version >= current_version
+
+    async def ensure_fresh(self):
+        if self._next_poll > time.monotonic():
+            return
+
+        async with self._lock:
+            if self._next_poll > time.monotonic():
+                return
+            try:
+                await self.poll()
+            except Exception as e:
+                # Versions connues conservées ; nouvel essai au prochain intervalle
+                logger.error(f"Relecture des versions de tokens impossible: {e}")
+            self._next_poll = time.monotonic() + self.poll_seconds
+
+    async def poll(self):
+        started_at = datetime.now(timezone.utc)
+
+        query = select(User.id, User.token_version, User.is_active)
+        if self._watermark is None:
+            query = query.where(or_(User.token_version > 0, User.is_active == False))
+        else:
+            query = query.where(User.updated_at >= self._watermark - TOKEN_VERSION_POLL_OVERLAP)
+
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(query)).all()
+
+        for user_id, version, is_active in rows:
+            self.record(user_id, version or 0, bool(is_active))
+        self._watermark = started_at
+
+token_versions = TokenVersionRegistry()
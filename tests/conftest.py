@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Base SQLite jetable : fixée avant tout import de database (moteurs créés à l'import)
+_DB_DIR = tempfile.mkdtemp(prefix="flashback_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'tests.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+os.environ.setdefault("JWT_SECRET_KEY", "tests")
+os.environ["UPLOAD_DIR"] = os.path.join(_DB_DIR, "uploads")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+@pytest.fixture
+def db_engine():
+    """Schéma recréé pour chaque test."""
+    from database import engine
+    from models import Base
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def db(db_engine):
+    from sqlalchemy.orm import Session
+
+    with Session(db_engine) as session:
+        yield session
+
+@pytest.fixture
+def enterprise_user(db):
+    """Entreprise et patron de test."""
+    from models import Enterprise, User, UserRole
+
+    enterprise = Enterprise(name="Flashback", discord_guild_id="111", patron_role_id="9")
+    db.add(enterprise)
+    db.commit()
+    user = User(discord_id="42", discord_username="bob", role=UserRole.PATRON, enterprise_id=enterprise.id)
+    db.add(user)
+    db.commit()
+    return enterprise, user
+
+@pytest.fixture
+def client(db_engine):
+    """Client HTTP de l'application (lifespan compris)."""
+    from fastapi.testclient import TestClient
+    import server
+
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def auth_headers(enterprise_user):
+    from auth import create_tokens_for_user
+
+    _, user = enterprise_user
+    tokens = create_tokens_for_user(user)
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
@@ -0,0 +1,101 @@
+import datetime as dt
+import decimal
+import enum
+import uuid
+
+from models import DotationReport
+from utils.audit import serialize_value, clean_values_for_json, pop_recorded_changes
+
+class Color(enum.Enum):
+    RED = "red"
+
+def test_serialize_value_keeps_containers_as_json():
+    assert serialize_value({"role": "staff"}) == {"role": "staff"}
+    assert serialize_value(["id1", "id2"]) == ["id1", "id2"]
+    assert serialize_value(("a", 1)) == ["a", 1]
+
+def test_serialize_value_converts_nested_leaves():
+    when = dt.datetime(2026, 10, 18, 9, 30, tzinfo=dt.timezone.utc)
+    value = {
+        "at": when,
+        "day": dt.date(2026, 10, 18),
+        "amount": decimal.Decimal("12.50"),
+        "color": Color.RED,
+        "items": [{"id": uuid.UUID(int=1)}],
+        "ratio": float("nan"),
+    }
+    assert serialize_value(value) == {
+        "at": "2026-10-18T09:30:00+00:00",
+        "day": "2026-10-18",
+        "amount": 12.5,
+        "color": "red",
+        "items": [{"id": "00000000-0000-0000-0000-000000000001"}],
+        "ratio": None,
+    }
+
+def test_clean_values_for_json_keeps_report_ids_list():
+    assert clean_values_for_json({"report_ids": ["id1", "id2"], "_sa_instance_state": object()}) == {
+        "report_ids": ["id1", "id2"]
+    }
+
+def _report(db, enterprise, user, **values):
+    report = DotationReport(enterprise_id=enterprise.id, created_by=user.id, title="R1", **values)
+    db.add(report)
+    db.commit()
+    return report
+
+def test_recorded_changes_on_create(db, enterprise_user):
+    enterprise, user = enterprise_user
+    report = _report(db, enterprise, user, period="2026-10")
+
+    old, new = pop_recorded_changes(db, "dotation_reports", report.id)
+    assert old is None
+    assert new["title"] == "R1"
+    assert new["period"] == "2026-10"
+    assert "notes" not in new  # Colonnes NULL ignorées
+
+def test_recorded_changes_only_changed_columns(db, enterprise_user):
+    enterprise, user = enterprise_user
+    report = _report(db, enterprise, user)
+    pop_recorded_changes(db, "dotation_reports", report.id)
+
+    report.title = "R2"
+    report.period = "2026-11"
+    db.commit()
+
+    assert pop_recorded_changes(db, "dotation_reports", report.id) == (
+        {"title": "R1", "period": None},
+        {"title": "R2", "period": "2026-11"},
+    )
+
+def test_recorded_changes_coalesced_and_reverted(db, enterprise_user):
+    enterprise, user = enterprise_user
+    report = _report(db, enterprise, user)
+    pop_recorded_changes(db, "dotation_reports", report.id)
+
+    report.title = "R2"
+    report.notes = "a"
+    db.flush()
+    report.title = "R1"  # Retour à la valeur d'origine dans la même transaction
+    report.notes = "b"
+    db.commit()
+
+    assert pop_recorded_changes(db, "dotation_reports", report.id) == ({"notes": None}, {"notes": "b"})
+
+def test_recorded_changes_on_delete_and_rollback(db, enterprise_user):
+    enterprise, user = enterprise_user
+    report = _report(db, enterprise, user)
+    report_id = report.id
+    pop_recorded_changes(db, "dotation_reports", report_id)
+
+    report.title = "discarded"
+    db.flush()
+    db.rollback()
+    assert pop_recorded_changes(db, "dotation_reports", report_id) == (None, None)
+
+    report = db.get(DotationReport, report_id)
+    db.delete(report)
+    db.commit()
+    old, new = pop_recorded_changes(db, "dotation_reports", report_id)
+    assert old["title"] == "R1"
+    assert new is None
@@ -0,0 +1,97 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import insert, select, func
+
+from models import AuditLog
+from schemas import AuditLogResponse
+from utils.audit_archive import AuditArchive, archive_audit_logs
+from utils.ids import new_id
+
+def _entry(entry_id, record_id, created_at, **values):
+    return {
+        "id": entry_id,
+        "user_id": None,
+        "action": "UPDATE",
+        "table_name": "dotation_reports",
+        "record_id": record_id,
+        "old_values": None,
+        "new_values": None,
+        "ip_address": None,
+        "user_agent": None,
+        "created_at": created_at,
+        **values,
+    }
+
+def test_write_segment_history_round_trip(tmp_path):
+    archive = AuditArchive(str(tmp_path))
+    archive.write_segment(date(2026, 1, 5), [
+        _entry("a1", "r1", "2026-01-05T10:00:00+00:00", old_values={"title": "R1"}, new_values={"title": "R2", "ids": ["x", "y"]}),
+        _entry("a2", "r2", "2026-01-05T11:00:00+00:00"),
+    ])
+    # Jour réarchivé après une reprise : doublon écarté à la lecture
+    archive.write_segment(date(2026, 1, 5), [
+        _entry("a1", "r1", "2026-01-05T10:00:00+00:00", old_values={"title": "R1"}, new_values={"title": "R2", "ids": ["x", "y"]}),
+    ])
+    archive.write_segment(date(2026, 1, 6), [
+        _entry("a3", "r1", "2026-01-06T09:00:00+00:00", new_values={"status": "Validé"}),
+    ])
+
+    history = archive.history("dotation_reports", "r1")
+
+    assert [entry["id"] for entry in history] == ["a1", "a3"]
+    assert history[0]["old_values"] == {"title": "R1"}
+    assert history[0]["new_values"] == {"title": "R2", "ids": ["x", "y"]}
+    # Entrées directement utilisables par la route d'historique
+    responses = [AuditLogResponse(**entry, archived=True) for entry in history]
+    assert responses[1].new_values == {"status": "Validé"}
+    assert archive.history("dotation_reports", "missing") == []
+    assert len(archive.segments(start=datetime(2026, 1, 6, tzinfo=timezone.utc))) == 1
+
+def test_archive_audit_logs_moves_old_rows(db_engine, tmp_path):
+    now = datetime.now(timezone.utc)
+    rows = [
+        _entry(new_id(), "r1", now - timedelta(days=days), new_values={"n": days, "ids": ["a"]})
+        for days in (100, 120, 10)
+    ]
+    with db_engine.begin() as conn:
+        conn.execute(insert(AuditLog.__table__), rows)
+
+    archive = AuditArchive(str(tmp_path))
+    totals = archive_audit_logs(90, archive=archive)
+
+    assert totals == {"segments": 2, "archived": 2, "deleted": 2}
+    assert archive.archived_before() == datetime.combine(
+        (now - timedelta(days=90)).date(), datetime.min.time(), tzinfo=timezone.utc
+    )
+    with db_engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(AuditLog.__table__)).scalar() == 1
+
+    history = archive.history("dotation_reports", "r1")
+    assert [entry["new_values"] for entry in history] == [{"n": 120, "ids": ["a"]}, {"n": 100, "ids": ["a"]}]
+
+def test_index_is_sharded_by_month(tmp_path):
+    archive = AuditArchive(str(tmp_path))
+    archive.write_segment(date(2026, 1, 31), [_entry("a1", "r1", "2026-01-31T23:00:00+00:00")])
+    archive.write_segment(date(2026, 2, 1), [
+        _entry("a2", "r1", "2026-02-01T08:00:00+00:00"),
+        _entry("a3", "r2", "2026-02-01T09:00:00+00:00"),
+    ])
+
+    manifest = json.loads((tmp_path / "index.json").read_text())
+    assert manifest["months"] == {
+        "2026-01": {"first_created_at": "2026-01-31T23:00:00+00:00", "last_created_at": "2026-01-31T23:00:00+00:00", "rows": 1, "segments": 1},
+        "2026-02": {"first_created_at": "2026-02-01T08:00:00+00:00", "last_created_at": "2026-02-01T09:00:00+00:00", "rows": 2, "segments": 1},
+    }
+    # Identifiants d'enregistrements seulement dans l'index du mois
+    february = json.loads((tmp_path / "2026" / "02" / "index.json").read_text())
+    assert february["segments"][0]["records"] == {"dotation_reports": ["r1", "r2"]}
+    assert [segment["day"] for segment in json.loads((tmp_path / "2026" / "01" / "index.json").read_text())["segments"]] == ["2026-01-31"]
+
+    assert archive.months(start=datetime(2026, 2, 1, tzinfo=timezone.utc)) == ["2026-02"]
+    assert [entry["id"] for entry in archive.history("dotation_reports", "r1")] == ["a1", "a2"]
+
+    # Un autre lecteur voit les segments ajoutés depuis sa dernière lecture
+    archive.write_segment(date(2026, 2, 2), [_entry("a4", "r1", "2026-02-02T08:00:00+00:00")])
+    assert [entry["id"] for entry in AuditArchive(str(tmp_path)).history("dotation_reports", "r1")] == ["a1", "a2", "a4"]
+    assert [entry["id"] for entry in archive.history("dotation_reports", "r1")] == ["a1", "a2", "a4"]
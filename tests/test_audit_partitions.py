@@ -0,0 +1,62 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+from utils.audit_archive import AuditArchive
+from utils.audit_partitions import (
+    PartitionMaintenanceError, add_months, expire_partitions, partition_definitions
+)
+
+PARTITIONS = ["p202401", "p202402", "p202403", "p202610", "pmax"]
+TODAY = date(2026, 10, 18)
+
+class RecordingConnection:
+    """Connexion factice : garde le SQL exécuté."""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, parameters=None):
+        self.statements.append(str(statement))
+
+def test_drop_keeps_months_not_covered_by_archive():
+    conn = RecordingConnection()
+
+    assert expire_partitions(conn, PARTITIONS, TODAY, 24, "drop") == []
+    assert conn.statements == []
+
+    # Archivage terminé jusqu'au 15 mars : février est couvert, mars ne l'est pas
+    assert expire_partitions(conn, PARTITIONS, TODAY, 24, "drop", date(2024, 3, 15)) == ["p202401", "p202402"]
+    assert conn.statements == ["ALTER TABLE audit_logs DROP PARTITION p202401, p202402"]
+
+def test_detach_keeps_rows_in_a_table():
+    conn = RecordingConnection()
+
+    assert expire_partitions(conn, PARTITIONS, TODAY, 24, "detach") == ["p202401", "p202402", "p202403"]
+    assert conn.statements[:3] == [
+        "CREATE TABLE audit_logs_p202401 LIKE audit_logs",
+        "ALTER TABLE audit_logs_p202401 REMOVE PARTITIONING",
+        "ALTER TABLE audit_logs EXCHANGE PARTITION p202401 WITH TABLE audit_logs_p202401",
+    ]
+    assert conn.statements[-1] == "ALTER TABLE audit_logs DROP PARTITION p202401, p202402, p202403"
+
+def test_invalid_mode_is_rejected():
+    with pytest.raises(PartitionMaintenanceError):
+        expire_partitions(RecordingConnection(), PARTITIONS, TODAY, 24, "truncate")
+
+def test_archive_watermark_never_moves_back(tmp_path):
+    archive = AuditArchive(str(tmp_path))
+    assert archive.archived_before() is None
+
+    archive.mark_archived_before(datetime(2026, 7, 1, tzinfo=timezone.utc))
+    archive.mark_archived_before(datetime(2026, 6, 1, tzinfo=timezone.utc))
+
+    assert AuditArchive(str(tmp_path)).archived_before() == datetime(2026, 7, 1, tzinfo=timezone.utc)
+
+def test_partition_definitions():
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert partition_definitions(date(2026, 12, 1), date(2027, 1, 1)) == [
+        "PARTITION p202612 VALUES LESS THAN (TO_DAYS('2027-01-01'))",
+        "PARTITION p202701 VALUES LESS THAN (TO_DAYS('2027-02-01'))",
+        "PARTITION pmax VALUES LESS THAN MAXVALUE",
+    ]
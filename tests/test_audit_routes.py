@@ -0,0 +1,104 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert
+
+from models import AuditLog, User, UserRole
+from utils.audit_archive import AuditArchive
+from utils.ids import new_id
+
+@pytest.fixture
+def audit_rows(db, enterprise_user):
+    """Cinq entrées du patron et une d'un utilisateur d'une autre entreprise."""
+    _, user = enterprise_user
+    outsider = User(discord_id="77", discord_username="eve", role=UserRole.PATRON)
+    db.add(outsider)
+    db.commit()
+
+    base = datetime(2026, 10, 1, 12, tzinfo=timezone.utc)
+    rows = [
+        {
+            "id": new_id(), "user_id": user.id, "action": action, "table_name": "dotation_reports",
+            "record_id": "r1", "old_values": {"title": f"T{i}"}, "new_values": {"title": f"T{i + 1}", "ids": ["a", "b"]},
+            "created_at": base + timedelta(minutes=i),
+        }
+        for i, action in enumerate(["CREATE", "UPDATE", "UPDATE", "EXPORT_PDF", "DELETE"])
+    ]
+    rows.append({
+        "id": new_id(), "user_id": outsider.id, "action": "UPDATE", "table_name": "dotation_reports",
+        "record_id": "r1", "old_values": None, "new_values": None, "created_at": base + timedelta(minutes=10),
+    })
+    with db.get_bind().begin() as conn:
+        conn.execute(insert(AuditLog.__table__), rows)
+    return rows
+
+def test_list_keyset_pagination_scoped_to_enterprise(client, auth_headers, audit_rows):
+    response = client.get("/api/audit?limit=3", headers=auth_headers)
+    assert response.status_code == 200
+    page = response.json()
+    assert page["total"] is None
+    assert [item["action"] for item in page["items"]] == ["DELETE", "EXPORT_PDF", "UPDATE"]
+    assert page["items"][0]["new_values"] == {"title": "T5", "ids": ["a", "b"]}
+
+    response = client.get(f"/api/audit?limit=3&cursor={page['next_cursor']}", headers=auth_headers)
+    page = response.json()
+    assert [item["action"] for item in page["items"]] == ["UPDATE", "CREATE"]
+    assert page["next_cursor"] is None
+
+def test_list_filters(client, auth_headers, audit_rows):
+    response = client.get("/api/audit?action=update&table=dotation_reports&record_id=r1", headers=auth_headers)
+    assert [item["action"] for item in response.json()["items"]] == ["UPDATE", "UPDATE"]
+
+    response = client.get(
+        "/api/audit", params={"date_from": "2026-10-01T12:03:00+00:00", "date_to": "2026-10-01T12:04:00+00:00"},
+        headers=auth_headers
+    )
+    assert [item["action"] for item in response.json()["items"]] == ["EXPORT_PDF"]
+
+def test_list_invalid_cursor(client, auth_headers, audit_rows):
+    assert client.get("/api/audit?cursor=zzz", headers=auth_headers).status_code == 400
+
+def test_export_ndjson_keeps_json_objects(client, auth_headers, audit_rows):
+    response = client.get("/api/audit/export", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 5
+    assert lines[0]["action"] == "DELETE"
+    assert lines[0]["old_values"] == {"title": "T4"}
+    assert lines[0]["new_values"] == {"title": "T5", "ids": ["a", "b"]}
+    assert lines[0]["created_at"].startswith("2026-10-01T12:04:00")
+
+def test_history_merges_database_and_archive(client, auth_headers, audit_rows, enterprise_user, tmp_path, monkeypatch):
+    _, user = enterprise_user
+    archive = AuditArchive(str(tmp_path))
+    archive.write_segment(date(2026, 1, 5), [
+        {
+            "id": "archived-1", "user_id": user.id, "action": "CREATE", "table_name": "dotation_reports",
+            "record_id": "r1", "old_values": None, "new_values": {"title": "T0", "ids": ["z"]},
+            "ip_address": None, "user_agent": None, "created_at": "2026-01-05T10:00:00+00:00",
+        },
+        {
+            "id": "archived-other", "user_id": "someone-else", "action": "UPDATE", "table_name": "dotation_reports",
+            "record_id": "r1", "old_values": {"a": 1}, "new_values": {"a": 2},
+            "ip_address": None, "user_agent": None, "created_at": "2026-01-05T11:00:00+00:00",
+        },
+        # Déjà archivée mais pas encore supprimée de la base : pas de doublon
+        {**{key: value for key, value in audit_rows[0].items() if key != "created_at"},
+         "ip_address": None, "user_agent": None, "created_at": audit_rows[0]["created_at"].isoformat()},
+    ])
+    monkeypatch.setattr("routes.audit_routes.audit_archive", archive)
+
+    response = client.get("/api/audit/history/dotation_reports/r1", headers=auth_headers)
+    assert response.status_code == 200
+    history = response.json()
+    assert history["archived"] == 1
+    assert [(item["action"], item["archived"]) for item in history["items"]] == [
+        ("CREATE", True), ("CREATE", False), ("UPDATE", False), ("UPDATE", False), ("EXPORT_PDF", False), ("DELETE", False)
+    ]
+    assert history["items"][0]["new_values"] == {"title": "T0", "ids": ["z"]}
+
+    response = client.get("/api/audit/history/dotation_reports/r1?include_archive=false", headers=auth_headers)
+    assert response.json()["archived"] == 0
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import UserRole
+
+
+@pytest.fixture
+def discord_login(monkeypatch, enterprise_user):
+    """Callback OAuth sans appel à Discord : membre de la guild avec les rôles donnés."""
+    from routes import auth_routes
+    from utils.enterprise_index import EnterpriseSnapshot
+
+    enterprise, _ = enterprise_user
+    snapshot = EnterpriseSnapshot(enterprise)
+
+    def login(client, roles):
+        async def user_from_code(code):
+            return {"id": "42", "username": "bob"}
+
+        async def user_enterprise(db, discord_user_data):
+            return snapshot
+
+        async def guild_member(guild_id, user_id):
+            return {"roles": roles}
+
+        monkeypatch.setattr(auth_routes, "get_discord_user_from_code", user_from_code)
+        monkeypatch.setattr(auth_routes, "find_user_enterprise", user_enterprise)
+        monkeypatch.setattr(auth_routes, "get_discord_guild_member", guild_member)
+        return client.post("/auth/discord/callback", json={"code": "code-oauth"})
+
+    return login
+
+
+@pytest.mark.parametrize("roles, role, token_version", [
+    (["9"], UserRole.PATRON, 0),
+    ([], UserRole.EMPLOYE, 1),
+])
+def test_callback_returns_buffered_last_login(client, discord_login, roles, role, token_version):
+    from utils.token_versions import token_versions
+
+    before = datetime.now(timezone.utc)
+    response = discord_login(client, roles)
+
+    assert response.status_code == 200
+    user = response.json()["user"]
+    assert user["role"] == role.value
+    last_login = datetime.fromisoformat(user["last_login"].replace("Z", "+00:00"))
+    if last_login.tzinfo is None:
+        last_login = last_login.replace(tzinfo=timezone.utc)
+    assert before - timedelta(seconds=1) <= last_login <= datetime.now(timezone.utc)
+    assert token_versions.is_valid(user["id"], token_version)
+    assert not token_version or not token_versions.is_valid(user["id"], token_version - 1)
+
+
+def test_callback_rejects_email_of_another_account(client, db, discord_login, monkeypatch):
+    from models import User
+    from routes import auth_routes
+
+    db.add(User(discord_id="77", discord_username="eve", email="bob@example.com", role=UserRole.EMPLOYE))
+    db.commit()
+
+    async def new_account(code):
+        return {"id": "99", "username": "bob2", "email": "bob@example.com"}
+
+    discord_login(client, ["9"])
+    monkeypatch.setattr(auth_routes, "get_discord_user_from_code", new_account)
+    response = client.post("/auth/discord/callback", json={"code": "code-oauth"})
+
+    assert response.status_code == 400
+    assert "e-mail" in response.json()["detail"]
+
+
+def test_refresh_token_rotation_detects_reuse(client, db, enterprise_user):
+    from auth import create_tokens_for_user
+
+    _, user = enterprise_user
+    refresh_token = create_tokens_for_user(user)["refresh_token"]
+
+    first = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert first.status_code == 200
+    assert client.post("/auth/refresh", json={"refresh_token": refresh_token}).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": first.json()["refresh_token"]}).status_code == 200
+
+
+def test_refresh_token_used_by_another_worker_is_rejected(client, db, enterprise_user, monkeypatch):
+    from auth import create_tokens_for_user, verify_token
+    from models import RevokedToken
+    from utils.revocation import revocations
+
+    _, user = enterprise_user
+    refresh_token = create_tokens_for_user(user)["refresh_token"]
+    payload = verify_token(refresh_token)
+
+    # Rotation faite par un autre worker : en base, pas encore relue par ce processus
+    db.add(RevokedToken(
+        jti=payload.jti, user_id=user.id, token_type="refresh",
+        expires_at=datetime.fromtimestamp(payload.exp, tz=timezone.utc)
+    ))
+    db.commit()
+
+    async def not_polled():
+        pass
+
+    monkeypatch.setattr(revocations, "ensure_fresh", not_polled)
+    assert not revocations.is_revoked(payload.jti)
+
+    assert client.post("/auth/refresh", json={"refresh_token": refresh_token}).status_code == 401
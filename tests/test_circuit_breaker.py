@@ -0,0 +1,146 @@
+import asyncio
+
+import httpx
+import pytest
+
+import utils.circuit_breaker as circuit_breaker
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from utils.discord_client import DiscordClient
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", fake)
+    return fake
+
+def _breaker():
+    return CircuitBreaker("test", failure_rate_threshold=0.5, minimum_calls=4, window_seconds=30, open_seconds=10)
+
+def test_breaker_closed_open_half_open_closed(clock):
+    breaker = _breaker()
+
+    for ok in (True, False, True):
+        breaker.allow()
+        breaker.record_success() if ok else breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.allow()
+    breaker.record_failure()  # 2 échecs sur 4 appels
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.allow()
+    assert error.value.retry_after == pytest.approx(10)
+    assert breaker.rejected == 1
+
+    clock.now += 10.5
+    breaker.allow()  # Essai unique en half_open
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert dict(breaker.transitions) == {"closed->open": 1, "open->half_open": 1, "half_open->closed": 1}
+
+def test_breaker_half_open_failure_reopens(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.allow()
+        breaker.record_failure()
+    clock.now += 11
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.transitions["half_open->open"] == 1
+
+def test_breaker_release_frees_half_open_probe(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.allow()
+        breaker.record_failure()
+    clock.now += 11
+    breaker.allow()
+    breaker.release()  # Essai annulé : ni succès ni échec
+    assert breaker.state == HALF_OPEN
+    breaker.allow()  # L'essai est de nouveau disponible
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+def test_breaker_window_forgets_old_outcomes(clock):
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.allow()
+        breaker.record_failure()
+    clock.now += 31
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+def _client(handler) -> DiscordClient:
+    client = DiscordClient()
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+def test_discord_client_cancellation_is_not_a_failure():
+    async def slow(request):
+        await asyncio.sleep(10)
+        return httpx.Response(200)
+
+    async def run():
+        client = _client(slow)
+        client.breaker.state = HALF_OPEN
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.get("https://discord.com/api/v10/users/@me"), 0.05)
+        return client.breaker
+
+    breaker = asyncio.run(run())
+    # L'essai half_open annulé ne rouvre pas le disjoncteur et reste disponible
+    assert breaker.state == HALF_OPEN
+    assert breaker._half_open_calls == 0
+    assert breaker.snapshot()["window_calls"] == 0
+
+def test_discord_client_transport_errors_and_5xx_are_failures():
+    responses = iter([httpx.ConnectError("boom"), httpx.Response(503), httpx.Response(200)])
+
+    def handler(request):
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def run():
+        client = _client(handler)
+        with pytest.raises(httpx.ConnectError):
+            await client.get("https://discord.com/api/v10/users/@me")
+        assert (await client.get("https://discord.com/api/v10/users/@me")).status_code == 503
+        assert (await client.get("https://discord.com/api/v10/users/@me")).status_code == 200
+        return client.breaker.snapshot()
+
+    snapshot = asyncio.run(run())
+    assert snapshot["window_calls"] == 3
+    assert snapshot["window_failure_rate"] == pytest.approx(2 / 3, abs=0.001)
+
+def test_discord_client_rate_limits_do_not_open_the_breaker():
+    from utils.discord_client import DiscordRateLimitError
+
+    def handler(request):
+        return httpx.Response(429, json={"retry_after": 3600})
+
+    async def run():
+        client = _client(handler)
+        for _ in range(10):
+            with pytest.raises(DiscordRateLimitError):
+                await client.get("https://discord.com/api/v10/users/@me")
+        return client.breaker
+
+    breaker = asyncio.run(run())
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["window_calls"] == 0
@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+
+def test_background_refresh_does_not_inherit_request_context(db, enterprise_user, monkeypatch):
+    from database import AsyncSessionLocal, async_engine, _request_user_id
+    from utils import deadlines, query_stats
+    from utils.enterprise_index import EnterpriseIndex
+
+    index = EnterpriseIndex()
+    seen = {}
+
+    async def refresh(db=None):
+        seen["deadline"] = deadlines.remaining()
+        seen["stats"] = query_stats._current_stats.get()
+        seen["user_id"] = _request_user_id.get()
+
+    monkeypatch.setattr(index, "refresh", refresh)
+
+    async def request():
+        # État posé par les middlewares pour la requête en cours
+        deadlines._deadline.set(time.monotonic() + 30)
+        query_stats.start_tracking()
+        _request_user_id.set("42")
+        try:
+            async with AsyncSessionLocal() as session:
+                enterprise = await index.resolve(session, ["111"])
+            await index._refresh_task
+            return enterprise
+        finally:
+            await async_engine.dispose()
+
+    enterprise = asyncio.run(request())
+
+    assert enterprise.discord_guild_id == "111"
+    assert index.stats["fallbacks"] == 1
+    assert seen == {"deadline": None, "stats": None, "user_id": None}
@@ -0,0 +1,99 @@
+import uuid
+
+import pytest
+from sqlalchemy import Column, MetaData, String, Table, create_engine, insert, select
+
+
+def test_uuid7_is_time_ordered_and_versioned():
+    from utils.ids import uuid7
+
+    values = [uuid7() for _ in range(5000)]
+
+    assert values == sorted(values, key=lambda value: value.bytes)
+    assert len(set(values)) == len(values)
+    assert all(value.version == 7 and value.variant == uuid.RFC_4122 for value in values)
+
+
+def test_uuid7_counter_overflow_borrows_next_millisecond(monkeypatch):
+    from utils import ids
+
+    monkeypatch.setattr(ids, "_uuid7_last_ms", 0)
+    monkeypatch.setattr(ids.time, "time_ns", lambda: 1_700_000_000_000 * 1_000_000)
+    values = [ids.uuid7() for _ in range(0x1000 + 10)]
+
+    assert values == sorted(values, key=lambda value: value.bytes)
+    assert values[-1].int >> 80 == 1_700_000_000_001
+
+
+@pytest.fixture
+def binary_ids(monkeypatch):
+    from utils import ids
+
+    monkeypatch.setattr(ids, "BINARY_IDS", True)
+    return ids
+
+
+def test_compact_uuid_round_trip_in_binary_mode(binary_ids):
+    column_type = binary_ids.CompactUUID()
+    value = str(binary_ids.uuid7())
+
+    stored = column_type.process_bind_param(value, None)
+
+    assert stored == uuid.UUID(value).bytes
+    assert column_type.process_bind_param(stored, None) == stored
+    assert column_type.process_result_value(stored, None) == value
+    assert column_type.process_bind_param(None, None) is None
+
+
+def test_compact_uuid_binds_invalid_id_to_unmatched_value(binary_ids):
+    assert binary_ids.CompactUUID().process_bind_param("pas-un-uuid", None) == binary_ids.UNMATCHED_ID
+
+
+def test_compact_uuid_passes_strings_through_in_char_mode(monkeypatch):
+    from utils import ids
+
+    monkeypatch.setattr(ids, "BINARY_IDS", False)
+    column_type = ids.CompactUUID()
+
+    assert column_type.process_bind_param("pas-un-uuid", None) == "pas-un-uuid"
+    assert column_type.process_result_value("abc", None) == "abc"
+
+
+def test_compact_uuid_binary_column_lookup(binary_ids):
+    metadata = MetaData()
+    items = Table(
+        "items", metadata,
+        Column("id", binary_ids.CompactUUID(), primary_key=True),
+        Column("name", String(20)),
+    )
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    item_id = binary_ids.new_id()
+
+    with engine.begin() as conn:
+        conn.execute(insert(items).values(id=item_id, name="radio"))
+        assert conn.execute(select(items.c.id, items.c.name)).one() == (item_id, "radio")
+        assert conn.execute(select(items.c.name).where(items.c.id == item_id)).scalar() == "radio"
+        assert conn.execute(select(items.c.name).where(items.c.id == "pas-un-uuid")).scalar() is None
+
+
+def test_id_migration_detects_column_storage():
+    from sqlalchemy.dialects import mysql
+    from utils.id_migration import column_storage
+
+    assert column_storage(mysql.BINARY(16)) == "binary"
+    assert column_storage(mysql.VARBINARY(36)) == "intermediate"
+    assert column_storage(mysql.CHAR(36)) == "string"
+    assert column_storage(mysql.VARCHAR(36)) == "string"
+
+
+def test_id_migration_recreates_model_foreign_keys():
+    from utils.id_migration import expected_foreign_keys
+
+    foreign_keys = expected_foreign_keys()
+
+    rows = foreign_keys[("dotation_rows", ("report_id",))]
+    assert (rows["referred_table"], rows["referred_columns"], rows["ondelete"]) == ("dotation_reports", ["id"], "CASCADE")
+    assert foreign_keys[("users", ("enterprise_id",))]["ondelete"] is None
+    # Table partitionnée : aucune clé étrangère à recréer
+    assert not any(table == "audit_logs" for table, _ in foreign_keys)
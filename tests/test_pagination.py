@@ -0,0 +1,43 @@
+from datetime import datetime, timezone
+import uuid
+
+import pytest
+
+
+def test_invalidate_counts_clears_enterprise_and_global_totals():
+    from utils.pagination import count_cache, invalidate_counts
+
+    count_cache.clear()
+    count_cache.set(("tax_declarations", "e1", None, None), 3)
+    count_cache.set(("tax_declarations", None, None, None), 10)
+    count_cache.set(("tax_declarations", "e2", None, None), 7)
+    count_cache.set(("dotation_reports", None, None, None), 5)
+
+    invalidate_counts("tax_declarations", "e1")
+
+    assert count_cache.get(("tax_declarations", "e1", None, None)) is None
+    assert count_cache.get(("tax_declarations", None, None, None)) is None
+    assert count_cache.get(("tax_declarations", "e2", None, None)) == 7
+    assert count_cache.get(("dotation_reports", None, None, None)) == 5
+
+
+def test_cursor_round_trip():
+    from utils.pagination import encode_cursor, decode_cursor
+
+    created_at = datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc)
+    record_id = str(uuid.uuid4())
+
+    assert decode_cursor(encode_cursor(created_at, record_id)) == (created_at, record_id)
+
+
+def test_cursor_with_non_uuid_id_is_rejected_in_binary_mode(monkeypatch):
+    from utils import pagination
+
+    cursor = pagination.encode_cursor(datetime(2026, 10, 18, tzinfo=timezone.utc), "pas-un-uuid")
+
+    monkeypatch.setattr(pagination, "BINARY_IDS", False)
+    assert pagination.decode_cursor(cursor)[1] == "pas-un-uuid"
+
+    monkeypatch.setattr(pagination, "BINARY_IDS", True)
+    with pytest.raises(pagination.InvalidCursorError):
+        pagination.decode_cursor(cursor)
@@ -0,0 +1,15 @@
+from models import Base
+from utils.query_plans import check_hot_query_plans, hot_queries
+
+
+def test_expected_indexes_exist_in_schema():
+    indexes = {index.name for table in Base.metadata.tables.values() for index in table.indexes}
+
+    assert {expected for _, _, expected in hot_queries()} <= indexes
+
+
+def test_audit_queries_use_their_index(db_engine):
+    results = {result["query"]: result for result in check_hot_query_plans(db_engine)}
+
+    for name in ("audit_by_user", "audit_by_record", "audit_recent", "audit_by_action"):
+        assert results[name]["ok"], results[name]["plan"]
@@ -0,0 +1,105 @@
+import asyncio
+
+from sqlalchemy import select
+
+
+def _run(coro):
+    """Exécuter un scénario puis fermer les connexions aiosqlite (threads bloquant la sortie)."""
+    from database import async_engine
+
+    async def scenario():
+        try:
+            return await coro
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(scenario())
+
+
+def _enterprise(db, name, guild_id):
+    from models import Enterprise
+
+    enterprise = Enterprise(name=name, discord_guild_id=guild_id, patron_role_id="9")
+    db.add(enterprise)
+    db.commit()
+    return enterprise
+
+
+def test_enterprise_change_at_login_bumps_token_version(db, enterprise_user, monkeypatch):
+    from auth import get_or_create_user
+    from database import AsyncSessionLocal
+    from models import User
+    from utils.enterprise_index import EnterpriseSnapshot
+    from utils.token_versions import TokenVersionRegistry
+    import auth
+
+    enterprise, user = enterprise_user
+    other = _enterprise(db, "Autre", "222")
+    registry = TokenVersionRegistry()
+    monkeypatch.setattr(auth, "token_versions", registry)
+
+    async def login(target):
+        async with AsyncSessionLocal() as session:
+            logged_in = await get_or_create_user(session, {"id": "42", "username": "bob"}, target)
+            return logged_in.enterprise_id, logged_in.token_version
+
+    async def scenario():
+        return [
+            await login(EnterpriseSnapshot(enterprise)),
+            await login(EnterpriseSnapshot(other)),
+            await login(EnterpriseSnapshot(other)),
+        ]
+
+    same, moved, again = _run(scenario())
+
+    assert same == (enterprise.id, 0)
+    assert moved == (other.id, 1)
+    assert again == (other.id, 1)
+    assert not registry.is_valid(user.id, 0)
+    assert registry.is_valid(user.id, 1)
+
+    db.expire_all()
+    stored = db.execute(select(User.enterprise_id, User.token_version).where(User.id == user.id)).one()
+    assert tuple(stored) == (other.id, 1)
+
+
+def test_first_login_keeps_initial_token_version(db, db_engine):
+    from auth import get_or_create_user
+    from database import AsyncSessionLocal
+    from utils.enterprise_index import EnterpriseSnapshot
+
+    enterprise = _enterprise(db, "Flashback", "111")
+
+    async def login():
+        async with AsyncSessionLocal() as session:
+            created = await get_or_create_user(session, {"id": "77", "username": "alice"}, EnterpriseSnapshot(enterprise))
+            return created.enterprise_id, created.token_version
+
+    assert _run(login()) == (enterprise.id, 0)
+
+
+def test_role_sync_bumps_token_version_and_forces_poll(db, enterprise_user, monkeypatch):
+    from database import AsyncSessionLocal
+    from models import User, UserRole
+    from utils import role_sync
+    from utils.enterprise_index import EnterpriseSnapshot
+
+    enterprise, user = enterprise_user
+
+    async def members(guild_id):
+        yield [{"user": {"id": "42"}, "roles": []}]
+
+    monkeypatch.setattr(role_sync, "iter_guild_members", members)
+    invalidated = []
+    monkeypatch.setattr(role_sync.token_versions, "invalidate", lambda: invalidated.append(True))
+
+    async def sync():
+        async with AsyncSessionLocal() as session:
+            return await role_sync.sync_enterprise_roles(session, EnterpriseSnapshot(enterprise))
+
+    assert _run(sync()) == {"members": 1, "updated": 1}
+    assert invalidated == [True]
+
+    db.expire_all()
+    stored = db.execute(select(User.role, User.token_version).where(User.id == user.id)).one()
+    assert tuple(stored) == (UserRole.EMPLOYE, 1)